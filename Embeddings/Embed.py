@@ -1,50 +1,134 @@
+import hashlib
 import json
+import os
+import sys
 import numpy as np
 import torch
-import re
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
-
-# Load model
-model = SentenceTransformer("all-MiniLM-L6-v2")
-
-# Load catalog
-catalog_path = Path(__file__).parent.parent / "api" / "final_catalog.json"
-with open(catalog_path, 'r') as f:
-    catalog = json.load(f)
-
-print(f"Loaded {len(catalog)} assessments")
-
-# Create rich text representations for embedding
-texts = []
-for item in catalog:
-    name = item.get('name', '').strip()
-    desc = item.get('description', '').strip()[:800]
-    test_type = item.get('test_type', '').strip()
-    job_levels = item.get('job_levels', '').strip()
-    remote = item.get('remote_testing', '').strip()
-    adaptive = item.get('adaptive_support', '').strip()
-    
-    # Create text with weights on important fields
-    text = f"{name} {name} {desc} Test Type: {test_type} Job Levels: {job_levels} Remote: {remote} Adaptive: {adaptive}"
-    texts.append(text)
-
-# Generate embeddings
-print("Generating embeddings...")
-embeddings = model.encode(texts, convert_to_tensor=True, normalize_embeddings=True)
-
-# Save embeddings as torch
-embeddings_path = Path(__file__).parent.parent / "api" / "embeddings.pt"
-torch.save(embeddings, embeddings_path)
-print(f"Saved embeddings to {embeddings_path} with shape {embeddings.shape}")
-
-# Also save as numpy for compatibility
-embeddings_npy = embeddings.cpu().numpy()
-embeddings_npy_path = Path(__file__).parent.parent / "api" / "embeddings.npy"
-np.save(embeddings_npy_path, embeddings_npy)
-
-# Save cleaned catalog
-catalog_npy_path = Path(__file__).parent.parent / "api" / "catalog.npy"
-np.save(catalog_npy_path, np.array(catalog, dtype=object))
-
-print(f"Complete! Embedded {len(catalog)} assessments successfully")
+
+# Artifacts live next to app.py, which is where the API loads them from
+OUT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(OUT_DIR))
+from ann import INDEX_FILES, build_index
+# pipeline.py and eval/run_eval.py import item_text from here
+from embed_text import DESC_CHARS, TEMPLATE_TAG, TEXT_TEMPLATE, item_text
+from encoder import backend_tag, load_encoder
+from store import catalog_fingerprint, write_store
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+# Rows encoded and flushed to disk per step; bounds peak memory on large catalogs
+CHUNK_ROWS = int(os.getenv("EMBED_CHUNK_ROWS", "4096"))
+# >1 fans the torch encoder out over a sentence-transformers process pool
+PROCESSES = int(os.getenv("EMBED_PROCESSES", "1"))
+
+embeddings_npy_path = OUT_DIR / "embeddings.npy"
+manifest_path = OUT_DIR / "embeddings_manifest.json"
+
+
+def content_hash(text):
+    """Hash of everything that determines an item's embedding"""
+    h = hashlib.sha256()
+    for part in (MODEL_NAME, TEXT_TEMPLATE, str(DESC_CHARS), text):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def load_previous(dim, backend):
+    """(content hash -> row) and the mapped matrix from the last run, if still usable"""
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        previous = np.load(embeddings_npy_path, mmap_mode="r")
+    except (OSError, ValueError):
+        return {}, None
+    if (manifest.get("model") != MODEL_NAME or manifest.get("backend") != backend or manifest.get("dim") != dim
+            or previous.ndim != 2 or previous.shape != (len(manifest.get("hashes", [])), dim)):
+        print("Previous embeddings do not match this model or backend; re-embedding everything")
+        return {}, None
+    return {h: row for row, h in enumerate(manifest["hashes"])}, previous
+
+
+def encode(model, texts, pool=None):
+    if pool is not None:
+        return model.encode_multi_process(texts, pool, batch_size=BATCH_SIZE, normalize_embeddings=True)
+    return model.encode(texts, batch_size=BATCH_SIZE, convert_to_numpy=True, normalize_embeddings=True)
+
+
+def main():
+    # Load model (ENCODER_BACKEND=onnx uses the int8 ONNX export)
+    model = load_encoder(MODEL_NAME)
+    dim = model.get_sentence_embedding_dimension()
+
+    # Load catalog
+    catalog_path = OUT_DIR / "final_catalog.json"
+    catalog_bytes = catalog_path.read_bytes()
+    catalog = json.loads(catalog_bytes)
+
+    print(f"Loaded {len(catalog)} assessments")
+
+    texts = [item_text(item) for item in catalog]
+    hashes = [content_hash(t) for t in texts]
+    encoder_backend = backend_tag(model)
+    previous_rows, previous = load_previous(dim, encoder_backend)
+    todo = [i for i, h in enumerate(hashes) if h not in previous_rows]
+    removed = len(set(previous_rows) - set(hashes))
+    print(f"{len(catalog) - len(todo)} unchanged, {len(todo)} new or changed, {removed} removed")
+
+    # Generate embeddings into a temp .npy, then swap it in atomically
+    pool = None
+    if todo and PROCESSES > 1 and hasattr(model, "start_multi_process_pool"):
+        pool = model.start_multi_process_pool(["cpu"] * PROCESSES)
+    tmp_path = embeddings_npy_path.with_suffix(".npy.tmp")
+    out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(len(catalog), dim))
+    try:
+        for start in range(0, len(catalog), CHUNK_ROWS):
+            rows = range(start, min(start + CHUNK_ROWS, len(catalog)))
+            kept = [i for i in rows if hashes[i] in previous_rows]
+            fresh = [i for i in rows if hashes[i] not in previous_rows]
+            if kept:
+                out[kept] = previous[[previous_rows[hashes[i]] for i in kept]]
+            if fresh:
+                print(f"Generating embeddings for rows {start}-{rows[-1]} ({len(fresh)} items)...")
+                out[fresh] = encode(model, [texts[i] for i in fresh], pool)
+            out.flush()
+    finally:
+        if pool is not None:
+            model.stop_multi_process_pool(pool)
+    del out, previous
+    os.replace(tmp_path, embeddings_npy_path)
+    manifest_tmp = manifest_path.with_suffix(".json.tmp")
+    manifest_tmp.write_text(json.dumps({"model": MODEL_NAME, "backend": encoder_backend, "dim": dim, "hashes": hashes}),
+                            encoding="utf-8")
+    os.replace(manifest_tmp, manifest_path)
+
+    embeddings_npy = np.load(embeddings_npy_path, mmap_mode="r")
+    print(f"Saved embeddings to {embeddings_npy_path} with shape {embeddings_npy.shape}")
+
+    # Torch copy for the API's legacy fallback path
+    embeddings_path = OUT_DIR / "embeddings.pt"
+    torch.save(torch.from_numpy(np.load(embeddings_npy_path, mmap_mode="c")), embeddings_path)
+
+    # Memory-mapped store the API opens at startup (STORE_DTYPE=float16 halves it)
+    store_path = OUT_DIR / "embeddings.bin"
+    write_store(store_path, embeddings_npy, catalog,
+                catalog_fingerprint(catalog_bytes, MODEL_NAME, encoder_backend, TEMPLATE_TAG),
+                dtype=os.getenv("STORE_DTYPE", "float32"))
+    print(f"Saved embedding store to {store_path}")
+
+    # Build the approximate index the API will load (INDEX_BACKEND=ivf|hnsw)
+    backend = os.getenv("INDEX_BACKEND", "exact")
+    if backend in INDEX_FILES:
+        print(f"Building {backend} index...")
+        index = build_index(backend, embeddings_npy)
+        index_path = OUT_DIR / INDEX_FILES[backend]
+        index.save(index_path)
+        print(f"Saved {backend} index to {index_path}")
+
+    print(f"Complete! Embedded {len(catalog)} assessments successfully")
+
+
+# The process pool re-imports this module in its workers
+if __name__ == "__main__":
+    main()
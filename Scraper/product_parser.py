@@ -0,0 +1,116 @@
+"""
+Product page parser for the scraper
+
+The old extraction re-scanned the whole tree for every field: one find()
+per heading and one get_text() each for test type, duration, remote and
+adaptive. Here the page text is built once and headings are collected once,
+and every field is read from those. With lxml installed both passes run in
+C; otherwise a single walk over BeautifulSoup's html.parser tree does both.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # pragma: no cover - lxml is optional
+    lxml_html = None
+
+_TEST_TYPE = re.compile(r'Test Type:\s*([A-Z])', re.I)
+_LENGTH = re.compile(r'Completion Time in minutes\s*=\s*(\d+)')
+
+# field -> (heading text, heading tags, separator for the following <p>'s strings)
+_SECTIONS = {
+    'description': ('Description', ('h4', 'h5', 'h3'), ' '),
+    'job_levels': ('Job levels', ('h4', 'h5'), ', '),
+    'languages': ('Languages', ('h4', 'h5'), ', '),
+}
+_HEADINGS = frozenset(t for _, tags, _ in _SECTIONS.values() for t in tags)
+# Content BeautifulSoup leaves out of get_text()
+_NON_TEXT = ('script', 'style', 'template')
+
+
+def _lxml_fields(html: str) -> Tuple[Optional[str], str, Dict[str, List[str]]]:
+    root = lxml_html.document_fromstring(html)
+    title = root.find('.//title')
+    title_text = title.text_content() if title is not None else None
+    etree.strip_elements(root, *_NON_TEXT, with_tail=False)
+    text = ''.join(root.itertext())
+
+    sections: Dict[str, List[str]] = {}
+    for heading in root.iter(*_HEADINGS):
+        pending = [f for f in _SECTIONS if f not in sections and heading.tag in _SECTIONS[f][1]]
+        if not pending:
+            continue
+        heading_text = heading.text_content()
+        for field in pending:
+            if _SECTIONS[field][0] not in heading_text:
+                continue
+            sections[field] = []
+            for sibling in heading.itersiblings():
+                if sibling.tag == 'p':
+                    sections[field] = [s.strip() for s in sibling.itertext() if s.strip()]
+                    break
+        if len(sections) == len(_SECTIONS):
+            break
+    return title_text, text, sections
+
+
+def _soup_fields(html: str) -> Tuple[Optional[str], str, Dict[str, List[str]]]:
+    from bs4 import BeautifulSoup, CData, NavigableString, Tag
+
+    soup = BeautifulSoup(html, 'html.parser')
+    title = None
+    parts = []
+    headings = []
+    for node in soup.descendants:
+        if isinstance(node, Tag):
+            if node.name in _HEADINGS:
+                headings.append(node)
+            elif node.name == 'title' and title is None:
+                title = node
+        elif type(node) in (NavigableString, CData):
+            parts.append(node)
+
+    sections: Dict[str, List[str]] = {}
+    for field, (label, tags, _) in _SECTIONS.items():
+        for heading in headings:
+            if heading.name in tags and label in heading.get_text():
+                following = heading.find_next_sibling('p')
+                sections[field] = list(following.stripped_strings) if following else []
+                break
+    return (title.get_text() if title is not None else None), ''.join(parts), sections
+
+
+def parse_product(html: str, name: str, full_url: str) -> dict:
+    """Catalog record for one product page; name is the listing link text"""
+    if lxml_html is not None and html.strip():
+        title_text, text, sections = _lxml_fields(html)
+    else:
+        title_text, text, sections = _soup_fields(html)
+
+    title_name = title_text.split(' | ')[0].strip() if title_text is not None else name
+    description, job_levels, languages = (
+        _SECTIONS[f][2].join(sections.get(f, [])) for f in ('description', 'job_levels', 'languages'))
+
+    test_match = _TEST_TYPE.search(text)
+    length_match = _LENGTH.search(text)
+
+    # Build categories
+    categories = []
+    if description:
+        categories = [t.strip() for t in re.split(r'[,;]', description) if len(t.strip()) > 5][:5]
+
+    return {
+        'name': title_name,
+        'url': full_url,
+        'description': description[:500],
+        'test_type': test_match.group(1).upper() if test_match else '',
+        'job_levels': job_levels,
+        'languages': languages,
+        'length_minutes': length_match.group(1) if length_match else '',
+        'remote_testing': 'Yes' if 'Remote Testing:' in text else 'No',
+        'adaptive_support': 'Yes' if 'Adaptive' in text else 'No',
+        'categories': categories
+    }
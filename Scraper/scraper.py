@@ -1,123 +1,273 @@
 import requests
 from bs4 import BeautifulSoup
 import json
+import os
 import re
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlsplit
 
-base_url = "https://www.shl.com"
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from product_parser import parse_product
+
+base_url = os.getenv("SCRAPE_BASE_URL", "https://www.shl.com").rstrip("/")
 headers = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 }
 
-catalog = []
-scraped_urls = set()
+MAX_PAGES = int(os.getenv("SCRAPE_MAX_PAGES", "50"))
+WORKERS = int(os.getenv("SCRAPE_WORKERS", "8"))
+# Sustained requests per second per host, and how many may go out back to back
+RATE = float(os.getenv("SCRAPE_RATE", "2"))
+BURST = int(os.getenv("SCRAPE_BURST", "4"))
+TIMEOUT = float(os.getenv("SCRAPE_TIMEOUT", "10"))
+
+OUTPUT_PATH = Path(os.getenv("SCRAPE_OUTPUT", Path(__file__).parent.parent / "final_catalog.json"))
+CHECKPOINT_PATH = Path(os.getenv("SCRAPE_CHECKPOINT", Path(__file__).parent / "checkpoint.jsonl"))
+
+
+class TokenBucket:
+    """Blocking token bucket: rate tokens per second, up to burst saved up"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Crawler:
+    """Pooled session shared by all workers, rate limited per host"""
+
+    def __init__(self, workers: int = WORKERS, rate: float = RATE, burst: int = BURST):
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        retry = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504],
+                      allowed_methods=["GET"], respect_retry_after_header=True)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=workers, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.rate = rate
+        self.burst = burst
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    def _bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc.lower()
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.buckets[host] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    def get(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """GET url, conditional on the validators from an earlier crawl"""
+        conditional = {}
+        if etag:
+            conditional['If-None-Match'] = etag
+        if last_modified:
+            conditional['If-Modified-Since'] = last_modified
+        self._bucket(url).acquire()
+        return self.session.get(url, headers=conditional, timeout=TIMEOUT)
+
+
+class Checkpoint:
+    """Append-only JSONL log of product pages, so a crashed crawl can resume
+
+    The first line is a crawl header, and every record carries the id of the
+    crawl that wrote it. While the header says the crawl is incomplete, pages
+    this crawl already logged are reused without a request. Records of
+    earlier crawls only lend their ETag/Last-Modified to conditional requests.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.records: Dict[str, dict] = {}
+        self.crawl_id: Optional[float] = None
+        self.resuming = False
+        self.lock = threading.Lock()
+        self._file = None
+        if path.exists():
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn final line from a crash
+                    if 'url' in rec:
+                        self.records[rec['url']] = rec
+                    elif 'crawl' in rec:
+                        self.crawl_id = rec['crawl']
+                        self.resuming = not rec.get('complete', False)
+
+    def done(self, url: str) -> Optional[dict]:
+        """Record scraped earlier in this (resumed) crawl"""
+        rec = self.records.get(url)
+        if self.resuming and rec is not None and rec.get('crawl') == self.crawl_id:
+            return rec
+        return None
+
+    def resumed(self) -> int:
+        """Pages the interrupted crawl already scraped"""
+        return sum(1 for url in self.records if self.done(url) is not None)
+
+    def validators(self, url: str) -> Optional[dict]:
+        return self.records.get(url)
+
+    def _rewrite(self, complete: bool, urls=None) -> None:
+        tmp = self.path.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'crawl': self.crawl_id, 'complete': complete}) + '\n')
+            for url, rec in self.records.items():
+                if urls is None or url in urls:
+                    f.write(json.dumps(rec, ensure_ascii=False) + '\n')
+        os.replace(tmp, self.path)
+
+    def open(self) -> None:
+        if not self.resuming:
+            self.crawl_id = time.time()
+            self._rewrite(complete=False)
+        self._file = open(self.path, 'a', encoding='utf-8')
 
-# Scrape individual test solutions (type=1)
-print("Scraping individual test solutions...")
-for page in range(50):  # Increase range to get all items
-    start = page * 12
-    url = f"https://www.shl.com/products/product-catalog/?start={start}&type=1"
+    def record(self, url: str, etag: Optional[str], last_modified: Optional[str], item: dict) -> None:
+        rec = {'url': url, 'crawl': self.crawl_id, 'etag': etag, 'last_modified': last_modified, 'item': item}
+        line = json.dumps(rec, ensure_ascii=False) + '\n'
+        with self.lock:
+            self.records[url] = rec
+            self._file.write(line)
+            self._file.flush()
+
+    def finish(self, urls) -> None:
+        """Mark the crawl complete, dropping products that are no longer listed"""
+        self._file.close()
+        self._rewrite(complete=True, urls=set(urls))
+
+
+def scrape_product(crawler: Crawler, checkpoint: Checkpoint, name: str, full_url: str) -> Optional[dict]:
+    done = checkpoint.done(full_url)
+    if done is not None:
+        return done['item']
+    previous = checkpoint.validators(full_url)
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        if resp.status_code != 200:
-            print(f"Skip page {page}: {resp.status_code}")
-            continue
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        
-        links = soup.find_all('a', href=re.compile(r'/products/product-catalog/view/'))
-        
-        if not links:
-            print(f"No more items found at page {page}")
-            break
-            
-        for link in links:
-            href = link.get('href', '')
-            if '/view/' not in href or href in scraped_urls:
+        if previous is not None:
+            resp = crawler.get(full_url, previous.get('etag'), previous.get('last_modified'))
+        else:
+            resp = crawler.get(full_url)
+        if resp.status_code == 304 and previous is not None:
+            item = previous['item']
+            print(f"Unchanged: {name[:50]}")
+        elif resp.status_code == 200:
+            print(f"Scraped: {name[:50]}... | URL: {full_url}")
+            item = parse_product(resp.text, name, full_url)
+        else:
+            print(f"Error scraping {full_url}: HTTP {resp.status_code}")
+            return previous['item'] if previous is not None else None
+    except Exception as e:
+        print(f"Error scraping {full_url}: {e}")
+        return previous['item'] if previous is not None else None
+    checkpoint.record(full_url, resp.headers.get('ETag'), resp.headers.get('Last-Modified'), item)
+    return item
+
+
+def iter_products() -> Iterator[dict]:
+    """Product records in discovery order, yielded while the crawl is still running"""
+    crawler = Crawler()
+    checkpoint = Checkpoint(CHECKPOINT_PATH)
+    if checkpoint.resuming:
+        print(f"Resuming crawl: {checkpoint.resumed()} product pages already scraped")
+    checkpoint.open()
+
+    scraped_urls = set()
+    listed = []
+    pending = deque()
+    produced = 0
+    # Scrape individual test solutions (type=1): listing pages in order, product pages on the pool
+    print("Scraping individual test solutions...")
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        for page in range(MAX_PAGES):
+            start = page * 12
+            url = f"{base_url}/products/product-catalog/?start={start}&type=1"
+            try:
+                resp = crawler.get(url)
+            except requests.RequestException as e:
+                print(f"Skip page {page}: {e}")
                 continue
-            name = link.get_text(strip=True)
-            if not name:
+            if resp.status_code != 200:
+                print(f"Skip page {page}: {resp.status_code}")
                 continue
-            
-            full_url = base_url + href if href.startswith('/') else href
-            scraped_urls.add(href)
-            
-            print(f"Scraping: {name[:50]}... | URL: {full_url}")
-            
-            try:
-                view_resp = requests.get(full_url, headers=headers, timeout=10)
-                view_soup = BeautifulSoup(view_resp.text, 'html.parser')
-                
-                # Extract title
-                title_name = view_soup.title.text.split(' | ')[0].strip() if view_soup.title else name
-                
-                # Extract description
-                desc_elem = view_soup.find(lambda tag: tag.name in ['h4', 'h5', 'h3'] and 'Description' in tag.get_text()) if view_soup else None
-                description = ''
-                if desc_elem:
-                    next_p = desc_elem.find_next_sibling('p')
-                    description = ' '.join(next_p.stripped_strings) if next_p else ''
-                
-                # Extract test type
-                test_type = ''
-                if not test_type and view_soup:
-                    test_match = re.search(r'Test Type:\s*([A-Z])', view_soup.get_text(), re.I)
-                    test_type = test_match.group(1).upper() if test_match else ''
-                
-                # Extract job levels
-                job_elem = view_soup.find(lambda tag: tag.name in ['h4', 'h5'] and 'Job levels' in tag.get_text()) if view_soup else None
-                job_levels = ''
-                if job_elem:
-                    next_p = job_elem.find_next_sibling('p')
-                    job_levels = ', '.join(next_p.stripped_strings) if next_p else ''
-                
-                # Extract languages
-                lang_elem = view_soup.find(lambda tag: tag.name in ['h4', 'h5'] and 'Languages' in tag.get_text()) if view_soup else None
-                languages = ''
-                if lang_elem:
-                    next_p = lang_elem.find_next_sibling('p')
-                    languages = ', '.join(next_p.stripped_strings) if next_p else ''
-                
-                # Extract duration
-                length_match = re.search(r'Completion Time in minutes\s*=\s*(\d+)', view_soup.get_text()) if view_soup else None
-                length = length_match.group(1) if length_match else ''
-                
-                # Extract remote support
-                remote = 'Yes' if view_soup and 'Remote Testing:' in view_soup.get_text() else 'No'
-                
-                # Extract adaptive support
-                adaptive = 'Yes' if view_soup and 'Adaptive' in view_soup.get_text() else 'No'
-                
-                # Build categories
-                categories = []
-                if description:
-                    categories = [t.strip() for t in re.split(r'[,;]', description) if len(t.strip()) > 5][:5]
-                
-                catalog.append({
-                    'name': title_name,
-                    'url': full_url,
-                    'description': description[:500],
-                    'test_type': test_type,
-                    'job_levels': job_levels,
-                    'languages': languages,
-                    'length_minutes': length,
-                    'remote_testing': remote,
-                    'adaptive_support': adaptive,
-                    'categories': categories
-                })
-                
-                time.sleep(1)
-            except Exception as e:
-                print(f"Error scraping {full_url}: {e}")
-                time.sleep(1)
-    
-    time.sleep(2)
-
-# Save catalog
-output_path = Path(__file__).parent.parent / "api" / "final_catalog.json"
-with open(output_path, 'w') as f:
-    json.dump(catalog, f, indent=2)
-    
-print(f"\nFinal: {len(catalog)} assessments scraped")
-print(f"Test types found: {set(i['test_type'] for i in catalog if i['test_type'])}")
-print(f"Catalog saved to {output_path}")
+            soup = BeautifulSoup(resp.text, 'html.parser')
+
+            links = soup.find_all('a', href=re.compile(r'/products/product-catalog/view/'))
+
+            if not links:
+                print(f"No more items found at page {page}")
+                break
+
+            for link in links:
+                href = link.get('href', '')
+                if '/view/' not in href or href in scraped_urls:
+                    continue
+                name = link.get_text(strip=True)
+                if not name:
+                    continue
+
+                full_url = base_url + href if href.startswith('/') else href
+                scraped_urls.add(href)
+                listed.append(full_url)
+                pending.append(pool.submit(scrape_product, crawler, checkpoint, name, full_url))
+
+            # Hand finished pages downstream while later listing pages are fetched
+            while pending and pending[0].done():
+                item = pending.popleft().result()
+                if item is not None:
+                    produced += 1
+                    yield item
+
+        while pending:
+            item = pending.popleft().result()
+            if item is not None:
+                produced += 1
+                yield item
+
+    if produced:
+        checkpoint.finish(listed)
+
+
+def crawl() -> list:
+    # Discovery order, as the sequential scraper produced
+    return list(iter_products())
+
+
+if __name__ == "__main__":
+    catalog = crawl()
+    if not catalog:
+        raise SystemExit("No assessments scraped; keeping the existing catalog")
+
+    # Save catalog
+    tmp_path = OUTPUT_PATH.with_suffix('.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(catalog, f, indent=2)
+    os.replace(tmp_path, OUTPUT_PATH)
+
+    print(f"\nFinal: {len(catalog)} assessments scraped")
+    print(f"Test types found: {set(i['test_type'] for i in catalog if i['test_type'])}")
+    print(f"Catalog saved to {OUTPUT_PATH}")
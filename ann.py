@@ -0,0 +1,210 @@
+"""
+Approximate nearest-neighbour backends for large catalogs
+
+Every backend exposes the same surface as scoring.ScoringIndex:
+``searcher(q)`` returns a callable ``n -> (ids, scores)`` and
+``searchers(Q)`` does the same for a batch of queries.
+"""
+
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from scoring import ScoringIndex, Search, _to_numpy, top_indices
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+BACKENDS = ("exact", "ivf", "hnsw")
+INDEX_FILES = {"ivf": "index_ivf.npz", "hnsw": "index_hnsw.bin"}
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+
+def _assign(x: np.ndarray, centroids: np.ndarray, chunk: int = 8192) -> np.ndarray:
+    """Nearest centroid (by inner product) for every row, in bounded-memory chunks"""
+    out = np.empty(x.shape[0], dtype=np.int64)
+    for start in range(0, x.shape[0], chunk):
+        out[start:start + chunk] = np.argmax(x[start:start + chunk] @ centroids.T, axis=1)
+    return out
+
+
+def spherical_kmeans(x: np.ndarray, k: int, iters: int = 15, seed: int = 0) -> np.ndarray:
+    """Unit-norm centroids for cosine clustering"""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(x.shape[0], k, replace=False)].copy()
+    for _ in range(iters):
+        assign = _assign(x, centroids)
+        counts = np.bincount(assign, minlength=k)
+        order = np.argsort(assign, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        nonempty = counts > 0
+        sums = np.zeros_like(centroids)
+        sums[nonempty] = np.add.reduceat(x[order], starts[nonempty], axis=0)
+        empty = ~nonempty
+        if empty.any():
+            # Re-seed empty clusters from random points
+            sums[empty] = x[rng.choice(x.shape[0], int(empty.sum()), replace=False)]
+        centroids = _normalize(sums).astype(np.float32)
+    return centroids
+
+
+class IVFIndex:
+    """Inverted-file index: k-means lists, probe the closest ones, score exactly inside"""
+
+    backend = "ivf"
+
+    def __init__(self, matrix, centroids: np.ndarray, assign: np.ndarray, nprobe: int = 8):
+        matrix = np.asarray(_to_numpy(matrix), dtype=np.float32)
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.assign = np.asarray(assign, dtype=np.int64)
+        self.nprobe = max(1, nprobe)
+        # Rows are stored grouped by list so each probe is a contiguous slice
+        self.ids = np.argsort(self.assign, kind="stable")
+        self.rows = np.ascontiguousarray(matrix[self.ids])
+        counts = np.bincount(self.assign, minlength=len(self.centroids))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def __len__(self) -> int:
+        return self.rows.shape[0]
+
+    @classmethod
+    def build(cls, matrix, nlist: Optional[int] = None, nprobe: int = 8,
+              train_size: int = 50_000, seed: int = 0) -> "IVFIndex":
+        x = np.ascontiguousarray(_to_numpy(matrix), dtype=np.float32)
+        n = x.shape[0]
+        nlist = nlist or max(1, int(4 * np.sqrt(n)))
+        nlist = min(nlist, n)
+        rng = np.random.default_rng(seed)
+        sample = x if n <= train_size else x[rng.choice(n, train_size, replace=False)]
+        centroids = spherical_kmeans(sample, nlist, seed=seed)
+        return cls(x, centroids, _assign(x, centroids), nprobe=nprobe)
+
+    def save(self, path: Path) -> None:
+        np.savez(path, centroids=self.centroids, assign=self.assign, nprobe=self.nprobe)
+
+    @classmethod
+    def load(cls, path: Path, matrix, nprobe: Optional[int] = None) -> "IVFIndex":
+        data = np.load(path)
+        if data["assign"].shape[0] != len(matrix):
+            raise ValueError(f"{path} was built for {data['assign'].shape[0]} items, catalog has {len(matrix)}")
+        return cls(matrix, data["centroids"], data["assign"], nprobe=nprobe or int(data["nprobe"]))
+
+    def searcher(self, q_emb) -> Search:
+        q = np.ascontiguousarray(_to_numpy(q_emb).reshape(-1), dtype=np.float32)
+        list_order = np.argsort(self.centroids @ q)[::-1]
+
+        def search(n: int):
+            n = min(n, len(self))
+            probes = self.nprobe
+            # Probe more lists until they hold at least n items
+            while True:
+                lists = list_order[:probes]
+                if self.offsets[lists + 1].sum() - self.offsets[lists].sum() >= n or probes >= len(list_order):
+                    break
+                probes *= 2
+            pos = np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists])
+            scores = self.rows[pos] @ q
+            top = top_indices(scores, n)
+            return self.ids[pos[top]], scores[top]
+
+        return search
+
+    def searchers(self, q_embs) -> List[Search]:
+        return [self.searcher(q) for q in np.atleast_2d(_to_numpy(q_embs))]
+
+
+class HNSWIndex:
+    """Graph index backed by the optional hnswlib package"""
+
+    backend = "hnsw"
+
+    def __init__(self, index, ef: int = 64):
+        self.index = index
+        self.ef = ef
+
+    def __len__(self) -> int:
+        return self.index.get_current_count()
+
+    @staticmethod
+    def _require():
+        if hnswlib is None:
+            raise ImportError("INDEX_BACKEND=hnsw needs the hnswlib package (pip install hnswlib)")
+
+    @classmethod
+    def build(cls, matrix, m: int = 16, ef_construction: int = 200, ef: int = 64) -> "HNSWIndex":
+        cls._require()
+        x = np.ascontiguousarray(_to_numpy(matrix), dtype=np.float32)
+        index = hnswlib.Index(space="ip", dim=x.shape[1])
+        index.init_index(max_elements=x.shape[0], ef_construction=ef_construction, M=m)
+        index.add_items(x, np.arange(x.shape[0]))
+        return cls(index, ef=ef)
+
+    def save(self, path: Path) -> None:
+        self.index.save_index(str(path))
+
+    @classmethod
+    def load(cls, path: Path, matrix, ef: int = 64) -> "HNSWIndex":
+        cls._require()
+        index = hnswlib.Index(space="ip", dim=matrix.shape[1])
+        index.load_index(str(path), max_elements=matrix.shape[0])
+        if index.get_current_count() != matrix.shape[0]:
+            raise ValueError(f"{path} was built for {index.get_current_count()} items, catalog has {matrix.shape[0]}")
+        return cls(index, ef=ef)
+
+    def searcher(self, q_emb) -> Search:
+        q = np.ascontiguousarray(_to_numpy(q_emb).reshape(1, -1), dtype=np.float32)
+
+        def search(n: int):
+            n = min(n, len(self))
+            self.index.set_ef(max(self.ef, n))
+            labels, dists = self.index.knn_query(q, k=n)
+            # hnswlib's "ip" distance is 1 - dot product
+            return labels[0].astype(np.int64), 1.0 - dists[0]
+
+        return search
+
+    def searchers(self, q_embs) -> List[Search]:
+        return [self.searcher(q) for q in np.atleast_2d(_to_numpy(q_embs))]
+
+
+def build_index(backend: str, matrix, **kwargs):
+    if backend == "exact":
+        return ScoringIndex(matrix, **kwargs)
+    if backend == "ivf":
+        return IVFIndex.build(matrix, **kwargs)
+    if backend == "hnsw":
+        return HNSWIndex.build(matrix, **kwargs)
+    raise ValueError(f"Unknown index backend {backend!r}; expected one of {BACKENDS}")
+
+
+def load_index(backend: str, matrix, directory: Path, dtype: str = "float32"):
+    """Open the persisted index for backend, rebuilding it if missing or stale"""
+    if backend == "exact":
+        return ScoringIndex(matrix, dtype=dtype)
+    matrix = np.ascontiguousarray(_to_numpy(matrix), dtype=np.float32)
+    path = Path(directory) / INDEX_FILES[backend]
+    if backend == "ivf":
+        nprobe = int(os.getenv("IVF_NPROBE", "8"))
+        if path.exists():
+            try:
+                return IVFIndex.load(path, matrix, nprobe=nprobe)
+            except ValueError as e:
+                print(f"Rebuilding IVF index: {e}")
+        return IVFIndex.build(matrix, nprobe=nprobe)
+    if backend == "hnsw":
+        ef = int(os.getenv("HNSW_EF", "64"))
+        if path.exists():
+            try:
+                return HNSWIndex.load(path, matrix, ef=ef)
+            except ValueError as e:
+                print(f"Rebuilding HNSW index: {e}")
+        return HNSWIndex.build(matrix, ef=ef)
+    raise ValueError(f"Unknown index backend {backend!r}; expected one of {BACKENDS}")
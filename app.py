@@ -1,37 +1,79 @@
+import asyncio
+import itertools
 import json
 import os
 import re
+import threading
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
 
-import torch
-from fastapi import FastAPI, HTTPException
+import numpy as np
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
-from sentence_transformers import SentenceTransformer, util
+
+from ann import load_index
+from cache import SemanticCache, TTLCache, file_fingerprint, normalize_query
+from catalog import CompactCatalog
+from chunking import mean_pool, split_windows, token_spans
+from catalogs import DEFAULT_CATALOG, CatalogRegistry, CatalogSpec, load_specs
+from embed_text import TEMPLATE_TAG, item_text
+from encoder import BatchingEncoder, backend_tag, load_encoder
+from fetcher import JDFetcher
+from filters import CatalogAttributes, Constraints, extract_constraints
+from hybrid import HybridRetriever
+from metrics import registry, stage, start_request, timed
+from rerank import Reranker, load_reranker
+from skills import load_detector
+from scoring import ScoringIndex, Search, iter_ranked, masked_search, ranked_search
+from store import EmbeddingStore, StoreMismatch, catalog_fingerprint, current_version, write_store
 
 BASE_DIR = Path(__file__).parent
 WEB_DIR = BASE_DIR / "web"
 CATALOG_PATH = BASE_DIR / "final_catalog.json"
 EMBED_PATH = BASE_DIR / "embeddings.pt"
+STORE_PATH = BASE_DIR / "embeddings.bin"
+# Versioned artifact sets published by pipeline.py; the files above are the fallback
+ARTIFACT_DIR = Path(os.getenv("ARTIFACT_DIR", BASE_DIR / "artifacts"))
+MODEL_NAME = "all-MiniLM-L6-v2"
 
-app = FastAPI(title="SHL Recommender")
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-model = SentenceTransformer("all-MiniLM-L6-v2")
-
-with open(CATALOG_PATH, "r", encoding="utf-8") as f:
-    catalog: List[dict] = json.load(f)
-
-print(f"Loaded {len(catalog)} assessments from catalog")
+# Exact scan by default; INDEX_BACKEND=ivf|hnsw loads the index built by Embed.py
+INDEX_BACKEND = os.getenv("INDEX_BACKEND", "exact")
+# RETRIEVAL=hybrid fuses BM25 and keyword boosts into the semantic scores
+RETRIEVAL = os.getenv("RETRIEVAL", "semantic")
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "200"))
+# QUERY_CONSTRAINTS=filter restricts candidates to durations/levels stated in the query
+QUERY_CONSTRAINTS = os.getenv("QUERY_CONSTRAINTS", "filter")
+# PRELOAD=0 defers loading to the first request; WARMUP=0 skips the dummy encodes
+PRELOAD = os.getenv("PRELOAD", "1") == "1"
+WARMUP = os.getenv("WARMUP", "1") == "1"
+# Poll for newly published artifacts every N seconds (0 disables the watcher)
+RELOAD_POLL_SECONDS = float(os.getenv("RELOAD_POLL_SECONDS", "10"))
+# Shared secret for POST /admin/reload; the endpoint is disabled when unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# RERANK_TOP_N>0 reorders that many /recommend candidates with a cross-encoder,
+# if it finishes within RERANK_BUDGET_MS of the request arriving
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "0"))
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "100"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "20000"))
+# Skill vocabulary generated by skills.py, plus an optional file of extra terms
+SKILL_VOCABULARY = Path(os.getenv("SKILL_VOCABULARY", BASE_DIR / "skill_vocabulary.json"))
+SKILL_VOCABULARY_EXTRA = os.getenv("SKILL_VOCABULARY_EXTRA", "")
+# Queries longer than the model reads: truncate (model.encode cuts them), or split into
+# overlapping windows encoded in one batch and pooled with max (best window per item)
+# or mean (token-weighted mean embedding)
+LONG_QUERY = os.getenv("LONG_QUERY", "truncate")
+LONG_QUERY_OVERLAP = int(os.getenv("LONG_QUERY_OVERLAP", "32"))
+LONG_QUERY_MAX_CHUNKS = int(os.getenv("LONG_QUERY_MAX_CHUNKS", "8"))
+# JSON file naming extra catalogs to serve next to the default one (see catalogs.py)
+CATALOGS = os.getenv("CATALOGS", "")
+# Loaded catalogs are evicted, least recently used first, above this total (0 = no cap)
+CATALOG_MEMORY_MB = float(os.getenv("CATALOG_MEMORY_MB", "0"))
 
 
 def _item_text(item: dict) -> str:
@@ -48,73 +90,494 @@ def _item_text(item: dict) -> str:
     return " ".join([p for p in parts if p])
 
 
-# Load or generate embeddings
-if EMBED_PATH.exists():
-    embeddings = torch.load(EMBED_PATH)
-    print(f"Loaded embeddings with shape {embeddings.shape}")
-else:
-    print("Generating embeddings...")
-    texts = [_item_text(it) for it in catalog]
-    embeddings = model.encode(texts, convert_to_tensor=True, normalize_embeddings=True)
-    torch.save(embeddings, EMBED_PATH)
-    print(f"Saved embeddings with shape {embeddings.shape}")
+def _load_catalog_and_embeddings(model, directory: Path = BASE_DIR, model_name: str = MODEL_NAME):
+    """Load catalog + embedding matrix, preferring the memory-mapped store"""
+    # embeddings.bin is shared across workers via the page cache; without one,
+    # fall back to embeddings.pt and then to re-embedding, and write the store
+    store_path = directory / STORE_PATH.name
+    embed_path = directory / EMBED_PATH.name
+    catalog_bytes = (directory / CATALOG_PATH.name).read_bytes()
+    backend = backend_tag(model)
+    fingerprint = catalog_fingerprint(catalog_bytes, model_name, backend, TEMPLATE_TAG)
+    try:
+        store = EmbeddingStore.open(store_path, fingerprint, dim=model.get_sentence_embedding_dimension())
+        print(f"Mapped embedding store with shape {store.matrix.shape}")
+        return store.records, store.matrix
+    except FileNotFoundError as e:
+        print(f"Embedding store unavailable: {e}")
+        trust_pt = True
+    except StoreMismatch as e:
+        # embeddings.pt is written with the store, so it is as stale as the
+        # store; with the same row count it would pass as current
+        print(f"Embedding store unavailable: {e}")
+        trust_pt = False
+    # Stub vectors are for load tests; on disk they would pass for real ones
+    # (embeddings.pt has no fingerprint), so they are only kept in memory
+    persist = backend != "stub"
+    if persist:
+        # Only the fallback needs torch; workers serving from the store with
+        # the ONNX encoder never import it
+        import torch
+
+    catalog: List[dict] = json.loads(catalog_bytes)
+    embeddings = None
+    if embed_path.exists() and trust_pt and persist:
+        embeddings = torch.load(embed_path).cpu().numpy()
+        print(f"Loaded embeddings with shape {embeddings.shape}")
+        if embeddings.shape[0] != len(catalog):
+            print("Embeddings do not match the catalog, re-embedding")
+            embeddings = None
+    if embeddings is None:
+        print("Generating embeddings...")
+        # The template Embed.py uses, so the store holds the same vectors whoever wrote it
+        texts = [item_text(it) for it in catalog]
+        embeddings = model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+        if not persist:
+            return catalog, embeddings
+        torch.save(torch.from_numpy(embeddings), embed_path)
+        print(f"Saved embeddings with shape {embeddings.shape}")
+    try:
+        write_store(store_path, embeddings, catalog, fingerprint)
+        print(f"Wrote embedding store to {store_path}")
+    except OSError as e:
+        print(f"Could not write embedding store: {e}")
+    return catalog, embeddings
+
+
+def _artifact_source(root: Path = ARTIFACT_DIR, fallback: Path = BASE_DIR) -> tuple:
+    """Where the current artifacts live, plus a cheap change marker for them"""
+    directory = current_version(root)
+    if directory is not None:
+        return directory, directory.name
+    return fallback, file_fingerprint([fallback / CATALOG_PATH.name, fallback / EMBED_PATH.name])
+
+
+def _catalog_source(spec: CatalogSpec) -> tuple:
+    """_artifact_source for a named catalog; its directory may be a published artifact root"""
+    if spec.directory is None:
+        return _artifact_source()
+    return _artifact_source(spec.directory, spec.directory)
+
+
+class Snapshot:
+    """Immutable catalog + index view; requests hold one from start to finish"""
+
+    def __init__(self, generation: int, source, directory: Path, catalog, index, hybrid,
+                 attributes: CatalogAttributes, name: str = DEFAULT_CATALOG, model_name: str = MODEL_NAME):
+        self.generation = generation
+        self.name = name
+        self.model_name = model_name
+        self.source = source
+        self.directory = directory
+        self.catalog = catalog if isinstance(catalog, CompactCatalog) else CompactCatalog(catalog)
+        self.index = index
+        self.hybrid: Optional[HybridRetriever] = hybrid
+        self.attributes = attributes
+
+    @property
+    def version(self) -> str:
+        return self.directory.name if self.directory != BASE_DIR else "local"
+
+
+# Tech and soft skill terms, matched as whole words in one pass
+skill_detector = load_detector(SKILL_VOCABULARY, SKILL_VOCABULARY_EXTRA)
+
+# Generations are unique across catalogs, so cache keys built from them never collide
+_generations = itertools.count(1)
+
+
+def _build_snapshot(model, spec: CatalogSpec) -> Snapshot:
+    directory, source = _catalog_source(spec)
+    catalog, embeddings = _load_catalog_and_embeddings(model, directory, spec.model)
+    print(f"Loaded {len(catalog)} assessments from {directory} into catalog {spec.name}")
+    index = load_index(INDEX_BACKEND, embeddings, directory,
+                       dtype=os.getenv("SCORE_DTYPE", "float32"))
+    print(f"Using {INDEX_BACKEND} index over {len(index)} items")
+    # Each pass decodes one record at a time; a store-backed catalog is never
+    # held decoded, so workers share its records through the page cache
+    attributes = CatalogAttributes(catalog)
+    hybrid = None
+    if RETRIEVAL == "hybrid":
+        texts, boost_texts = [], []
+        for it in catalog:
+            texts.append(_item_text(it))
+            boost_texts.append(f"{it.get('name', '')} {it.get('description', '')}")
+        hybrid = HybridRetriever(texts, boost_texts=boost_texts, detector=skill_detector)
+        print("Using hybrid BM25 + semantic retrieval")
+    return Snapshot(next(_generations), source, directory, CompactCatalog(catalog), index, hybrid,
+                    attributes, name=spec.name, model_name=spec.model)
+
+
+class Resources:
+    """Shared encoders plus the catalog snapshots, loaded at startup or on first use"""
+
+    def __init__(self):
+        # One model and batching encoder per model name, shared by every catalog using it
+        self.models: Dict[str, object] = {}
+        self.encoders: Dict[str, BatchingEncoder] = {}
+        self.reranker: Optional[Reranker] = None
+        self.catalogs = CatalogRegistry(load_specs(CATALOGS, MODEL_NAME), self._build,
+                                        memory_cap=int(CATALOG_MEMORY_MB * 2**20), shared=(skill_detector,))
+        self.ready = False
+        self.warm = False
+        self.error: Optional[str] = None
+        self.reload_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._model_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """Model of the default catalog"""
+        return self.models.get(self.catalogs.specs[DEFAULT_CATALOG].model)
+
+    @property
+    def encoder(self) -> Optional[BatchingEncoder]:
+        return self.encoders.get(self.catalogs.specs[DEFAULT_CATALOG].model)
+
+    @property
+    def snapshot(self) -> Optional[Snapshot]:
+        """Live snapshot of the default catalog, which is never evicted"""
+        return self.catalogs.peek(DEFAULT_CATALOG, touch=False)
+
+    def model_for(self, model_name: str):
+        """The shared model for model_name, loaded with its batching encoder on first use"""
+        model = self.models.get(model_name)
+        if model is not None:
+            return model
+        with self._model_lock:
+            if model_name not in self.models:
+                # Heavy imports stay out of the module import path;
+                # ENCODER_BACKEND=onnx swaps in the int8 ONNX encoder
+                model = load_encoder(model_name)
+                self.encoders[model_name] = BatchingEncoder(model)
+                self.models[model_name] = model
+            return self.models[model_name]
+
+    def _build(self, spec: CatalogSpec) -> Snapshot:
+        return _build_snapshot(self.model_for(spec.model), spec)
+
+    def load(self) -> "Resources":
+        """Blocking load of the default catalog; concurrent callers wait for the first one"""
+        if self.ready:
+            return self
+        with self._lock:
+            if self.ready:
+                return self
+            try:
+                self.catalogs.get(DEFAULT_CATALOG)
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+                raise
+            if RERANK_TOP_N > 0:
+                try:
+                    self.reranker = load_reranker(RERANK_MODEL, top_n=RERANK_TOP_N, budget_ms=RERANK_BUDGET_MS,
+                                                  cache_size=RERANK_CACHE_SIZE)
+                    print(f"Reranking the top {RERANK_TOP_N} with {RERANK_MODEL} within {RERANK_BUDGET_MS:g} ms")
+                except Exception as e:
+                    print(f"Cross-encoder unavailable, serving bi-encoder order: {e}")
+            self.error = None
+            self.ready = True
+        return self
+
+    def reload(self, force: bool = False) -> List[str]:
+        """Rebuild each loaded catalog whose artifacts changed and swap it in
+
+        Returns the names of the catalogs swapped. Only one reload runs at a
+        time, and it builds one catalog at a time, so at most one snapshot
+        more than those being served is alive. Requests that started on an
+        old snapshot finish on it; it is freed when they drop it. A catalog
+        that fails to rebuild keeps its previous snapshot.
+        """
+        self.load()
+        swapped: List[Snapshot] = []
+        errors = []
+        with self._reload_lock:
+            for name in self.catalogs.loaded():
+                spec = self.catalogs.specs[name]
+                old = self.catalogs.peek(name, touch=False)
+                if old is None or (not force and _catalog_source(spec)[1] == old.source):
+                    continue
+                try:
+                    new = self._build(spec)
+                except Exception as e:
+                    errors.append(f"{name}: {type(e).__name__}: {e}")
+                    continue
+                self.catalogs.put(name, new)
+                swapped.append(new)
+            self.reload_error = "; ".join(errors) or None
+        if swapped:
+            result_cache.clear()
+            semantic_cache.clear()
+            if self.reranker is not None:
+                self.reranker.cache.clear()  # keyed by generation: the old entries can no longer hit
+        for new in swapped:
+            print(f"Swapped in artifacts {new.version} for catalog {new.name} (generation {new.generation})")
+        if errors:
+            raise RuntimeError(self.reload_error)
+        return [new.name for new in swapped]
+
+    def warm_up(self, rounds: int = 3) -> None:
+        """Run a few dummy encodes so the first real request is not the slow one"""
+        for n in range(1, rounds + 1):
+            self.model.encode(["java developer with teamwork skills"] * n, normalize_embeddings=True)
+        self.warm = True
+
+    async def ensure(self) -> "Resources":
+        """Wait for the resources without blocking the event loop"""
+        if not self.ready:
+            await asyncio.get_running_loop().run_in_executor(None, self.load)
+        return self
+
+    async def catalog(self, name: str) -> Snapshot:
+        """Snapshot of a named catalog, built off the event loop on first use"""
+        snap = self.catalogs.peek(name)
+        if snap is None:
+            snap = await asyncio.get_running_loop().run_in_executor(None, self.catalogs.get, name)
+        return snap
+
+
+resources = Resources()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load in the background so /health answers while the model is still loading
+    async def startup():
+        try:
+            await resources.ensure()
+            if WARMUP:
+                await asyncio.get_running_loop().run_in_executor(None, resources.warm_up)
+        except Exception as e:
+            print(f"Startup load failed: {e}")
+
+    async def watch():
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(RELOAD_POLL_SECONDS)
+            if not resources.ready:
+                continue
+            try:
+                await loop.run_in_executor(None, resources.reload)
+            except Exception as e:
+                print(f"Artifact reload failed, still serving the previous snapshot: {e}")
+
+    tasks = [asyncio.create_task(startup())] if PRELOAD else []
+    if RELOAD_POLL_SECONDS > 0:
+        tasks.append(asyncio.create_task(watch()))
+    yield
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+    for encoder in resources.encoders.values():
+        await encoder.stop()
+    if resources.reranker is not None:
+        resources.reranker.close()
+    await jd_fetcher.aclose()
+
+
+app = FastAPI(title="SHL Recommender", lifespan=lifespan)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Query caches; results are keyed by snapshot generation and dropped on reload
+embedding_cache = TTLCache(
+    maxsize=int(os.getenv("EMBED_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("CACHE_TTL_SECONDS", "3600")),
+)
+result_cache = TTLCache(
+    maxsize=int(os.getenv("RESULT_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("CACHE_TTL_SECONDS", "3600")),
+)
+# Near-duplicate queries (e.g. the same JD with small edits) reuse results
+# when their embeddings are at least this similar; 0 disables the layer
+semantic_cache = SemanticCache(
+    maxsize=int(os.getenv("SEMANTIC_CACHE_SIZE", "512")),
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.97")),
+    ttl=float(os.getenv("CACHE_TTL_SECONDS", "3600")),
+    # Fraction of hits recomputed to count false reuses
+    verify_rate=float(os.getenv("SEMANTIC_CACHE_VERIFY_RATE", "0.05")),
+)
+for _field in ("hits", "misses", "evictions"):
+    registry.describe(f"shl_cache_{_field}_total", "counter", f"Query cache {_field} by cache")
+registry.describe("shl_rerank_total", "counter", "Rerank attempts by outcome")
+registry.describe("shl_semantic_cache_verified_total", "counter", "Semantic cache hits recomputed to check them")
+registry.describe("shl_semantic_cache_false_reuse_total", "counter", "Verified semantic cache hits whose results differed")
+registry.describe("shl_catalog_memory_bytes", "gauge", "Memory of each loaded catalog, heap and mapped store pages")
+registry.describe("shl_catalog_loads_total", "counter", "Catalog snapshots built, including reloads")
+registry.describe("shl_catalog_evictions_total", "counter", "Catalogs evicted under CATALOG_MEMORY_MB")
+
+
+# Keyword boosts applied in hybrid mode (same weights as the eval scripts)
+TECH_BOOST = 0.25
+SOFT_BOOST = 0.3
 
 
 def detect_skill_domains(query: str) -> Dict[str, List[str]]:
     """Detect technical and soft skills from query"""
-    query_lower = query.lower()
-    
-    # Technical skills
-    tech_keywords = {
-        'java', 'python', 'javascript', 'sql', 'c++', 'csharp', '.net', 'golang',
-        'react', 'angular', 'vue', 'aws', 'azure', 'kubernetes', 'docker',
-        'html', 'css', 'frontend', 'backend', 'fullstack', 'devops'
-    }
-    
-    # Soft skills  
-    soft_keywords = {
-        'collaborate', 'collaboration', 'communication', 'teamwork', 'team',
-        'leadership', 'personality', 'behavior', 'emotional', 'intelligence',
-        'interpersonal', 'management', 'stakeholder', 'adaptability'
-    }
-    
-    detected_tech = [k for k in tech_keywords if k in query_lower]
-    detected_soft = [k for k in soft_keywords if k in query_lower]
-    
-    return {'tech': detected_tech, 'soft': detected_soft}
+    return skill_detector.detect(query)
 
 
-def get_balanced_recommendations(query: str, top_k: int = 10) -> List[Dict]:
-    """Get balanced recommendations across skill domains"""
-    
+def _augment_query(query: str) -> tuple:
+    """Append detected skill keywords to the query text"""
     skills = detect_skill_domains(query)
-    needs_technical = len(skills['tech']) > 0
-    needs_soft = len(skills['soft']) > 0
-    
-    # Encode query with skill indicators
     query_augmented = query
     if detected_tech := skills['tech']:
         query_augmented += " " + " ".join(detected_tech)
     if detected_soft := skills['soft']:
         query_augmented += " " + " ".join(detected_soft)
-    
-    q_emb = model.encode(query_augmented, convert_to_tensor=True, normalize_embeddings=True)
-    scores = util.cos_sim(q_emb, embeddings)[0].cpu().numpy()
-    
-    # Get top candidates
-    top_indices = scores.argsort()[-top_k * 2:][::-1]
+    return query_augmented, skills
+
+
+def candidate_mask(query: str, explicit: Optional[Constraints] = None, top_k: int = 10,
+                   snap: Optional[Snapshot] = None, extract: Optional[bool] = None) -> Optional[np.ndarray]:
+    """Items allowed by the request's filters and the constraints stated in the query
+
+    Explicit filters are hard. Constraints extracted from the query text are
+    dropped again if they leave fewer than top_k candidates or name values
+    the catalog does not have. Raises ValueError for unknown explicit values.
+    """
+    attributes = (snap or resources.snapshot).attributes
+    explicit = explicit or Constraints()
+    if extract is None:
+        extract = QUERY_CONSTRAINTS == "filter"
+    extracted = extract_constraints(query) if extract else Constraints()
+    if extracted:
+        try:
+            mask = attributes.mask(extracted.merged(explicit))
+            if mask is not None and mask.sum() >= top_k:
+                return mask
+        except ValueError:
+            pass
+    return attributes.mask(explicit)
+
+
+def semantic_namespace(top_k: int, snap: Snapshot, mask: Optional[np.ndarray]) -> tuple:
+    """What a result depends on besides the query: near-duplicates only share results within it"""
+    return top_k, snap.generation, None if mask is None else hash(np.packbits(mask).tobytes())
+
+
+def query_windows(model, query: str, query_augmented: str, mode: Optional[str] = None,
+                  max_chunks: Optional[int] = None) -> tuple:
+    """Texts to encode for a query, plus token weights when it was split into windows
+
+    A query that fits the model comes back as its augmented text with no
+    weights. The skill terms that augmentation appends go with every window.
+    """
+    mode = mode or LONG_QUERY
+    if mode == "truncate":
+        return [query_augmented], None
+    suffix = query_augmented[len(query):]
+    tokenizer = getattr(model, "tokenizer", None)
+    # Room left by the special tokens and the appended skill terms
+    window = max(getattr(model, "max_seq_length", 256) - 2 - len(token_spans(suffix, tokenizer)), 32)
+    if len(query) <= window:  # every token covers at least one character
+        return [query_augmented], None
+    windows, weights = split_windows(query, tokenizer, window, LONG_QUERY_OVERLAP,
+                                     LONG_QUERY_MAX_CHUNKS if max_chunks is None else max_chunks)
+    if len(windows) == 1:
+        return [query_augmented], None
+    return [w + suffix for w in windows], weights
+
+
+def pool_windows(embs: np.ndarray, weights: Optional[np.ndarray], mode: Optional[str] = None) -> tuple:
+    """(query embedding, window embeddings for max pooling or None) from encoded query_windows texts
+
+    The embedding is the token-weighted mean of the windows; it also keys
+    the semantic cache. Max pooling scores each item against every window.
+    """
+    if weights is None:
+        return embs[0], None
+    return mean_pool(embs, weights), (embs if (mode or LONG_QUERY) == "max" else None)
+
+
+def get_balanced_recommendations(query: str, top_k: int = 10) -> List[Dict]:
+    """Get balanced recommendations across skill domains"""
+    query_augmented, skills = _augment_query(query)
+    model = resources.load().model
+    texts, weights = query_windows(model, query, query_augmented)
+    q_emb, chunks = pool_windows(model.encode(texts, convert_to_numpy=True, normalize_embeddings=True), weights)
+    return rank_balanced(q_emb, skills, top_k=top_k, query=query, mask=candidate_mask(query, top_k=top_k),
+                         chunks=chunks)
+
+
+def rank_balanced(q_emb, skills: Dict[str, List[str]], top_k: int = 10, query: str = "",
+                  snap: Optional[Snapshot] = None, mask: Optional[np.ndarray] = None,
+                  rerank: Optional[Callable[[Search], Search]] = None,
+                  chunks: Optional[np.ndarray] = None) -> List[Dict]:
+    """Score an encoded query against the catalog and balance across domains"""
+    snap = snap or resources.snapshot
+    with stage("score"):
+        search = _make_search(q_emb, query, skills, snap=snap, mask=mask, chunks=chunks)
+    if rerank is not None:
+        with stage("rerank"):
+            search = rerank(search)
+    with stage("balance"):
+        return _balance(search, skills, top_k=top_k, snap=snap)
+
+
+def _make_search(q_emb, query: str, skills: Dict[str, List[str]], sem_scores=None,
+                 snap: Optional[Snapshot] = None, mask: Optional[np.ndarray] = None,
+                 chunks: Optional[np.ndarray] = None, owned: bool = False):
+    """Search callable for one query: the index alone, or fused with BM25
+
+    With a candidate mask, the exact index scores only the surviving rows;
+    approximate indexes filter their results instead. With window embeddings
+    of a long query, the exact index scores each item as its best window;
+    approximate indexes search with the pooled q_emb. owned gives the exact
+    index's search its own scores, for searches still read after an await.
+    """
+    snap = snap or resources.snapshot
+    index = snap.index
+    if sem_scores is None and chunks is not None and isinstance(index, ScoringIndex):
+        sem_scores = index.score_batch(chunks).max(axis=0)
+    candidates = np.flatnonzero(mask) if mask is not None else None
+    if snap.hybrid is None:
+        if sem_scores is not None:
+            return ranked_search(sem_scores, candidates)
+        if isinstance(index, ScoringIndex):
+            if candidates is None:
+                return index.searcher(q_emb, copy=owned)
+            return index.subset_searcher(q_emb, candidates)
+        if candidates is None:
+            return index.searcher(q_emb)
+        return masked_search(index.searcher(q_emb), mask)
+    if sem_scores is None:
+        if isinstance(index, ScoringIndex):
+            sem_scores = index.scores(q_emb)
+        else:
+            # Approximate backends only score their own candidates
+            ids, scores = index.searcher(q_emb)(HYBRID_CANDIDATES)
+            sem_scores = np.zeros(len(index), dtype=np.float32)
+            sem_scores[ids] = scores
+    boosts = [(skills['tech'], TECH_BOOST), (skills['soft'], SOFT_BOOST)]
+    return ranked_search(snap.hybrid.score(sem_scores, query, boosts), candidates)
+
+
+def _balance(search, skills: Dict[str, List[str]], top_k: int = 10,
+             snap: Optional[Snapshot] = None) -> List[Dict]:
+    """Pick top_k items from an index search, split across skill domains"""
+    catalog = (snap or resources.snapshot).catalog
+    needs_technical = len(skills['tech']) > 0
+    needs_soft = len(skills['soft']) > 0
     
     recommendations = []
     technical_count = 0
     soft_count = 0
     max_per_type = top_k // 2 if (needs_technical and needs_soft) else top_k
     
-    for idx in top_indices:
+    # Walk candidates best-first; the partial sort widens past top_k * 2
+    # only if balancing skips enough items to need more
+    for idx, score in iter_ranked(timed("sort", search), top_k * 2, len(catalog)):
         if len(recommendations) >= top_k:
             break
         
-        item = catalog[idx]
-        test_type = item.get("test_type", "").upper()
+        test_type = catalog.test_type(idx)
         
         # Balance: if both tech and soft skills needed, split recommendations
         if needs_technical and needs_soft:
@@ -127,16 +590,7 @@ def get_balanced_recommendations(query: str, top_k: int = 10) -> List[Dict]:
                     continue
                 soft_count += 1
         
-        recommendations.append({
-            "name": item.get("name"),
-            "url": item.get("url"),
-            "description": (item.get("description") or "")[:240],
-            "score": float(scores[idx]),
-            "test_type": test_type,
-            "job_levels": item.get("job_levels", ""),
-            "adaptive_support": item.get("adaptive_support", ""),
-            "remote_testing": item.get("remote_testing", ""),
-        })
+        recommendations.append(catalog.recommendation(idx, score))
     
     return recommendations
 
@@ -144,38 +598,378 @@ def get_balanced_recommendations(query: str, top_k: int = 10) -> List[Dict]:
 class RecommendRequest(BaseModel):
     query: str = Field(..., description="Free text, JD text, or JD URL")
     top_k: int = Field(default=10, ge=5, le=10, description="Number of results (5-10)")
+    max_minutes: Optional[int] = Field(default=None, ge=1, description="Longest acceptable assessment, in minutes")
+    job_levels: Optional[List[str]] = Field(default=None, description="e.g. Entry-Level, Mid-Professional, Manager")
+    languages: Optional[List[str]] = Field(default=None, description="e.g. English, French")
+    remote_testing: Optional[bool] = Field(default=None, description="Require remote testing support")
+    adaptive_support: Optional[bool] = Field(default=None, description="Require adaptive/IRT support")
+    catalog: str = Field(default=DEFAULT_CATALOG, description="Named catalog to recommend from")
+
+    def constraints(self) -> Constraints:
+        return Constraints(max_minutes=self.max_minutes, job_levels=self.job_levels or (),
+                           languages=self.languages or (), remote=self.remote_testing,
+                           adaptive=self.adaptive_support)
+
+
+class BatchRecommendRequest(BaseModel):
+    items: List[RecommendRequest] = Field(..., description="Queries to answer, in order")
+
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+
+
+jd_fetcher = JDFetcher()
+
+
+async def _catalog_snapshot(res: Resources, name: str) -> Snapshot:
+    """Snapshot of the requested catalog: 404 if unknown, 503 if it cannot be loaded"""
+    if name not in res.catalogs.specs:
+        raise HTTPException(status_code=404, detail=f"Unknown catalog {name!r}")
+    try:
+        return await res.catalog(name)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Catalog {name!r} could not be loaded: {e}")
+
+
+async def _resolve_query_text(text: str) -> str:
+    """If the query is a URL, try to replace it with the page's main text"""
+    if text.startswith("http"):
+        fetched = await jd_fetcher.fetch_text(text)
+        if fetched:
+            return fetched
+    return text
 
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy", "items": len(catalog)}
+    """Liveness: answers even while the model is still loading"""
+    return {
+        "status": "healthy",
+        "ready": resources.ready,
+        "items": len(resources.snapshot.catalog) if resources.ready else None,
+    }
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness: 200 once the model, catalog and index are loaded"""
+    if not resources.ready:
+        detail = {"status": "loading"}
+        if resources.error:
+            detail = {"status": "failed", "error": resources.error}
+        return JSONResponse(status_code=503, content=detail)
+    snap = resources.snapshot
+    return {
+        "status": "ready",
+        "items": len(snap.catalog),
+        "index": INDEX_BACKEND,
+        "version": snap.version,
+        "generation": snap.generation,
+        "warm": resources.warm,
+        "reload_error": resources.reload_error,
+        "catalogs": resources.catalogs.loaded(),
+    }
+
+
+@app.post("/admin/reload")
+async def admin_reload(force: bool = False, x_admin_token: str = Header(default="")):
+    """Swap in the latest published artifacts without restarting"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Reload endpoint disabled (set ADMIN_TOKEN)")
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+    await resources.ensure()
+    try:
+        swapped = await asyncio.get_running_loop().run_in_executor(None, resources.reload, force)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed, previous snapshot kept: {e}")
+    snap = resources.snapshot
+    return {"reloaded": bool(swapped), "version": snap.version, "generation": snap.generation,
+            "items": len(snap.catalog), "catalogs": swapped}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Stage and request histograms plus cache counters, in Prometheus text format"""
+    for name, cache in (("embedding", embedding_cache), ("result", result_cache), ("semantic", semantic_cache)):
+        for field in ("hits", "misses", "evictions"):
+            registry.set(f"shl_cache_{field}_total", getattr(cache, field), cache=name)
+    registry.set("shl_semantic_cache_verified_total", semantic_cache.verified)
+    registry.set("shl_semantic_cache_false_reuse_total", semantic_cache.false_reuse)
+    if resources.reranker is not None:
+        for outcome, count in resources.reranker.outcomes.items():
+            registry.set("shl_rerank_total", count, outcome=outcome)
+    for name, entry in resources.catalogs.stats()["catalogs"].items():
+        registry.set("shl_catalog_memory_bytes", entry["heap_mib"] * 2**20, catalog=name, kind="heap")
+        registry.set("shl_catalog_memory_bytes", entry["mapped_mib"] * 2**20, catalog=name, kind="mapped")
+        registry.set("shl_catalog_loads_total", entry["loads"], catalog=name)
+        registry.set("shl_catalog_evictions_total", entry["evictions"], catalog=name)
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "embedding_cache": embedding_cache.stats(),
+        "result_cache": result_cache.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "jd_fetch_cache": jd_fetcher.stats(),
+        "rerank": resources.reranker.stats() if resources.reranker is not None else None,
+        "catalogs": resources.catalogs.stats(),
+    }
+
+
+@app.get("/catalogs")
+async def catalogs():
+    """Configured catalogs: model, whether loaded, memory and last use"""
+    return resources.catalogs.stats()
+
+
+def _finish_timing(timer, response, status: int = 200):
+    if timer is not None:
+        header = timer.finish(status)
+        if response is not None:
+            response.headers["Server-Timing"] = header
+    return response
 
 
 @app.post("/recommend")
 async def recommend(body: RecommendRequest):
+    timer = start_request("/recommend")
+    response, status = None, 500
+    try:
+        response = await _recommend(body)
+        status = 200
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    except asyncio.CancelledError:
+        status = 499  # client went away; still stop the profiler and record the request
+        raise
+    finally:
+        _finish_timing(timer, response, status)
+    return response
+
+
+async def _recommend(body: RecommendRequest) -> JSONResponse:
+    started = time.perf_counter()
     text = body.query.strip()
     if not text:
         raise HTTPException(status_code=400, detail="Query required")
     
     # If it's a URL, try to extract text
-    if text.startswith("http"):
-        try:
-            import requests
-            resp = requests.get(text, timeout=5)
-            text = resp.text[:2000]
-        except:
-            pass
+    with stage("fetch"):
+        text = await _resolve_query_text(text)
     
-    recs = get_balanced_recommendations(text, top_k=body.top_k)
+    res = await resources.ensure()
+    snap = await _catalog_snapshot(res, body.catalog)
+    key = normalize_query(text)
+    filters = body.constraints()
+    cache_key = (key, body.top_k, filters.key(), snap.generation)
+    recs = result_cache.get(cache_key)
+    if recs is None:
+        with stage("filter"):
+            try:
+                mask = candidate_mask(text, filters, body.top_k, snap=snap)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        with stage("skills"):
+            query_augmented, skills = _augment_query(text)
+        # Catalogs embedded by the same model share query embeddings
+        cached = embedding_cache.get((snap.model_name, key))
+        if cached is None:
+            with stage("chunk"):
+                texts, weights = query_windows(res.models[snap.model_name], text, query_augmented)
+            # Encode on the batching worker so the event loop stays free; the
+            # windows of a long query are queued together and share a batch
+            with stage("encode"):
+                embs = await res.encoders[snap.model_name].encode_many(texts)
+            cached = pool_windows(embs, weights)
+            embedding_cache.set((snap.model_name, key), cached)
+        q_emb, chunks = cached
+        namespace = semantic_namespace(body.top_k, snap, mask)
+        with stage("lookup"):
+            reused = semantic_cache.get(q_emb, namespace)
+        verify = reused is not None and semantic_cache.should_verify()
+        if reused is not None and not verify:
+            recs = reused
+            result_cache.set(cache_key, recs)
+        else:
+            with stage("score"):
+                # The rerank awaits the cross-encoder, while other requests reuse this thread's score buffer
+                search = _make_search(q_emb, text, skills, snap=snap, mask=mask, chunks=chunks,
+                                      owned=res.reranker is not None)
+            complete = True
+            if res.reranker is not None:
+                with stage("rerank"):
+                    search, complete = await res.reranker.rerank_within(text, search, snap, started)
+            with stage("balance"):
+                recs = _balance(search, skills, top_k=body.top_k, snap=snap)
+            if verify:
+                semantic_cache.verify([r["url"] for r in reused], [r["url"] for r in recs])
+            # A bi-encoder fallback is not cached, so the next request can still get the rerank
+            if recs and complete:
+                result_cache.set(cache_key, recs)
+                semantic_cache.set(q_emb, namespace, recs)
     
     if not recs:
         raise HTTPException(status_code=400, detail="No recommendations found")
     
-    return {"recommended_assessments": recs}
+    with stage("serialize"):
+        return JSONResponse({"recommended_assessments": recs})
+
+
+@app.post("/recommend/batch")
+async def recommend_batch(body: BatchRecommendRequest):
+    """Answer many queries with one encode call and one matrix multiply
+
+    The rerank stage and the semantic cache are /recommend only.
+    """
+    timer = start_request("/recommend/batch")
+    response, status = None, 500
+    try:
+        response = await _recommend_batch(body)
+        status = 200
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    except asyncio.CancelledError:
+        status = 499  # client went away
+        raise
+    finally:
+        _finish_timing(timer, response, status)
+    return response
+
+
+def _rows_by(pending: list, key: Callable) -> Dict[object, List[int]]:
+    """Row numbers of the pending batch items, grouped by key(item)"""
+    groups: Dict[object, List[int]] = {}
+    for row, p in enumerate(pending):
+        groups.setdefault(key(p), []).append(row)
+    return groups
+
+
+async def _recommend_batch(body: BatchRecommendRequest) -> JSONResponse:
+    if len(body.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+    
+    loop = asyncio.get_running_loop()
+    res = await resources.ensure()
+    results: List[Optional[Dict]] = [None] * len(body.items)
+    pending = []  # (position, cache key, top_k, query, (texts, weights) to encode, skills, candidate mask, snapshot)
+    
+    # Fetch every URL query concurrently through the shared client
+    with stage("fetch"):
+        texts = await asyncio.gather(*(_resolve_query_text(item.query.strip()) for item in body.items))
+    
+    # Each catalog named in the batch is looked up (and loaded) once
+    snaps = {}
+    for name in dict.fromkeys(item.catalog for item in body.items):
+        try:
+            snaps[name] = await _catalog_snapshot(res, name)
+        except HTTPException as e:
+            snaps[name] = e
+    
+    for i, (item, text) in enumerate(zip(body.items, texts)):
+        if not text:
+            results[i] = {"error": "Query required"}
+            continue
+        snap = snaps[item.catalog]
+        if isinstance(snap, HTTPException):
+            results[i] = {"error": snap.detail}
+            continue
+        key = normalize_query(text)
+        filters = item.constraints()
+        cache_key = (key, item.top_k, filters.key(), snap.generation)
+        recs = result_cache.get(cache_key)
+        if recs is not None:
+            results[i] = {"recommended_assessments": recs}
+            continue
+        try:
+            with stage("filter"):
+                mask = candidate_mask(text, filters, item.top_k, snap=snap)
+        except ValueError as e:
+            results[i] = {"error": str(e)}
+            continue
+        with stage("skills"):
+            query_augmented, skills = _augment_query(text)
+        with stage("chunk"):
+            windows = query_windows(res.models[snap.model_name], text, query_augmented)
+        pending.append((i, cache_key, item.top_k, text, windows, skills, mask, snap))
+    
+    if pending:
+        q_embs: List[Optional[np.ndarray]] = [None] * len(pending)
+        chunks: List[Optional[np.ndarray]] = [None] * len(pending)
+        sems: List[Optional[np.ndarray]] = [None] * len(pending)
+        try:
+            # One encode call per model, however many catalogs share it and
+            # however many windows the long queries were split into
+            with stage("encode"):
+                for model_name, rows in _rows_by(pending, lambda p: p[7].model_name).items():
+                    embs = await loop.run_in_executor(
+                        None,
+                        lambda m=res.models[model_name], t=[w for r in rows for w in pending[r][4][0]]: m.encode(
+                            t,
+                            convert_to_numpy=True,
+                            normalize_embeddings=True,
+                        ),
+                    )
+                    offset = 0
+                    for row in rows:
+                        texts, weights = pending[row][4]
+                        q_embs[row], chunks[row] = pool_windows(embs[offset:offset + len(texts)], weights)
+                        offset += len(texts)
+            # One matrix multiply per catalog with an exact index; per-query search otherwise
+            with stage("score"):
+                for rows in _rows_by(pending, lambda p: p[7].generation).values():
+                    index = pending[rows[0]][7].index
+                    rows = [r for r in rows if chunks[r] is None]  # window scores come from _make_search
+                    if rows and isinstance(index, ScoringIndex):
+                        for row, sem in zip(rows, index.score_batch(np.stack([q_embs[r] for r in rows]))):
+                            sems[row] = sem
+                searches = [_make_search(q_embs[row], p[3], p[5], sem_scores=sems[row], snap=p[7], mask=p[6],
+                                         chunks=chunks[row])
+                            for row, p in enumerate(pending)]
+        except Exception as e:
+            for i, *_ in pending:
+                results[i] = {"error": f"Encoding failed: {e}"}
+            pending = []
+        
+        for row, (i, cache_key, top_k, text, _, skills, _, snap) in enumerate(pending):
+            try:
+                with stage("balance"):
+                    recs = _balance(searches[row], skills, top_k=top_k, snap=snap)
+            except Exception as e:
+                results[i] = {"error": str(e)}
+                continue
+            if not recs:
+                results[i] = {"error": "No recommendations found"}
+                continue
+            embedding_cache.set((snap.model_name, normalize_query(text)), (q_embs[row], chunks[row]))
+            result_cache.set(cache_key, recs)
+            results[i] = {"recommended_assessments": recs}
+    
+    with stage("serialize"):
+        return JSONResponse({"results": results})
+
+
+@app.post("/catalogs/{name}/recommend")
+async def recommend_catalog(name: str, body: RecommendRequest):
+    """/recommend against the named catalog; the path overrides the body's catalog field"""
+    body.catalog = name
+    return await recommend(body)
+
+
+@app.post("/catalogs/{name}/recommend/batch")
+async def recommend_batch_catalog(name: str, body: BatchRecommendRequest):
+    """/recommend/batch with every item sent to the named catalog"""
+    for item in body.items:
+        item.catalog = name
+    return await recommend_batch(body)
 
 
 @app.get("/")
-async def index():
+async def home():
     index_path = WEB_DIR / "index.html"
     if not index_path.exists():
         raise HTTPException(status_code=404, detail="index.html not found")
@@ -0,0 +1,104 @@
+"""
+Recall vs latency of the approximate index backends against the exact scan
+Queries come from eval/train.csv (encoded with MiniLM when sentence-transformers
+is installed and the model loads, otherwise jittered catalog rows stand in);
+the catalog is grown synthetically by jittering real embeddings.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+from ann import IVFIndex, HNSWIndex, hnswlib  # noqa: E402
+from scoring import ScoringIndex  # noqa: E402
+
+SIZES = [389, 10_000, 100_000]
+K = 10
+NPROBES = [1, 4, 8, 16, 32]
+HNSW_EFS = [16, 64, 128]
+
+
+def load_queries(catalog_emb: np.ndarray, rng) -> np.ndarray:
+    try:
+        import pandas as pd
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        print("sentence-transformers/pandas not installed: using jittered catalog rows as queries")
+        return synthetic_queries(catalog_emb, rng)
+    try:
+        queries = pd.read_csv(ROOT / "eval" / "train.csv")["Query"].unique().tolist()
+        model = SentenceTransformer("all-MiniLM-L6-v2")
+        return model.encode(queries, normalize_embeddings=True).astype(np.float32)
+    except Exception as e:
+        # e.g. no network to download the model, or no eval/train.csv
+        print(f"Could not embed the eval queries ({type(e).__name__}: {e}): using jittered catalog rows as queries")
+        return synthetic_queries(catalog_emb, rng)
+
+
+def synthetic_queries(catalog_emb: np.ndarray, rng) -> np.ndarray:
+    picks = catalog_emb[rng.choice(len(catalog_emb), 50)]
+    return jitter(picks, 0.08, rng)
+
+
+def jitter(x: np.ndarray, sigma: float, rng) -> np.ndarray:
+    y = x + rng.standard_normal(x.shape).astype(np.float32) * sigma
+    return y / np.linalg.norm(y, axis=1, keepdims=True)
+
+
+def grow(base: np.ndarray, n: int, rng) -> np.ndarray:
+    """Real rows plus jittered copies (localized / versioned variants)"""
+    if n <= len(base):
+        return base[:n]
+    extra = base[rng.integers(0, len(base), n - len(base))]
+    return np.vstack([base, jitter(extra, 0.05, rng)]).astype(np.float32)
+
+
+def measure(index, queries: np.ndarray, truth) -> tuple:
+    hits = 0
+    start = time.perf_counter()
+    for q, gt in zip(queries, truth):
+        ids, _ = index.searcher(q)(K)
+        hits += len(gt & set(ids.tolist()))
+    elapsed = time.perf_counter() - start
+    return hits / (K * len(queries)), elapsed / len(queries) * 1e6
+
+
+def main():
+    rng = np.random.default_rng(0)
+    base = np.load(ROOT / "embeddings.npy").astype(np.float32)
+    queries = load_queries(base, rng)
+    print(f"{len(queries)} queries, k={K}\n")
+    print(f"{'items':>8} | {'backend':<16} | {'recall@10':>9} | {'us/query':>9} | build s")
+    print("-" * 64)
+    for n in SIZES:
+        matrix = grow(base, n, rng)
+        exact = ScoringIndex(matrix)
+        truth = [set(exact.searcher(q)(K)[0].tolist()) for q in queries]
+        recall, us = measure(exact, queries, truth)
+        print(f"{n:>8} | {'exact':<16} | {recall:>9.3f} | {us:>9.1f} | -")
+
+        start = time.perf_counter()
+        ivf = IVFIndex.build(matrix)
+        build_s = time.perf_counter() - start
+        for nprobe in NPROBES:
+            ivf.nprobe = nprobe
+            recall, us = measure(ivf, queries, truth)
+            print(f"{n:>8} | {f'ivf nprobe={nprobe}':<16} | {recall:>9.3f} | {us:>9.1f} | {build_s:.1f}")
+
+        if hnswlib is not None:
+            start = time.perf_counter()
+            hnsw = HNSWIndex.build(matrix)
+            build_s = time.perf_counter() - start
+            for ef in HNSW_EFS:
+                hnsw.ef = ef
+                recall, us = measure(hnsw, queries, truth)
+                print(f"{n:>8} | {f'hnsw ef={ef}':<16} | {recall:>9.3f} | {us:>9.1f} | {build_s:.1f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
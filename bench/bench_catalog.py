@@ -0,0 +1,112 @@
+"""
+Catalog representations: memory, build time and response assembly
+
+At 389 items (final_catalog.json) and at 100k synthetic items (the real ones
+repeated with unique names, URLs and descriptions), compares:
+  dicts        json.loads list of dicts, responses built with .get()/.upper()/slicing
+  store        the mapped embeddings.bin records, decoded per access
+  compact      catalog.CompactCatalog over the store records (what the API
+               serves): uint8 test-type codes, each entry decoded per response
+Memory is what tracemalloc sees allocated by building the representation and
+kept alive by it (compact keeps no decoded records, only its code column).
+Store pages are file-backed and shared between workers, so they are not
+counted. Assembly is the time to build one 10-item response.
+"""
+
+import gc
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+from catalog import CompactCatalog  # noqa: E402
+from store import EmbeddingStore, write_store  # noqa: E402
+
+SIZES = (389, 100_000)
+RESPONSES = 2000
+
+
+def synthetic(base, n):
+    out = []
+    for i in range(n):
+        it = dict(base[i % len(base)])
+        it["name"] = f"{it['name']} #{i}"
+        it["url"] = f"{it['url'].rstrip('/')}-{i}/"
+        it["description"] = f"{it['description']} (variant {i})"
+        out.append(it)
+    return out
+
+
+def legacy_recommendation(item, score):
+    """Response entry as _balance built it from a full record"""
+    return {
+        "name": item.get("name"),
+        "url": item.get("url"),
+        "description": (item.get("description") or "")[:240],
+        "score": score,
+        "test_type": item.get("test_type", "").upper(),
+        "job_levels": item.get("job_levels", ""),
+        "adaptive_support": item.get("adaptive_support", ""),
+        "remote_testing": item.get("remote_testing", ""),
+    }
+
+
+def measure(build):
+    """Built object, build seconds, bytes allocated; timed apart from tracing, which slows allocation"""
+    gc.collect()
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, elapsed, size
+
+
+def assembly_us(make, n):
+    rng = np.random.default_rng(0)
+    picks = rng.integers(0, n, size=(RESPONSES, 10)).tolist()
+    start = time.perf_counter()
+    for ids in picks:
+        [make(i, 0.5) for i in ids]
+    return (time.perf_counter() - start) / RESPONSES * 1e6
+
+
+def main():
+    base = json.loads((ROOT / "final_catalog.json").read_text(encoding="utf-8"))
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in SIZES:
+            items = base[:n] if n <= len(base) else synthetic(base, n)
+            raw = json.dumps(items, indent=2).encode("utf-8")
+            store_path = Path(tmp) / f"store-{n}.bin"
+            write_store(store_path, np.zeros((n, 1), dtype=np.float32), items, b"\0" * 32)
+            del items
+            gc.collect()
+
+            dicts, dict_s, dict_b = measure(lambda: json.loads(raw))
+            store, store_s, store_b = measure(lambda: EmbeddingStore.open(store_path).records)
+            compact, compact_s, compact_b = measure(lambda: CompactCatalog(store))
+
+            print(f"{n} items ({len(raw) / 1e6:.1f} MB of JSON)")
+            print(f"  {'':<10} {'build ms':>10} {'heap MiB':>10} {'10-item response us':>22}")
+            rows = [
+                ("dicts", dict_s, dict_b, assembly_us(lambda i, s: legacy_recommendation(dicts[i], s), n)),
+                ("store", store_s, store_b, assembly_us(lambda i, s: legacy_recommendation(store[i], s), n)),
+                ("compact", compact_s, compact_b, assembly_us(compact.recommendation, n)),
+            ]
+            for label, seconds, nbytes, us in rows:
+                print(f"  {label:<10} {seconds * 1e3:>10.1f} {nbytes / 2**20:>10.1f} {us:>22.1f}")
+            print()
+            del dicts, store, compact
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Throughput and memory of one process serving 1 to N catalogs
+
+Each run starts the API as a uvicorn subprocess, as bench_load.py does.
+CATALOGS lists N - 1 copies of final_catalog.json, one directory each, next
+to the default catalog, all on the default model. Every copy, the default
+one included (through ARTIFACT_DIR), gets an embedding store written from
+embeddings.npy up front, so no run pays for building stores. Then the eval
+queries are replayed closed-loop, each request sent to a random one of the N
+catalogs through /catalogs/<name>/recommend. Variants:
+  1 catalog    every request to the default catalog
+  N catalogs   2, 4 and 8 catalogs, all loaded before measuring
+  capped       the largest N under a CATALOG_MEMORY_MB that holds about half
+               of them, so requests keep rebuilding catalogs evicted earlier
+All catalogs share one encoder. ENCODER_BACKEND=stub, with --encode-ms of
+simulated model time per encode call, stands in for the model. The runs
+therefore measure what extra catalogs add: lookups, scoring and lazy loads.
+Reported per run: RPS and its ratio to the single catalog, p50/p95, the
+worker's RSS, and the catalog memory, loads and evictions from /catalogs.
+
+    python bench/bench_catalogs.py
+    python bench/bench_catalogs.py --catalogs 1 4 16 -n 3000 --encode-ms 0
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+from bench_load import load_queries, process_usage, run_load, Server, stub_artifacts, write_copy
+
+
+def write_catalogs(tmp: Path, n: int) -> Path:
+    """catalogs.json naming n copies of the repo catalog"""
+    entries = {}
+    for i in range(n):
+        directory = tmp / f"copy{i}"
+        if not directory.exists():
+            write_copy(directory)
+        entries[f"copy{i}"] = {"directory": directory.name}
+    path = tmp / f"catalogs-{n}.json"
+    path.write_text(json.dumps(entries), encoding="utf-8")
+    return path
+
+
+def run(args, tmp: Path, queries: List[str], n: int, cap_mb: float) -> Dict:
+    names = ["default"] + [f"copy{i}" for i in range(n - 1)]
+    env = {"RELOAD_POLL_SECONDS": "0", "ENCODER_BACKEND": "stub", "STUB_ENCODE_MS": str(args.encode_ms),
+           "EMBED_CACHE_SIZE": "0", "RESULT_CACHE_SIZE": "0", "SEMANTIC_CACHE_SIZE": "0",
+           "ARTIFACT_DIR": str(tmp / "artifacts"), "CATALOGS": str(write_catalogs(tmp, n - 1)),
+           "CATALOG_MEMORY_MB": str(cap_mb)}
+    server = Server(args.port, env, inprocess=False)
+    try:
+        server.wait_ready()
+        # Warm-up touches every catalog, so uncapped runs measure them all loaded
+        asyncio.run(run_load(server.url, queries, args.concurrency, max(args.warmup, 4 * n), None, None, 10,
+                             args.seed + 1, catalogs=names))
+        result = asyncio.run(run_load(server.url, queries, args.concurrency, args.requests, None, None, 10,
+                                      args.seed, catalogs=names))
+        result["rss_mib"] = process_usage(server.pid)["rss_mib"]
+        stats = httpx.get(f"{server.url}/catalogs", timeout=10).json()
+    finally:
+        server.stop()
+    result["catalog_mib"] = stats["memory_mib"]
+    result["loads"] = sum(c["loads"] for c in stats["catalogs"].values())
+    result["evictions"] = sum(c["evictions"] for c in stats["catalogs"].values())
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--catalogs", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("-n", "--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--encode-ms", type=float, default=5.0, help="simulated model time per encode call")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    queries = load_queries()
+    counts = sorted(set(args.catalogs) | {1})
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        stub_artifacts(Path(tmp) / "artifacts")
+        for n in counts:
+            rows.append((f"{n}", run(args, Path(tmp), queries, n, 0)))
+        # A cap that holds about half of the largest run's catalogs
+        largest = rows[-1][1]
+        if counts[-1] > 1:
+            cap = largest["catalog_mib"] / 2
+            rows.append((f"{counts[-1]} capped {cap:.1f} MiB", run(args, Path(tmp), queries, counts[-1], cap)))
+
+    base = rows[0][1]["rps"]
+    print(f"\n{'catalogs':<22} {'rps':>8} {'vs 1':>6} {'p50 ms':>8} {'p95 ms':>8} {'RSS MiB':>8} "
+          f"{'catalog MiB':>12} {'loads':>6} {'evicted':>8}")
+    for label, r in rows:
+        print(f"{label:<22} {r['rps']:>8.1f} {r['rps'] / base:>6.2f} {r.get('p50_ms', 0):>8.1f} "
+              f"{r.get('p95_ms', 0):>8.1f} {r['rss_mib']:>8.0f} {r['catalog_mib']:>12.2f} {r['loads']:>6} "
+              f"{r['evictions']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Per-query cost of hybrid scoring: the eval scripts' BM25Okapi + Python boost loop
+versus hybrid.HybridRetriever (inverted index + precomputed keyword id lists)
+
+Both sides match keywords as whole words, as skills.SkillDetector does, so
+their scores can be compared.
+"""
+
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+from app import _item_text  # noqa: E402
+from hybrid import HybridRetriever  # noqa: E402
+
+REPEATS = 5
+
+
+def extract_keywords(query):
+    tech = re.findall(r'\b(java|python|sql|javascript|selenium|\.net|excel|c\+\+|html|css)\b', query, re.I)
+    soft = re.findall(r'\b(collaborat\w*|communicat\w*|leadership|teamwork|interpersonal|personality|behavior)\b', query, re.I)
+    return {'tech': {k.lower() for k in tech}, 'soft': {k.lower() for k in soft}}
+
+
+def main():
+    catalog = json.loads((ROOT / "final_catalog.json").read_text(encoding="utf-8"))
+    texts = [_item_text(it) for it in catalog]
+    queries = pd.read_csv(ROOT / "eval" / "train.csv")["Query"].unique().tolist()
+    rng = np.random.default_rng(0)
+    sem = {q: rng.uniform(0, 1, len(catalog)).astype(np.float32) for q in queries}
+    kws = {q: extract_keywords(q) for q in queries}
+    whole_word = {}
+
+    def mentions(kw, text):
+        if kw not in whole_word:
+            whole_word[kw] = re.compile(rf"(?<![\w.]){re.escape(kw)}(?![\w+#])")
+        return whole_word[kw].search(text) is not None
+
+    def baseline_score(q):
+        bm25_scores = bm25.get_scores(q.lower().split())
+        combined = 0.6 * sem[q] + 0.4 * (bm25_scores / (bm25_scores.max() + 1e-6))
+        for i, item in enumerate(catalog):
+            item_lower = (item['name'] + ' ' + item.get('description', '')).lower()
+            for kw_tech in kws[q]['tech']:
+                if mentions(kw_tech, item_lower):
+                    combined[i] += 0.25
+            for kw_soft in kws[q]['soft']:
+                if mentions(kw_soft, item_lower):
+                    combined[i] += 0.3
+        return combined
+
+    start = time.perf_counter()
+    retriever = HybridRetriever(texts, boost_texts=[it['name'] + ' ' + it.get('description', '') for it in catalog])
+    print(f"HybridRetriever build: {(time.perf_counter() - start) * 1e3:.1f} ms for {len(catalog)} items")
+
+    def hybrid_score(q):
+        return retriever.score(sem[q], q, [(kws[q]['tech'], 0.25), (kws[q]['soft'], 0.3)])
+
+    def per_query_us(fn):
+        for q in queries:
+            fn(q)
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            for q in queries:
+                fn(q)
+        return (time.perf_counter() - start) / (REPEATS * len(queries)) * 1e6
+
+    try:
+        from rank_bm25 import BM25Okapi
+    except ImportError:
+        print("rank_bm25 not installed: reporting the vectorized path only")
+        print(f"hybrid: {per_query_us(hybrid_score):.1f} us/query")
+        return
+
+    bm25 = BM25Okapi([t.lower().split() for t in texts])
+    diff = max(np.abs(baseline_score(q) - hybrid_score(q)).max() for q in queries)
+    print(f"max |baseline - hybrid| over {len(queries)} train queries: {diff:.2e}")
+    base_us = per_query_us(baseline_score)
+    hyb_us = per_query_us(hybrid_score)
+    print(f"baseline (BM25Okapi + loop): {base_us:>9.1f} us/query")
+    print(f"HybridRetriever:             {hyb_us:>9.1f} us/query  ({base_us / hyb_us:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
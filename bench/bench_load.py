@@ -0,0 +1,312 @@
+"""
+Load test for /recommend: throughput, tail latency and worker CPU/RSS
+
+Replays the queries of eval/train.csv and eval/test_sub.csv against the API,
+either closed-loop (--concurrency clients send back to back) or open-loop
+(--rate requests/s with Poisson arrivals, at most --concurrency in flight).
+In open-loop runs latency is measured from the scheduled arrival, so queueing
+behind a slow server is counted instead of hidden.
+
+The app runs as a uvicorn subprocess by default (its CPU and RSS are read from
+/proc), or in-process with --inprocess, where the numbers include the client.
+--stub sets ENCODER_BACKEND=stub, which takes model time out and leaves HTTP
+and ranking. The stub server maps a copy of the catalog and its vectors from a
+temporary ARTIFACT_DIR (see stub_artifacts), never the repo's own artifacts.
+Query caches are disabled unless --cache is given, because
+replayed queries would otherwise only measure cache hits.
+
+    python bench/bench_load.py --stub -c 32 -n 2000
+    python bench/bench_load.py --rate 50 --duration 30 --compare bench/results/load-previous.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+from embed_text import TEMPLATE_TAG  # noqa: E402
+from store import catalog_fingerprint, publish_version, write_store  # noqa: E402
+
+RESULTS_DIR = Path(__file__).parent / "results"
+QUERY_FILES = (ROOT / "eval" / "train.csv", ROOT / "eval" / "test_sub.csv")
+READY_TIMEOUT = 300
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def load_queries() -> List[str]:
+    queries: List[str] = []
+    for path in QUERY_FILES:
+        if path.exists():
+            queries.extend(pd.read_csv(path)["Query"].dropna().drop_duplicates().tolist())
+    return queries
+
+
+def write_copy(directory: Path) -> None:
+    """final_catalog.json plus a matching embedding store in directory
+
+    The servers run the stub backend; the real vectors are tagged for it, so
+    they map the store instead of re-embedding the catalog.
+    """
+    from app import MODEL_NAME
+
+    directory.mkdir(parents=True)
+    catalog_bytes = (ROOT / "final_catalog.json").read_bytes()
+    (directory / "final_catalog.json").write_bytes(catalog_bytes)
+    write_store(directory / "embeddings.bin", np.load(ROOT / "embeddings.npy"), json.loads(catalog_bytes),
+                catalog_fingerprint(catalog_bytes, MODEL_NAME, "stub", TEMPLATE_TAG))
+
+
+def stub_artifacts(root: Path) -> Path:
+    """Publish a write_copy as version v0 under root, to serve as ARTIFACT_DIR
+
+    A stub server started on the repo's own artifacts would find no store
+    tagged for it and fall back to embedding the catalog in memory; serving
+    a copy keeps the repo's store and embeddings.pt out of stub runs.
+    Imports app: with --inprocess, set its environment first.
+    """
+    write_copy(root / "v0")
+    publish_version(root, "v0")
+    return root
+
+
+def process_usage(pid: int) -> Optional[Dict[str, float]]:
+    """CPU seconds (user + system) and RSS in MiB of a process, from /proc"""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+        status = Path(f"/proc/{pid}/status").read_text()
+    except OSError:
+        return None
+    rss_kb = next((int(line.split()[1]) for line in status.splitlines() if line.startswith("VmRSS:")), 0)
+    return {"cpu_s": (int(stat[11]) + int(stat[12])) / _CLK_TCK, "rss_mib": rss_kb / 1024}
+
+
+class Server:
+    """The API under test, as a uvicorn subprocess or a server thread in this process"""
+
+    def __init__(self, port: int, env: Dict[str, str], inprocess: bool):
+        self.port = port
+        self.inprocess = inprocess
+        self.url = f"http://127.0.0.1:{port}"
+        if inprocess:
+            os.environ.update(env)
+            import uvicorn
+
+            config = uvicorn.Config("app:app", port=port, log_level="warning")
+            self._server = uvicorn.Server(config)
+            self._thread = threading.Thread(target=self._server.run, daemon=True)
+            self._thread.start()
+            self.pid = os.getpid()
+        else:
+            self._proc = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+                cwd=ROOT, env={**os.environ, **env}, stdout=subprocess.DEVNULL,
+            )
+            self.pid = self._proc.pid
+
+    def wait_ready(self) -> float:
+        start = time.perf_counter()
+        while time.perf_counter() - start < READY_TIMEOUT:
+            if not self.inprocess and self._proc.poll() is not None:
+                raise RuntimeError(f"Server exited with code {self._proc.returncode}")
+            try:
+                if httpx.get(f"{self.url}/ready", timeout=2).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        raise TimeoutError(f"/ready did not answer 200 within {READY_TIMEOUT}s")
+
+    def stop(self) -> None:
+        if self.inprocess:
+            self._server.should_exit = True
+            self._thread.join(timeout=10)
+        else:
+            self._proc.terminate()
+            self._proc.wait()
+
+
+async def run_load(url: str, queries: List[str], concurrency: int, requests: int,
+                   rate: Optional[float], duration: Optional[float], top_k: int, seed: int,
+                   catalogs: Optional[List[str]] = None) -> Dict:
+    """Send the requests; per request: (scheduled start, latency s, status)
+
+    With catalogs, each request goes to /catalogs/<name>/recommend for a random one of them.
+    """
+    rng = random.Random(seed)
+    results = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120) as client:
+
+        async def send(query: str, scheduled: float):
+            path = f"/catalogs/{rng.choice(catalogs)}/recommend" if catalogs else "/recommend"
+            try:
+                resp = await client.post(path, json={"query": query, "top_k": top_k})
+                status = resp.status_code
+            except httpx.HTTPError:
+                status = 0
+            results.append((scheduled, time.perf_counter() - scheduled, status))
+
+        start = time.perf_counter()
+        deadline = start + duration if duration else None
+
+        def more(sent: int) -> bool:
+            if deadline is not None:
+                return time.perf_counter() < deadline
+            return sent < requests
+
+        if rate:
+            slots = asyncio.Semaphore(concurrency)
+            tasks = []
+            arrival = start
+            sent = 0
+            while more(sent):
+                arrival += rng.expovariate(rate)
+                await asyncio.sleep(max(0.0, arrival - time.perf_counter()))
+                await slots.acquire()
+                task = asyncio.create_task(send(rng.choice(queries), arrival))
+                task.add_done_callback(lambda _: slots.release())
+                tasks.append(task)
+                sent += 1
+            await asyncio.gather(*tasks)
+        else:
+            counter = {"sent": 0}
+
+            async def client_loop():
+                while more(counter["sent"]):
+                    counter["sent"] += 1
+                    await send(rng.choice(queries), time.perf_counter())
+
+            await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies = np.array([lat for _, lat, status in results if status == 200]) * 1e3
+    errors = sum(status != 200 for _, _, status in results)
+    report = {"requests": len(results), "errors": errors, "elapsed_s": elapsed,
+              "rps": (len(results) - errors) / elapsed if elapsed else 0.0}
+    if len(latencies):
+        for p in (50, 95, 99):
+            report[f"p{p}_ms"] = float(np.percentile(latencies, p))
+        report["mean_ms"] = float(latencies.mean())
+        report["max_ms"] = float(latencies.max())
+    return report
+
+
+def compare(current: Dict, previous_path: Path) -> None:
+    previous = json.loads(previous_path.read_text(encoding="utf-8"))["results"]
+    print(f"\nChange versus {previous_path.name}:")
+    for key in ("rps", "p50_ms", "p95_ms", "p99_ms", "cpu_per_request_ms", "rss_peak_mib"):
+        old, new = previous.get(key), current.get(key)
+        if old and new is not None:
+            print(f"  {key:<20} {old:>10.2f} -> {new:>10.2f}  ({(new - old) / old * 100:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="clients (closed loop) or max in flight")
+    parser.add_argument("-n", "--requests", type=int, default=1000, help="requests to send (ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="run for this many seconds instead of -n requests")
+    parser.add_argument("--rate", type=float, help="open-loop arrival rate in requests/s")
+    parser.add_argument("--warmup", type=int, default=50, help="requests sent before measuring")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--stub", action="store_true", help="ENCODER_BACKEND=stub: no model time")
+    parser.add_argument("--cache", action="store_true", help="keep the embedding and result caches enabled")
+    parser.add_argument("--inprocess", action="store_true", help="serve from a thread of this process")
+    parser.add_argument("--url", help="load an already running server instead of starting one")
+    parser.add_argument("--port", type=int, default=int(os.getenv("BENCH_PORT", "8766")))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", default="", help="name stored with the results")
+    parser.add_argument("--out", type=Path, help="results JSON (default: bench/results/load-<time>.json)")
+    parser.add_argument("--compare", type=Path, help="earlier results JSON to print deltas against")
+    args = parser.parse_args()
+
+    queries = load_queries()
+    env = {"RELOAD_POLL_SECONDS": "0"}
+    if args.stub:
+        env["ENCODER_BACKEND"] = "stub"
+    if not args.cache:
+        env.update(EMBED_CACHE_SIZE="0", RESULT_CACHE_SIZE="0", SEMANTIC_CACHE_SIZE="0")
+
+    server = None
+    stub_dir = None
+    url = args.url
+    if url is None:
+        if args.stub:
+            stub_dir = tempfile.TemporaryDirectory()
+            env["ARTIFACT_DIR"] = str(Path(stub_dir.name) / "artifacts")
+            if args.inprocess:
+                os.environ.update(env)  # app reads its config at import, in stub_artifacts
+            stub_artifacts(Path(env["ARTIFACT_DIR"]))
+        server = Server(args.port, env, args.inprocess)
+        url = server.url
+    try:
+        if server is not None:
+            print(f"Server ready after {server.wait_ready():.1f}s")
+        if args.warmup:
+            asyncio.run(run_load(url, queries, args.concurrency, args.warmup, None, None, args.top_k, args.seed + 1))
+        before = process_usage(server.pid) if server else None
+        peak = {"rss_mib": before["rss_mib"] if before else 0.0}
+        done = threading.Event()
+
+        def sample_rss():
+            while not done.wait(0.2):
+                usage = process_usage(server.pid)
+                if usage:
+                    peak["rss_mib"] = max(peak["rss_mib"], usage["rss_mib"])
+
+        sampler = threading.Thread(target=sample_rss, daemon=True)
+        if before:
+            sampler.start()
+        results = asyncio.run(run_load(url, queries, args.concurrency, args.requests, args.rate, args.duration,
+                                       args.top_k, args.seed))
+        after = process_usage(server.pid) if server else None
+        done.set()
+    finally:
+        if server is not None:
+            server.stop()
+        if stub_dir is not None:
+            stub_dir.cleanup()
+
+    if before and after:
+        cpu = after["cpu_s"] - before["cpu_s"]
+        results["cpu_s"] = cpu
+        results["cpu_util"] = cpu / results["elapsed_s"]
+        results["cpu_per_request_ms"] = cpu * 1e3 / max(results["requests"], 1)
+        results["rss_peak_mib"] = max(peak["rss_mib"], after["rss_mib"])
+
+    mode = f"open loop at {args.rate}/s" if args.rate else "closed loop"
+    print(f"{results['requests']} requests ({results['errors']} errors), {mode}, concurrency {args.concurrency}")
+    print(f"  throughput  {results['rps']:.1f} req/s")
+    if "p50_ms" in results:
+        print(f"  latency     p50 {results['p50_ms']:.1f} ms  p95 {results['p95_ms']:.1f} ms  "
+              f"p99 {results['p99_ms']:.1f} ms  max {results['max_ms']:.1f} ms")
+    if "cpu_s" in results:
+        print(f"  worker      {results['cpu_util'] * 100:.0f}% CPU, {results['cpu_per_request_ms']:.2f} ms CPU/request, "
+              f"RSS {results['rss_peak_mib']:.0f} MiB")
+
+    out = args.out or RESULTS_DIR / time.strftime("load-%Y%m%d-%H%M%S.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    params = {k: v for k, v in vars(args).items() if k not in ("out", "compare")}
+    record = {"label": args.label, "run_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "params": params,
+              "env": env, "queries": len(queries), "results": results}
+    out.write_text(json.dumps(record, indent=2, default=str), encoding="utf-8")
+    print(f"Saved {out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Long job descriptions: latency and Recall@10 against JD length, per long-query mode
+
+Each train query (eval/train.csv) is padded with job-ad boilerplate (company
+blurb, benefits, hiring process) to 1, 2, 4 and 8 KB. The query text sits at
+the start, in the middle or at the end of the ad. The "as is" rows are the
+queries unchanged; several are already longer than the model reads. Modes:
+  truncate    the whole text to model.encode, which keeps the first 256 tokens
+  mean/N      app.query_windows: overlapping windows (at most N), encoded in
+              one batch, pooled into their token-weighted mean embedding
+  max/N       the same windows; each item scores as its best window
+Ranking goes through app.rank_balanced on the exact index, without filters.
+Latency is windowing + encode + rank for one query at a time, so it grows
+with the number of windows the model has to read.
+
+    python bench/bench_long_query.py
+    ENCODER_BACKEND=onnx python bench/bench_long_query.py
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+import app  # noqa: E402
+from encoder import load_encoder  # noqa: E402
+from filters import CatalogAttributes  # noqa: E402
+from scoring import ScoringIndex  # noqa: E402
+
+SIZES_KB = (0, 1, 2, 4, 8)  # 0: the queries as they are
+POSITIONS = ("start", "middle", "end")
+MODES = (("truncate", 0), ("mean", 4), ("mean", 8), ("max", 4), ("max", 8))
+
+# Job-ad text with no skill or assessment content of its own
+FILLER = [
+    "Founded over twenty years ago, our company serves customers in more than forty countries.",
+    "We offer a competitive salary, an annual bonus and a generous pension scheme.",
+    "Employees enjoy twenty-five days of paid holiday plus public holidays.",
+    "Our offices are a short walk from the central station and have free parking.",
+    "Flexible working hours and the option to work from home two days a week are available.",
+    "We are an equal opportunity employer and welcome applications from all backgrounds.",
+    "The recruitment process consists of an initial call, an interview and a final conversation.",
+    "Please submit your application through our careers page before the closing date.",
+    "Successful candidates will be asked to provide references and proof of eligibility to work.",
+    "We reimburse travel costs for interviews held at our headquarters.",
+    "Our benefits include private medical insurance, a cycle scheme and an employee discount.",
+    "The position is full time and permanent, starting as soon as possible.",
+]
+
+
+def slug(url: str) -> str:
+    return url.strip().lower().rstrip("/").split("/")[-1]
+
+
+def padded(query: str, size_kb: int, position: str, rng: np.random.Generator) -> str:
+    """query placed at position within boilerplate, about size_kb in total"""
+    if not size_kb:
+        return query
+    filler, n = [], len(query)
+    while n < size_kb * 1024:
+        sentence = FILLER[rng.integers(len(FILLER))]
+        filler.append(sentence)
+        n += len(sentence) + 1
+    cut = {"start": 0, "middle": len(filler) // 2, "end": len(filler)}[position]
+    return " ".join(filler[:cut] + [query] + filler[cut:])
+
+
+def main():
+    catalog = json.loads((ROOT / "final_catalog.json").read_text(encoding="utf-8"))
+    train = pd.read_csv(ROOT / "eval" / "train.csv").groupby("Query", sort=False)["Assessment_url"].apply(
+        lambda s: {slug(u) for u in s}).reset_index(name="slugs")
+    model = load_encoder(app.MODEL_NAME)
+    catalog_emb = np.asarray(model.encode([app._item_text(it) for it in catalog], batch_size=64,
+                                          convert_to_numpy=True, normalize_embeddings=True), dtype=np.float32)
+    snap = app.Snapshot(0, None, ROOT, catalog, ScoringIndex(catalog_emb), None, CatalogAttributes(catalog))
+
+    def run(text, mode, max_chunks):
+        start = time.perf_counter()
+        query_augmented, skills = app._augment_query(text)
+        texts, weights = app.query_windows(model, text, query_augmented, mode, max_chunks)
+        embs = model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+        q_emb, chunks = app.pool_windows(np.asarray(embs, dtype=np.float32), weights, mode)
+        recs = app.rank_balanced(q_emb, skills, top_k=10, query=text, snap=snap, chunks=chunks)
+        return {slug(r["url"]) for r in recs}, time.perf_counter() - start, len(texts)
+
+    run(train["Query"][0], "max", 8)  # warm-up
+    print(f"{'JD KB':>6} {'mode':<9} " + " ".join(f"{'R@10 ' + p:>12}" for p in POSITIONS) +
+          f" {'p50 ms':>8} {'windows':>8}")
+    for kb in SIZES_KB:
+        for mode, max_chunks in MODES:
+            rng = np.random.default_rng(kb)
+            recalls, times, windows = [], [], []
+            for position in (POSITIONS if kb else POSITIONS[:1]):
+                total = 0.0
+                for query, gt in zip(train["Query"], train["slugs"]):
+                    found, seconds, n = run(padded(query, kb, position, rng), mode, max_chunks)
+                    total += len(gt & found) / len(gt)
+                    times.append(seconds)
+                    windows.append(n)
+                recalls.append(total / len(train))
+            cells = [f"{r:>12.3f}" for r in recalls] + [f"{'':>12}"] * (len(POSITIONS) - len(recalls))
+            label = mode if mode == "truncate" else f"{mode}/{max_chunks}"
+            print(f"{kb or 'as is':>6} {label:<9} " + " ".join(cells) +
+                  f" {np.percentile(times, 50) * 1e3:>8.1f} {np.mean(windows):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Cost of the per-stage timing in metrics.py on the ranking hot path
+
+Runs filter -> skills -> score -> sort -> balance for the eval/train.csv
+queries over final_catalog.json, with the encoder stubbed out and query
+vectors precomputed, in three variants:
+  stripped  stage()/timed() replaced by constant no-ops (no instrumentation)
+  off       the shipped code with TIMING=0 (no request timer)
+  on        a RequestTimer per query, finished into the histograms
+Reports microseconds per query and the overhead relative to stripped.
+The timer records eight stages per query, so its cost shows against the
+roughly millisecond rank path mostly as perf_counter() calls.
+"""
+
+import json
+import sys
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+import app  # noqa: E402
+import metrics  # noqa: E402
+from encoder import StubEncoder  # noqa: E402
+from filters import CatalogAttributes  # noqa: E402
+from scoring import ScoringIndex  # noqa: E402
+
+ROUNDS = 50
+REPEATS = 7
+
+
+def main():
+    catalog = json.loads((ROOT / "final_catalog.json").read_text(encoding="utf-8"))
+    model = StubEncoder()
+    matrix = model.encode([app._item_text(it) for it in catalog], normalize_embeddings=True)
+    snap = app.Snapshot(0, None, ROOT, catalog, ScoringIndex(matrix), None, CatalogAttributes(catalog))
+    queries = pd.read_csv(ROOT / "eval" / "train.csv")["Query"].drop_duplicates().tolist()
+    q_embs = model.encode([app._augment_query(q)[0] for q in queries], normalize_embeddings=True)
+
+    def run(with_timer: bool) -> float:
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            for query, q_emb in zip(queries, q_embs):
+                timer = metrics.RequestTimer("/bench") if with_timer else None
+                if timer is not None:
+                    metrics._current.set(timer)
+                with app.stage("filter"):
+                    mask = app.candidate_mask(query, top_k=10, snap=snap)
+                with app.stage("skills"):
+                    _, skills = app._augment_query(query)
+                app.rank_balanced(q_emb, skills, top_k=10, query=query, snap=snap, mask=mask)
+                if timer is not None:
+                    timer.finish()
+        return (time.perf_counter() - start) / (ROUNDS * len(queries)) * 1e6
+
+    null = nullcontext()
+    shipped = app.stage, app.timed
+    stripped_hooks = (lambda name: null), (lambda name, fn: fn)
+    best = {"stripped": float("inf"), "TIMING=0": float("inf"), "TIMING=1": float("inf")}
+    run(False)  # warm up
+    # Interleave the variants and keep each one's best repeat, so drift hits all alike
+    for _ in range(REPEATS):
+        app.stage, app.timed = stripped_hooks
+        best["stripped"] = min(best["stripped"], run(False))
+        app.stage, app.timed = shipped
+        best["TIMING=0"] = min(best["TIMING=0"], run(False))
+        best["TIMING=1"] = min(best["TIMING=1"], run(True))
+
+    print(f"{len(queries)} queries x {ROUNDS} rounds over {len(catalog)} items, best of {REPEATS}")
+    for label, us in best.items():
+        print(f"  {label:<10} {us:>8.1f} us/query  ({(us - best['stripped']) / best['stripped'] * 100:+.1f}%)")
+
+    # The end-to-end difference is small enough to drown in run-to-run noise,
+    # so also time exactly what the instrumentation adds to one request
+    stages = ("fetch", "filter", "skills", "encode", "score", "sort", "balance", "serialize")
+    n = 100_000
+    start = time.perf_counter()
+    for _ in range(n):
+        for name in stages:
+            with metrics.stage(name):
+                pass
+    off_us = (time.perf_counter() - start) / n * 1e6
+    start = time.perf_counter()
+    for _ in range(n // 10):
+        timer = metrics.RequestTimer("/bench")
+        metrics._current.set(timer)
+        for name in stages:
+            with metrics.stage(name):
+                pass
+        timer.finish()
+    on_us = (time.perf_counter() - start) / (n // 10) * 1e6
+    print(f"\nInstrumentation per request ({len(stages)} stages):")
+    print(f"  TIMING=0   {off_us:>6.2f} us  ({off_us / best['stripped'] * 100:.2f}% of the stripped rank path)")
+    print(f"  TIMING=1   {on_us:>6.2f} us  ({on_us / best['stripped'] * 100:.2f}% of the stripped rank path)")
+
+if __name__ == "__main__":
+    main()
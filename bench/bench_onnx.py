@@ -0,0 +1,90 @@
+"""
+Parity and speed of the int8 ONNX encoder against the torch SentenceTransformer
+- cosine agreement between both backends on catalog texts and train queries
+- plain top-10 Recall@10 on eval/train.csv with each backend
+- single-query latency and batch throughput on 1, 4 and 16 threads
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+from app import MODEL_NAME, _item_text  # noqa: E402
+from encoder import DEFAULT_ONNX_DIR, OnnxEncoder, load_encoder  # noqa: E402
+from scoring import ScoringIndex  # noqa: E402
+
+THREADS = [1, 4, 16]
+BATCH = 32
+ROUNDS = 50
+
+
+def slug(url: str) -> str:
+    return url.strip().lower().rstrip("/").split("/")[-1]
+
+
+def recall_at_10(model, catalog, catalog_emb, train) -> float:
+    index = ScoringIndex(catalog_emb)
+    slugs = [slug(it["url"]) for it in catalog]
+    q_emb = model.encode(train["Query"].tolist(), normalize_embeddings=True)
+    total = 0.0
+    for q, gt in zip(q_emb, train["urls"]):
+        ids, _ = index.searcher(q)(10)
+        total += len(gt & {slugs[i] for i in ids}) / len(gt)
+    return total / len(train)
+
+
+def latency(model, queries) -> tuple:
+    model.encode(queries[:BATCH], normalize_embeddings=True)  # warm-up
+    times = []
+    for i in range(ROUNDS):
+        start = time.perf_counter()
+        model.encode(queries[i % len(queries)], normalize_embeddings=True)
+        times.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    for _ in range(5):
+        model.encode(queries[:BATCH], normalize_embeddings=True)
+    qps = 5 * BATCH / (time.perf_counter() - start)
+    return np.percentile(times, 50) * 1e3, np.percentile(times, 95) * 1e3, qps
+
+
+def main():
+    import torch
+
+    catalog = json.loads((ROOT / "final_catalog.json").read_text(encoding="utf-8"))
+    texts = [_item_text(it) for it in catalog]
+    train = pd.read_csv(ROOT / "eval" / "train.csv")
+    train = train.groupby("Query")["Assessment_url"].apply(lambda s: {slug(u) for u in s}).reset_index(name="urls")
+    queries = train["Query"].tolist()
+
+    torch_model = load_encoder(MODEL_NAME, "torch")
+    onnx_model = load_encoder(MODEL_NAME, "onnx")
+
+    t_cat = torch_model.encode(texts, normalize_embeddings=True)
+    o_cat = onnx_model.encode(texts, normalize_embeddings=True)
+    t_q = torch_model.encode(queries, normalize_embeddings=True)
+    o_q = onnx_model.encode(queries, normalize_embeddings=True)
+    cos = np.concatenate([(t_cat * o_cat).sum(1), (t_q * o_q).sum(1)])
+    print(f"cosine(torch, onnx-int8): mean {cos.mean():.4f}  min {cos.min():.4f}")
+    print(f"Recall@10 torch: {recall_at_10(torch_model, catalog, t_cat, train):.4f}")
+    print(f"Recall@10 onnx : {recall_at_10(onnx_model, catalog, o_cat, train):.4f}")
+    print()
+
+    print(f"{'backend':<8} {'threads':>7} | {'p50 ms':>7} | {'p95 ms':>7} | batch{BATCH} q/s")
+    print("-" * 52)
+    model_dir = DEFAULT_ONNX_DIR / MODEL_NAME
+    for threads in THREADS:
+        torch.set_num_threads(threads)
+        p50, p95, qps = latency(torch_model, queries)
+        print(f"{'torch':<8} {threads:>7} | {p50:>7.1f} | {p95:>7.1f} | {qps:.0f}")
+        p50, p95, qps = latency(OnnxEncoder(model_dir, threads=threads), queries)
+        print(f"{'onnx':<8} {threads:>7} | {p50:>7.1f} | {p95:>7.1f} | {qps:.0f}")
+
+
+if __name__ == "__main__":
+    main()
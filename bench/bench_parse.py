@@ -0,0 +1,134 @@
+"""
+Product page parsing throughput: the scraper's original per-field extraction
+versus Scraper/product_parser.py (lxml and html.parser paths)
+
+Pages are synthesized from final_catalog.json in the layout of SHL product
+pages, with site chrome, inline scripts and comments around the fields.
+Each parser's output is checked against the original's on every page first.
+Descriptions are synthesized with \n line endings: libxml2 normalizes \r\n to
+\n as the HTML spec requires, while html.parser keeps the \r.
+"""
+
+import html as html_lib
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "Scraper"))
+import product_parser  # noqa: E402
+
+ROUNDS = 3
+
+_CHROME = "".join(
+    f'<li class="nav-item"><a href="/solutions/{i}/">Solution area {i}</a>'
+    f'<ul><li><a href="/solutions/{i}/a/">Assessments</a></li><li><a href="/solutions/{i}/b/">Insights</a></li></ul></li>'
+    for i in range(60)
+)
+
+
+def legacy_parse(html, name, full_url):
+    """Extraction as scraper.py did it before the dedicated parser"""
+    view_soup = BeautifulSoup(html, 'html.parser')
+    title_name = view_soup.title.text.split(' | ')[0].strip() if view_soup.title else name
+    desc_elem = view_soup.find(lambda tag: tag.name in ['h4', 'h5', 'h3'] and 'Description' in tag.get_text()) if view_soup else None
+    description = ''
+    if desc_elem:
+        next_p = desc_elem.find_next_sibling('p')
+        description = ' '.join(next_p.stripped_strings) if next_p else ''
+    test_match = re.search(r'Test Type:\s*([A-Z])', view_soup.get_text(), re.I)
+    test_type = test_match.group(1).upper() if test_match else ''
+    job_elem = view_soup.find(lambda tag: tag.name in ['h4', 'h5'] and 'Job levels' in tag.get_text()) if view_soup else None
+    job_levels = ''
+    if job_elem:
+        next_p = job_elem.find_next_sibling('p')
+        job_levels = ', '.join(next_p.stripped_strings) if next_p else ''
+    lang_elem = view_soup.find(lambda tag: tag.name in ['h4', 'h5'] and 'Languages' in tag.get_text()) if view_soup else None
+    languages = ''
+    if lang_elem:
+        next_p = lang_elem.find_next_sibling('p')
+        languages = ', '.join(next_p.stripped_strings) if next_p else ''
+    length_match = re.search(r'Completion Time in minutes\s*=\s*(\d+)', view_soup.get_text()) if view_soup else None
+    length = length_match.group(1) if length_match else ''
+    remote = 'Yes' if view_soup and 'Remote Testing:' in view_soup.get_text() else 'No'
+    adaptive = 'Yes' if view_soup and 'Adaptive' in view_soup.get_text() else 'No'
+    categories = []
+    if description:
+        categories = [t.strip() for t in re.split(r'[,;]', description) if len(t.strip()) > 5][:5]
+    return {
+        'name': title_name, 'url': full_url, 'description': description[:500], 'test_type': test_type,
+        'job_levels': job_levels, 'languages': languages, 'length_minutes': length,
+        'remote_testing': remote, 'adaptive_support': adaptive, 'categories': categories
+    }
+
+
+def product_page(i, item):
+    e = html_lib.escape
+    description = item['description'].replace('\r\n', '\n').replace('\r', '\n')
+    levels = "".join(f"{e(level.strip())},<br/>" for level in item['job_levels'].split(',') if level.strip())
+    langs = "".join(f"<span>{e(lang.strip())}</span> " for lang in item['languages'].split(',') if lang.strip())
+    remote = '<p>Remote Testing: <span class="catalogue__circle -yes"></span></p>' if item['remote_testing'] == 'Yes' else ''
+    sections = [
+        f'<h4>Description</h4>\n<p>{e(description)}<!-- trimmed --></p>',
+        f'<h4>Job levels</h4><div class="spacer"></div><p>{levels}</p>' if i % 7 else '',
+        f'<h4>Languages</h4>\n<p>{langs}</p>' if i % 5 else '<h4>Languages</h4>',
+        f'<h4>Assessment length</h4><p>Approximate Completion Time in minutes = {item["length_minutes"] or 30}</p>',
+        f'<p>Test Type: <span class="product-catalogue__key">{item["test_type"] or "K"}</span></p>{remote}',
+    ]
+    return f"""<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"/>
+<title>{e(item['name'])} | SHL</title>
+<script>window.dataLayer = [{{"page": "Adaptive catalogue"}}];</script>
+<style>.catalogue__circle {{ display: inline-block; }}</style></head>
+<body><header><nav><ul>{_CHROME}</ul></nav></header>
+<main><div class="product-catalogue-training-calendar__row typ">
+<h1>{e(item['name'])}</h1>{''.join(sections)}
+</div></main>
+<footer><p>&copy; SHL and its affiliates.</p><script>track("{e(item['url'])}");</script></footer></body></html>"""
+
+
+def pages_per_second(fn, pages):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for html, item in pages:
+            fn(html, item['name'], item['url'])
+    return ROUNDS * len(pages) / (time.perf_counter() - start)
+
+
+def main():
+    catalog = json.loads((ROOT / "final_catalog.json").read_text(encoding="utf-8"))
+    pages = [(product_page(i, item), item) for i, item in enumerate(catalog)]
+    size = sum(len(h) for h, _ in pages) / len(pages)
+    print(f"{len(pages)} synthetic product pages, {size / 1024:.0f} KiB each on average")
+
+    lxml_parse = product_parser.parse_product
+    lxml_module = product_parser.lxml_html
+
+    def soup_parse(html, name, url):
+        product_parser.lxml_html = None
+        try:
+            return product_parser.parse_product(html, name, url)
+        finally:
+            product_parser.lxml_html = lxml_module
+
+    variants = [("legacy (html.parser, per-field)", legacy_parse), ("single pass, html.parser", soup_parse)]
+    if lxml_module is not None:
+        variants.append(("single pass, lxml", lxml_parse))
+
+    for label, fn in variants[1:]:
+        mismatched = sum(fn(h, it['name'], it['url']) != legacy_parse(h, it['name'], it['url']) for h, it in pages)
+        print(f"{label}: {len(pages) - mismatched}/{len(pages)} records identical to legacy")
+
+    print()
+    base = None
+    for label, fn in variants:
+        pps = pages_per_second(fn, pages)
+        base = base or pps
+        print(f"{label:<32} {pps:>8.1f} pages/s  ({pps / base:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
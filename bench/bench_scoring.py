@@ -0,0 +1,74 @@
+"""
+Microbenchmark for per-query catalog scoring
+Compares the old full-argsort path with ScoringIndex + partial top-k selection
+as the catalog grows from 389 to 100k synthetic items.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from scoring import ScoringIndex, top_indices  # noqa: E402
+
+try:
+    import torch
+    from sentence_transformers import util
+except ImportError:
+    torch = None
+
+DIM = 384
+SIZES = [389, 1_000, 10_000, 100_000]
+TOP_N = 20  # top_k * 2 as used by the balancing loop
+REPEATS = 200
+
+
+def synthetic_matrix(n: int, rng) -> np.ndarray:
+    m = rng.standard_normal((n, DIM)).astype(np.float32)
+    return m / np.linalg.norm(m, axis=1, keepdims=True)
+
+
+def time_per_query(fn, queries) -> float:
+    fn(queries[0])  # warm-up
+    start = time.perf_counter()
+    for q in queries:
+        fn(q)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main():
+    rng = np.random.default_rng(0)
+    queries = synthetic_matrix(REPEATS, rng)
+    print(f"{'items':>8} | {'baseline us':>12} | {'f32 us':>8} | {'f16 us':>8} | speedup")
+    print("-" * 58)
+    for n in SIZES:
+        matrix = synthetic_matrix(n, rng)
+
+        if torch is not None:
+            emb_t = torch.from_numpy(matrix)
+            q_t = [torch.from_numpy(q) for q in queries]
+
+            def baseline(q):
+                scores = util.cos_sim(q, emb_t)[0].cpu().numpy()
+                return scores.argsort()[-TOP_N:][::-1]
+
+            base_us = time_per_query(baseline, q_t)
+        else:
+            def baseline(q):
+                scores = matrix @ q
+                return scores.argsort()[-TOP_N:][::-1]
+
+            base_us = time_per_query(baseline, queries)
+
+        results = []
+        for dtype in ("float32", "float16"):
+            index = ScoringIndex(matrix, dtype=dtype)
+            results.append(time_per_query(lambda q: top_indices(index.scores(q), TOP_N), queries))
+
+        print(f"{n:>8} | {base_us:>12.1f} | {results[0]:>8.1f} | {results[1]:>8.1f} | {base_us / results[0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Skill detection and keyword boosts on long job descriptions
+
+Detection, on synthetic JDs of 1 to 50 KB (train queries and catalog
+descriptions shuffled together):
+  substring   the old detect_skill_domains: `kw in text` for 35 hard-coded keywords
+  substr-all  `form in text` for every surface form of skill_vocabulary.json
+  per-term    one whole-word regex per surface form, tried in turn
+  compiled    skills.SkillDetector: every form in one trie regex, one scan of the text
+Boosts, at 389 and 100k catalog items (the real ones repeated):
+  masks       a boolean mask per keyword, `out[mask] += weight`
+  gather      hybrid.KeywordBoosts: precomputed id lists, one indexed add per keyword
+The detections that substring matching adds on the train queries, and the
+compiled detector does not, are listed at the end.
+"""
+
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+from hybrid import KeywordBoosts  # noqa: E402
+from skills import load_detector, load_vocabulary  # noqa: E402
+
+SIZES_KB = (1, 10, 25, 50)
+ITEMS = (389, 100_000)
+REPEATS = 20
+
+# What app.py matched before skills.py
+LEGACY_TECH = ['java', 'python', 'javascript', 'sql', 'c++', 'csharp', '.net', 'golang', 'react', 'angular', 'vue',
+               'aws', 'azure', 'kubernetes', 'docker', 'html', 'css', 'frontend', 'backend', 'fullstack', 'devops']
+LEGACY_SOFT = ['collaborate', 'collaboration', 'communication', 'teamwork', 'team', 'leadership', 'personality',
+               'behavior', 'emotional', 'intelligence', 'interpersonal', 'management', 'stakeholder', 'adaptability']
+
+
+def legacy_detect(text):
+    lower = text.lower()
+    return {'tech': [k for k in LEGACY_TECH if k in lower], 'soft': [k for k in LEGACY_SOFT if k in lower]}
+
+
+def long_jd(parts, size_kb, rng):
+    out, n = [], 0
+    while n < size_kb * 1024:
+        part = parts[rng.integers(len(parts))]
+        out.append(part)
+        n += len(part) + 1
+    return " ".join(out)[:size_kb * 1024]
+
+
+def per_call_us(fn, texts, repeats=REPEATS):
+    fn(texts[0])
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for t in texts:
+            fn(t)
+    return (time.perf_counter() - start) / (repeats * len(texts)) * 1e6
+
+
+def main():
+    catalog = json.loads((ROOT / "final_catalog.json").read_text(encoding="utf-8"))
+    queries = pd.read_csv(ROOT / "eval" / "train.csv")["Query"].unique().tolist()
+    detector = load_detector()
+    forms = [f for terms in load_vocabulary(ROOT / "skill_vocabulary.json").values() for fs in terms.values()
+             for f in fs]
+    per_form = [re.compile(rf"(?<![\w.]){re.escape(f)}(?![\w+#])") for f in forms]
+    print(f"Vocabulary: {len(detector)} terms, {len(forms)} forms")
+
+    rng = np.random.default_rng(0)
+    parts = queries + [it.get("description") or "" for it in catalog]
+    print(f"\n{'JD KB':>6} {'substring us':>13} {'substr-all us':>14} {'per-term us':>12} {'compiled us':>12}")
+    for kb in SIZES_KB:
+        texts = [long_jd(parts, kb, rng) for _ in range(5)]
+        repeats = max(2, REPEATS // kb)
+        legacy = per_call_us(legacy_detect, texts, repeats)
+        substr_all = per_call_us(lambda t: [f for f in forms if f in t.lower()], texts, repeats)
+        naive = per_call_us(lambda t: [p.search(t.lower()) for p in per_form], texts, repeats)
+        compiled = per_call_us(detector.detect, texts, repeats)
+        print(f"{kb:>6} {legacy:>13.0f} {substr_all:>14.0f} {naive:>12.0f} {compiled:>12.0f}")
+
+    weighted = [(detector.detect(q)["tech"], 0.25) for q in queries] + \
+               [(detector.detect(q)["soft"], 0.3) for q in queries]
+    print(f"\n{'items':>8} {'index ms':>9} {'masks us':>9} {'gather us':>10}")
+    base = [f"{it['name']} {it.get('description') or ''}" for it in catalog]
+    for n in ITEMS:
+        texts = [base[i % len(base)] for i in range(n)]
+        start = time.perf_counter()
+        boosts = KeywordBoosts(texts, detector)
+        index_ms = (time.perf_counter() - start) * 1e3
+        masks = {}
+        for kws, _ in weighted:
+            for kw in kws:
+                if kw not in masks:
+                    masks[kw] = np.zeros(n, dtype=bool)
+                    masks[kw][boosts.item_ids(kw)] = True
+
+        def mask_boost(pair):
+            out = np.zeros(n, dtype=np.float32)
+            for kw in pair[0]:
+                out[masks[kw]] += pair[1]
+
+        def gather_boost(pair):
+            boosts.boost([pair], np.zeros(n, dtype=np.float32))
+
+        print(f"{n:>8} {index_ms:>9.1f} {per_call_us(mask_boost, weighted, 3):>9.1f} "
+              f"{per_call_us(gather_boost, weighted, 3):>10.1f}")
+
+    print("\nSubstring detections dropped by whole-word matching on the train queries:")
+    for q in queries:
+        found = detector.detect(q)
+        for domain, kws in legacy_detect(q).items():
+            # A keyword survives if the term it is a form of was detected
+            dropped = [kw for kw in kws if not set(detector.terms(kw)) & set(found[domain])]
+            if dropped:
+                print(f"  {domain}: {', '.join(dropped):<30} in {q[:60]!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Startup benchmark for app.py
+Reports the cumulative `python -X importtime` cost of `import app` and, for a
+real uvicorn subprocess, the time until /health, /ready and the first
+/recommend response succeed.
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+PORT = int(os.getenv("BENCH_PORT", "8765"))
+TIMEOUT = 300
+
+
+def import_time() -> tuple:
+    """Total import time of app and the slowest top-level packages (ms)"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if m:
+            rows.append((int(m.group(2)), len(m.group(3)), m.group(4)))
+    top = sorted((r for r in rows if r[1] == 1), reverse=True)[:8]
+    total = next((r[0] for r in rows if r[2] == "app"), sum(r[0] for r in rows if r[1] == 1))
+    return total / 1000, [(name, us / 1000) for us, _, name in top]
+
+
+def _get(path: str) -> int:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{PORT}{path}", timeout=2) as r:
+            return r.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 0
+
+
+def _post(path: str, body: dict) -> int:
+    req = urllib.request.Request(
+        f"http://127.0.0.1:{PORT}{path}",
+        data=json.dumps(body).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=60) as r:
+            return r.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 0
+
+
+def time_to_first_response() -> dict:
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    marks = {}
+    try:
+        while time.perf_counter() - start < TIMEOUT:
+            if "health" not in marks and _get("/health") == 200:
+                marks["health"] = time.perf_counter() - start
+            if "health" in marks and "ready" not in marks and _get("/ready") == 200:
+                marks["ready"] = time.perf_counter() - start
+            if "health" in marks and "recommend" not in marks:
+                if _post("/recommend", {"query": "Java developer", "top_k": 10}) == 200:
+                    marks["recommend"] = time.perf_counter() - start
+            if len(marks) == 3:
+                break
+            time.sleep(0.05)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return marks
+
+
+def main():
+    total, top = import_time()
+    print(f"import app: {total:.1f} ms")
+    for name, ms in top:
+        print(f"  {name:<28} {ms:>8.1f} ms")
+    print()
+    for stage, seconds in time_to_first_response().items():
+        print(f"first 200 from /{stage}: {seconds:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
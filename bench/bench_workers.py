@@ -0,0 +1,151 @@
+"""
+Memory per worker and aggregate throughput of serve.py for 1, 2, 4 and 8 workers
+
+For each worker count, starts serve.py, waits until every worker answers
+/ready, and runs the closed-loop /recommend load from bench_load.py at
+4 clients per worker. Then it reads each worker's memory from
+/proc/<pid>/smaps_rollup:
+  RSS  resident pages, counting shared ones in full in every worker
+  PSS  shared pages divided among the processes that map them
+  USS  pages private to the worker (what one more worker costs)
+The mapped embedding store shows up in RSS but hardly in USS. --stub takes
+model time out (ENCODER_BACKEND=stub) and serves a copy of the artifacts from
+a temporary ARTIFACT_DIR, as bench_load.py does.
+
+    python bench/bench_workers.py --stub
+    python bench/bench_workers.py --workers 1 2 4 -n 2000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+from bench_load import RESULTS_DIR, load_queries, process_usage, run_load, stub_artifacts
+
+ROOT = Path(__file__).parent.parent
+READY_TIMEOUT = 600
+
+
+def memory(pid: int) -> Dict[str, float]:
+    """RSS, PSS and USS of a process in MiB"""
+    fields = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        name, value = line.split(":", 1)
+        fields[name] = int(value.split()[0]) / 1024
+    return {"rss_mib": fields["Rss"], "pss_mib": fields["Pss"],
+            "uss_mib": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+
+def worker_pids(parent: int) -> List[int]:
+    """uvicorn's spawned worker processes under the serve.py supervisor"""
+    pids = []
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            ppid = int(stat.read_text().rsplit(")", 1)[1].split()[1])
+            cmdline = (stat.parent / "cmdline").read_bytes()
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == parent and b"spawn_main" in cmdline:
+            pids.append(int(stat.parent.name))
+    # With one worker uvicorn serves from the supervisor process itself
+    return sorted(pids) or [parent]
+
+
+def wait_ready(proc: subprocess.Popen, url: str, workers: int) -> float:
+    """Until /ready has answered 200 often enough in a row to have hit every worker"""
+    start = time.perf_counter()
+    streak = 0
+    while streak < 10 * workers:
+        if proc.poll() is not None:
+            raise RuntimeError(f"serve.py exited with code {proc.returncode}")
+        if time.perf_counter() - start > READY_TIMEOUT:
+            raise TimeoutError(f"Workers not ready within {READY_TIMEOUT}s")
+        try:
+            ok = httpx.get(f"{url}/ready", timeout=2).status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        streak = streak + 1 if ok else 0
+        if not ok:
+            time.sleep(0.2)
+    return time.perf_counter() - start
+
+
+def measure(workers: int, args, queries: List[str], env: Dict[str, str]) -> Dict:
+    url = f"http://127.0.0.1:{args.port}"
+    proc = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--port", str(args.port), "--log-level", "warning"],
+        cwd=ROOT, env={**os.environ, **env}, stdout=subprocess.DEVNULL,
+    )
+    try:
+        ready_s = wait_ready(proc, url, workers)
+        concurrency = args.clients_per_worker * workers
+        asyncio.run(run_load(url, queries, concurrency, 20 * workers, None, None, 10, 1))
+        pids = worker_pids(proc.pid)
+        cpu_before = sum(process_usage(p)["cpu_s"] for p in pids)
+        load = asyncio.run(run_load(url, queries, concurrency, args.requests, None, None, 10, 0))
+        cpu = sum(process_usage(p)["cpu_s"] for p in pids) - cpu_before
+        mem = [memory(p) for p in pids]
+    finally:
+        proc.terminate()
+        proc.wait()
+    result = {"workers": workers, "worker_pids": len(pids), "ready_s": ready_s, "concurrency": concurrency,
+              "cpu_util": cpu / load["elapsed_s"], **load}
+    for key in ("rss_mib", "pss_mib", "uss_mib"):
+        result[f"{key}_per_worker"] = sum(m[key] for m in mem) / max(len(mem), 1)
+    result["pss_mib_total"] = sum(m["pss_mib"] for m in mem)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("-n", "--requests", type=int, default=1000)
+    parser.add_argument("--clients-per-worker", type=int, default=4)
+    parser.add_argument("--stub", action="store_true", help="ENCODER_BACKEND=stub: no model time")
+    parser.add_argument("--port", type=int, default=int(os.getenv("BENCH_PORT", "8767")))
+    parser.add_argument("--out", type=Path, help="results JSON (default: bench/results/workers-<time>.json)")
+    args = parser.parse_args()
+
+    queries = load_queries()
+    # Caches off, or replayed queries would only measure cache hits
+    env = {"RELOAD_POLL_SECONDS": "0", "EMBED_CACHE_SIZE": "0", "RESULT_CACHE_SIZE": "0",
+           "SEMANTIC_CACHE_SIZE": "0"}
+    stub_dir = None
+    if args.stub:
+        env["ENCODER_BACKEND"] = "stub"
+        stub_dir = tempfile.TemporaryDirectory()
+        env["ARTIFACT_DIR"] = str(stub_artifacts(Path(stub_dir.name) / "artifacts"))
+
+    print(f"{os.cpu_count()} CPUs; {'stub' if args.stub else 'model'} encoder")
+    print(f"{'workers':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'CPU':>6} | "
+          f"{'RSS/w':>7} {'PSS/w':>7} {'USS/w':>7} {'PSS sum':>8} MiB")
+    results = []
+    try:
+        for workers in args.workers:
+            r = measure(workers, args, queries, env)
+            results.append(r)
+            print(f"{workers:>7} {r['rps']:>8.1f} {r.get('p50_ms', 0):>8.1f} {r.get('p99_ms', 0):>8.1f} "
+                  f"{r['cpu_util'] * 100:>5.0f}% | {r['rss_mib_per_worker']:>7.0f} {r['pss_mib_per_worker']:>7.0f} "
+                  f"{r['uss_mib_per_worker']:>7.0f} {r['pss_mib_total']:>8.0f}")
+    finally:
+        if stub_dir is not None:
+            stub_dir.cleanup()
+
+    out = args.out or RESULTS_DIR / time.strftime("workers-%Y%m%d-%H%M%S.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"run_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "cpus": os.cpu_count(),
+                               "env": env, "results": results}, indent=2), encoding="utf-8")
+    print(f"Saved {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+import numpy as np
+
+_WS = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Canonical cache key form: lowercased with whitespace collapsed"""
+    return _WS.sub(" ", text).strip().lower()
+
+
+def file_fingerprint(paths: Iterable[Path]) -> Tuple:
+    """Cheap change detector for on-disk artifacts (mtime + size)"""
+    parts = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            parts.append((str(p), st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            parts.append((str(p), None, None))
+    return tuple(parts)
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after a fixed TTL"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, value = entry
+            if expires < now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class SemanticCache:
+    """Results of recent queries, reused for a new query whose embedding is close enough
+
+    Query embeddings sit in one preallocated matrix, so a lookup is a single
+    matrix-vector product over at most maxsize rows. An entry only matches
+    queries in the same namespace, i.e. whatever else its result depends on
+    (top_k, filters, snapshot). Least recently used entries are evicted
+    first; entries also expire after the TTL.
+
+    A sampled fraction of hits (verify_rate) is recomputed by the caller and
+    reported back through verify(), which counts false reuses.
+    """
+
+    def __init__(self, maxsize: int = 512, threshold: float = 0.97, ttl: float = 3600.0,
+                 verify_rate: float = 0.0):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.ttl = ttl
+        self.verify_rate = verify_rate
+        self._matrix: Optional[np.ndarray] = None  # allocated on the first set, once the dim is known
+        self._namespaces = np.zeros(maxsize, dtype=np.int64)
+        self._used = np.zeros(maxsize, dtype=np.float64)
+        self._expires = np.zeros(maxsize, dtype=np.float64)
+        self._values = [None] * maxsize
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.verified = 0
+        self.false_reuse = 0
+
+    def _nearest(self, embedding: np.ndarray, namespace: Hashable, now: float) -> Tuple[int, float]:
+        """Slot and similarity of the closest live entry in the namespace (-1 if none)"""
+        if not self._size:
+            return -1, -1.0
+        n = self._size
+        sims = self._matrix[:n] @ embedding
+        sims[(self._namespaces[:n] != hash(namespace)) | (self._expires[:n] < now)] = -np.inf
+        slot = int(np.argmax(sims))
+        return (slot, float(sims[slot])) if np.isfinite(sims[slot]) else (-1, -1.0)
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        v = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = float(np.linalg.norm(v))
+        return v / norm if norm else v
+
+    def get(self, embedding, namespace: Hashable) -> Optional[Any]:
+        if not self.maxsize:
+            return None
+        q = self._unit(embedding)
+        now = time.monotonic()
+        with self._lock:
+            slot, sim = self._nearest(q, namespace, now)
+            if slot < 0 or sim < self.threshold:
+                self.misses += 1
+                return None
+            self._used[slot] = now
+            self.hits += 1
+            return self._values[slot]
+
+    def set(self, embedding, namespace: Hashable, value: Any) -> None:
+        if not self.maxsize:
+            return
+        q = self._unit(embedding)
+        now = time.monotonic()
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != len(q):
+                self._matrix = np.zeros((self.maxsize, len(q)), dtype=np.float32)
+                self._size = 0
+            slot, sim = self._nearest(q, namespace, now)
+            if slot < 0 or sim < 0.9999:  # otherwise refresh the entry for this same query
+                if self._size < self.maxsize:
+                    slot = self._size
+                    self._size += 1
+                else:
+                    slot = int(np.argmin(np.where(self._expires < now, -np.inf, self._used)))
+                    if self._expires[slot] >= now:
+                        self.evictions += 1
+            self._matrix[slot] = q
+            self._namespaces[slot] = hash(namespace)
+            self._used[slot] = now
+            self._expires[slot] = now + self.ttl
+            self._values[slot] = value
+
+    def should_verify(self) -> bool:
+        return self.verify_rate > 0 and random.random() < self.verify_rate
+
+    def verify(self, reused: Any, fresh: Any) -> bool:
+        """Record a recomputed hit; True if the reused value was wrong"""
+        wrong = reused != fresh
+        with self._lock:
+            self.verified += 1
+            self.false_reuse += wrong
+        return wrong
+
+    def clear(self) -> None:
+        with self._lock:
+            self._size = 0
+            self._values = [None] * self.maxsize
+            self.invalidations += 1
+
+    def __len__(self) -> int:
+        return self._size
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": self._size,
+            "maxsize": self.maxsize,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "verified": self.verified,
+            "false_reuse": self.false_reuse,
+            "false_reuse_rate": self.false_reuse / self.verified if self.verified else 0.0,
+        }
@@ -0,0 +1,58 @@
+"""
+Compact catalog for the request path
+
+Full records stay where they were loaded from: the memory-mapped store's
+lazily decoded records, or the parsed JSON list. Over the store, a worker
+keeps no decoded records at all; the record bytes are page cache shared by
+every worker. The only per-item column is test_type, needed for every ranked
+candidate, stored as a uint8 code into a small table. A response entry
+decodes its one record when the response is built.
+"""
+
+from collections.abc import Sequence
+from typing import Dict
+
+import numpy as np
+
+DISPLAY_DESC_CHARS = 240
+
+
+class CompactCatalog(Sequence):
+    """Catalog records plus their test-type codes"""
+
+    def __init__(self, records: Sequence[dict]):
+        self.records = records
+        types: Dict[str, int] = {}
+        # One record decoded at a time, so building never holds them all
+        codes = np.fromiter((types.setdefault((it.get("test_type") or "").upper(), len(types)) for it in records),
+                            dtype=np.uint32, count=len(records))
+        self.test_types = tuple(types)
+        self.test_type_codes = codes.astype(np.uint8 if len(types) <= 256 else np.uint16)
+
+    def __len__(self) -> int:
+        return len(self.test_type_codes)
+
+    def __getitem__(self, i):
+        """The full record, as loaded"""
+        return self.records[i]
+
+    def test_type(self, i: int) -> str:
+        """Upper-cased test type of item i"""
+        return self.test_types[self.test_type_codes[i]]
+
+    def url(self, i: int) -> str:
+        return self.records[i].get("url")
+
+    def recommendation(self, i: int, score: float) -> dict:
+        """Response entry for item i; a fresh dict the caller may keep"""
+        it = self.records[i]
+        return {
+            "name": it.get("name"),
+            "url": it.get("url"),
+            "description": (it.get("description") or "")[:DISPLAY_DESC_CHARS],
+            "score": score,
+            "test_type": self.test_types[self.test_type_codes[i]],
+            "job_levels": it.get("job_levels", ""),
+            "adaptive_support": it.get("adaptive_support", ""),
+            "remote_testing": it.get("remote_testing", ""),
+        }
@@ -0,0 +1,245 @@
+"""
+Named catalogs served side by side from one process
+
+A catalog is a directory of artifacts plus the name of the model that embedded
+it. The directory holds final_catalog.json, embeddings.bin or embeddings.pt,
+and optional index files. It can also be a pipeline.py artifact root with a
+CURRENT pointer. Catalogs are built on first use. Catalogs that name the same
+model share one encoder, so a query costs one encode whichever catalog it
+targets.
+
+Each catalog's memory is measured once, when it is built. Heap memory (arrays
+and Python objects it owns) and file-backed pages mapped from its embedding
+store are counted separately. When the total exceeds the cap, the least
+recently used catalogs are evicted. Requests already holding one finish on it.
+
+CATALOGS points at a JSON file naming the extra catalogs; relative directories
+are resolved against the file:
+
+    {"uk": {"directory": "catalogs/uk"},
+     "client-a": {"directory": "/data/client-a", "model": "all-mpnet-base-v2"}}
+
+"default" is the catalog the API has always served (ARTIFACT_DIR, falling
+back to the repo root). It is pinned and never evicted.
+"""
+
+import json
+import mmap
+import sys
+import threading
+import time
+import types
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_CATALOG = "default"
+
+# Walking into these would count code or shared interpreter state, not catalog data
+_OPAQUE = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+class CatalogSpec:
+    """Where a catalog's artifacts live and which model embedded them"""
+
+    def __init__(self, name: str, directory: Optional[Path], model: str, pinned: bool = False):
+        self.name = name
+        self.directory = directory  # None: the default artifact location
+        self.model = model
+        self.pinned = pinned
+
+
+def load_specs(path, default_model: str) -> Dict[str, CatalogSpec]:
+    """The default catalog plus those listed in path (if given)"""
+    specs = {DEFAULT_CATALOG: CatalogSpec(DEFAULT_CATALOG, None, default_model, pinned=True)}
+    if not path:
+        return specs
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Catalog list {path} not found")
+    for name, entry in json.loads(path.read_text(encoding="utf-8")).items():
+        if name == DEFAULT_CATALOG:
+            raise ValueError(f"{path}: the catalog name {DEFAULT_CATALOG!r} is reserved")
+        if not entry.get("directory"):
+            raise ValueError(f"{path}: catalog {name!r} has no directory")
+        directory = Path(entry["directory"])
+        if not directory.is_absolute():
+            directory = path.parent / directory
+        specs[name] = CatalogSpec(name, directory, entry.get("model") or default_model)
+    # The embedding store in a directory belongs to one model; two would keep rewriting it
+    models: Dict[Path, str] = {}
+    for spec in specs.values():
+        if spec.directory is not None and models.setdefault(spec.directory.resolve(), spec.model) != spec.model:
+            raise ValueError(f"{path}: catalogs in {spec.directory} are embedded with different models")
+    return specs
+
+
+def _array_owner(arr: np.ndarray) -> np.ndarray:
+    """The outermost array in a chain of views, i.e. the one holding the buffer"""
+    while isinstance(arr.base, np.ndarray):
+        arr = arr.base
+    return arr
+
+
+def memory_usage(root: Any, shared: Iterable[Any] = ()) -> Tuple[int, int]:
+    """Approximate (heap bytes, mapped bytes) reachable from root
+
+    Arrays count their buffer once, however many views point at it; buffers
+    backed by an mmap count as mapped. Objects in shared are not counted, nor
+    is anything reachable only through them.
+    """
+    seen = {id(o) for o in shared}
+    heap = mapped = 0
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _OPAQUE):
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, np.ndarray):
+            owner = _array_owner(obj)
+            if id(owner) not in seen or owner is obj:
+                seen.add(id(owner))
+                if isinstance(owner.base, mmap.mmap) or isinstance(owner, np.memmap):
+                    mapped += owner.nbytes
+                else:
+                    heap += owner.nbytes
+            continue
+        heap += sys.getsizeof(obj)
+        if isinstance(obj, (str, bytes, int, float, bool)):
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        if hasattr(obj, "__dict__"):
+            stack.append(obj.__dict__)
+        for slot in getattr(type(obj), "__slots__", ()):
+            if hasattr(obj, slot):
+                stack.append(getattr(obj, slot))
+    return heap, mapped
+
+
+class _Loaded:
+    __slots__ = ("snapshot", "heap", "mapped", "used")
+
+    def __init__(self, snapshot, heap: int, mapped: int):
+        self.snapshot = snapshot
+        self.heap = heap
+        self.mapped = mapped
+        self.used = time.monotonic()
+
+    @property
+    def nbytes(self) -> int:
+        return self.heap + self.mapped
+
+
+class CatalogRegistry:
+    """Lazily built catalog snapshots, evicted least recently used first under a memory cap"""
+
+    def __init__(self, specs: Dict[str, CatalogSpec], build: Callable[[CatalogSpec], Any],
+                 memory_cap: int = 0, shared: Iterable[Any] = ()):
+        self.specs = specs
+        self.memory_cap = memory_cap  # bytes; 0 = unlimited
+        self._build = build
+        self._shared = list(shared)
+        self._loaded: "OrderedDict[str, _Loaded]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._building = {name: threading.Lock() for name in specs}
+        self.errors: Dict[str, str] = {}
+        self.loads = {name: 0 for name in specs}
+        self.evictions = {name: 0 for name in specs}
+
+    def peek(self, name: str, touch: bool = True):
+        """The loaded snapshot of name, marked as used unless touch is False; None if not loaded"""
+        with self._lock:
+            entry = self._loaded.get(name)
+            if entry is None:
+                return None
+            if touch:
+                self._loaded.move_to_end(name)
+                entry.used = time.monotonic()
+            return entry.snapshot
+
+    def get(self, name: str):
+        """Snapshot of name, building it if needed (blocking); KeyError for unknown names"""
+        snapshot = self.peek(name)
+        if snapshot is not None:
+            return snapshot
+        spec = self.specs[name]
+        # Concurrent first requests for one catalog wait for a single build
+        with self._building[name]:
+            snapshot = self.peek(name)
+            if snapshot is not None:
+                return snapshot
+            try:
+                snapshot = self._build(spec)
+            except Exception as e:
+                self.errors[name] = f"{type(e).__name__}: {e}"
+                raise
+            self.errors.pop(name, None)
+            self.put(name, snapshot)
+        return snapshot
+
+    def put(self, name: str, snapshot) -> None:
+        """Install (or replace) the snapshot of name, then evict down to the cap"""
+        heap, mapped = memory_usage(snapshot, self._shared)
+        with self._lock:
+            old = self._loaded.get(name)
+            self._loaded[name] = _Loaded(snapshot, heap, mapped)
+            if old is not None:
+                self._loaded[name].used = old.used  # a reload keeps its place in the LRU order
+            self.loads[name] += 1
+            evicted = self._evict(keep=name)
+        print(f"Catalog {name}: {heap / 2**20:.1f} MiB heap, {mapped / 2**20:.1f} MiB mapped")
+        for other in evicted:
+            print(f"Evicted catalog {other} to stay under {self.memory_cap / 2**20:.0f} MiB")
+
+    def _evict(self, keep: str) -> List[str]:
+        evicted = []
+        if not self.memory_cap:
+            return evicted
+        while sum(e.nbytes for e in self._loaded.values()) > self.memory_cap:
+            victim = next((n for n in self._loaded if n != keep and not self.specs[n].pinned), None)
+            if victim is None:
+                break  # what is left is pinned or was just requested
+            del self._loaded[victim]
+            self.evictions[victim] += 1
+            evicted.append(victim)
+        return evicted
+
+    def loaded(self) -> List[str]:
+        """Names of the loaded catalogs, least recently used first"""
+        with self._lock:
+            return list(self._loaded)
+
+    def memory(self) -> int:
+        with self._lock:
+            return sum(e.nbytes for e in self._loaded.values())
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            loaded = dict(self._loaded)
+        catalogs = {}
+        for name, spec in self.specs.items():
+            entry = loaded.get(name)
+            catalogs[name] = {
+                "loaded": entry is not None,
+                "model": spec.model,
+                "items": len(entry.snapshot.catalog) if entry else None,
+                "heap_mib": round(entry.heap / 2**20, 2) if entry else 0.0,
+                "mapped_mib": round(entry.mapped / 2**20, 2) if entry else 0.0,
+                "idle_s": round(now - entry.used, 1) if entry else None,
+                "loads": self.loads[name],
+                "evictions": self.evictions[name],
+                "error": self.errors.get(name),
+            }
+        return {
+            "memory_mib": round(sum(e.nbytes for e in loaded.values()) / 2**20, 2),
+            "memory_cap_mib": self.memory_cap / 2**20 if self.memory_cap else None,
+            "catalogs": catalogs,
+        }
@@ -0,0 +1,62 @@
+"""
+Overlapping token windows for queries longer than the encoder reads
+
+MiniLM reads at most 256 tokens, and model.encode silently drops the rest, so
+only the start of a long JD counts. split_windows cuts the text into windows
+of the model's length that overlap by a few tokens. It cuts at token
+boundaries from the model's own tokenizer, or at whitespace words when there
+is none. At most max_chunks windows are kept, spread evenly over the text, to
+bound the encode cost. The caller encodes the windows in one batch and pools
+them, either per item as its best window (max over the chunk-vs-catalog
+scores) or with mean_pool into a single query vector.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+_WORD = re.compile(r"\S+")
+
+
+def token_spans(text: str, tokenizer=None) -> List[Tuple[int, int]]:
+    """Character span of every token of text, without special tokens"""
+    if tokenizer is not None:
+        try:
+            enc = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, truncation=False,
+                            verbose=False)
+            return [(int(s), int(e)) for s, e in enc["offset_mapping"]]
+        except (TypeError, ValueError, NotImplementedError):
+            pass  # slow (pure Python) tokenizers cannot return offsets
+    return [m.span() for m in _WORD.finditer(text)]
+
+
+def split_windows(text: str, tokenizer=None, window: int = 254, overlap: int = 32,
+                  max_chunks: int = 8) -> Tuple[List[str], np.ndarray]:
+    """Windows of at most window tokens overlapping by overlap tokens, plus their token counts
+
+    A text that fits one window comes back whole. With more windows than
+    max_chunks, evenly spaced ones are kept, always including the first and last.
+    """
+    spans = token_spans(text, tokenizer)
+    if len(spans) <= window:
+        return [text], np.array([max(len(spans), 1)], dtype=np.float32)
+    stride = max(window - overlap, 1)
+    # The last window starts early enough to reach the end of the text
+    starts = list(range(0, len(spans) - window + stride, stride))
+    if max_chunks and len(starts) > max_chunks:
+        keep = np.unique(np.linspace(0, len(starts) - 1, max_chunks).round().astype(int))
+        starts = [starts[i] for i in keep]
+    windows, counts = [], []
+    for start in starts:
+        end = min(start + window, len(spans))
+        windows.append(text[spans[start][0]:spans[end - 1][1]])
+        counts.append(end - start)
+    return windows, np.array(counts, dtype=np.float32)
+
+
+def mean_pool(embeddings: np.ndarray, weights: Optional[np.ndarray] = None) -> np.ndarray:
+    """Weighted mean of normalized window embeddings, normalized again"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    pooled = embeddings.mean(axis=0) if weights is None else weights @ embeddings / weights.sum()
+    return pooled / max(float(np.linalg.norm(pooled)), 1e-12)
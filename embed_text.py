@@ -0,0 +1,28 @@
+"""
+Text each catalog item is embedded as
+
+Embeddings/Embed.py, pipeline.py and the API's re-embedding fallback all
+render items with item_text, so every embedding store holds vectors of the
+same text. TEMPLATE_TAG goes into the store fingerprint: editing the template
+or DESC_CHARS makes existing stores mismatch instead of silently mixing.
+"""
+
+import hashlib
+
+# Rich text representation for embedding, with weight on the name.
+# Part of every item's content hash: editing it re-embeds the whole catalog.
+TEXT_TEMPLATE = "{name} {name} {desc} Test Type: {test_type} Job Levels: {job_levels} Remote: {remote} Adaptive: {adaptive}"
+DESC_CHARS = 800
+
+TEMPLATE_TAG = hashlib.sha256(f"{TEXT_TEMPLATE}\0{DESC_CHARS}".encode("utf-8")).hexdigest()[:16]
+
+
+def item_text(item: dict) -> str:
+    return TEXT_TEMPLATE.format(
+        name=item.get('name', '').strip(),
+        desc=item.get('description', '').strip()[:DESC_CHARS],
+        test_type=item.get('test_type', '').strip(),
+        job_levels=item.get('job_levels', '').strip(),
+        remote=item.get('remote_testing', '').strip(),
+        adaptive=item.get('adaptive_support', '').strip(),
+    )
@@ -0,0 +1,314 @@
+import asyncio
+import inspect
+import os
+import shutil
+import time
+import zlib
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+class BatchingEncoder:
+    """Micro-batch concurrent encode calls into one model.encode on a worker thread"""
+
+    def __init__(
+        self,
+        model,
+        window_ms: float = float(os.getenv("ENCODER_WINDOW_MS", "3")),
+        max_batch: int = int(os.getenv("ENCODER_MAX_BATCH", "32")),
+        max_queue: int = int(os.getenv("ENCODER_QUEUE_SIZE", "1024")),
+    ):
+        self.model = model
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        # Fail anything still waiting so callers don't hang
+        while not self._queue.empty():
+            _fail([self._queue.get_nowait()], RuntimeError("Encoder stopped"))
+
+    async def encode(self, text: str):
+        """Encode one query; resolves once its batch has been run"""
+        if self._worker is None:
+            await self.start()
+        fut = asyncio.get_running_loop().create_future()
+        # Bounded queue: callers wait here when the encoder is saturated
+        await self._queue.put((text, fut))
+        return await fut
+
+    async def encode_many(self, texts: List[str]) -> np.ndarray:
+        """Encode the texts of one query (e.g. windows of a long JD), queued together so they share a batch"""
+        if self._worker is None:
+            await self.start()
+        loop = asyncio.get_running_loop()
+        futs = []
+        for text in texts:
+            fut = loop.create_future()
+            await self._queue.put((text, fut))
+            futs.append(fut)
+        return np.stack(await asyncio.gather(*futs))
+
+    async def _collect(self) -> List[Tuple[str, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+            except asyncio.CancelledError:
+                # Already off the queue, so stop() would not fail these
+                _fail(batch, RuntimeError("Encoder stopped"))
+                raise
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            texts = [t for t, _ in batch]
+            try:
+                embs = await loop.run_in_executor(None, self._encode_batch, texts)
+            except asyncio.CancelledError:
+                # Stopped mid-batch: its callers would otherwise wait forever
+                _fail(batch, RuntimeError("Encoder stopped"))
+                raise
+            except Exception as e:
+                _fail(batch, e)
+                continue
+            for (_, fut), emb in zip(batch, embs):
+                if not fut.done():
+                    fut.set_result(emb)
+
+    def _encode_batch(self, texts: List[str]):
+        return self.model.encode(
+            texts,
+            batch_size=self.max_batch,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        )
+
+
+def _fail(batch: List[Tuple[str, asyncio.Future]], exc: BaseException) -> None:
+    for _, fut in batch:
+        if not fut.done():
+            fut.set_exception(exc)
+
+
+DEFAULT_ONNX_DIR = Path(__file__).parent / "onnx"
+
+
+def _hub_name(model_name: str) -> str:
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+
+def onnx_model_dir(model_name: str) -> Path:
+    return Path(os.getenv("ONNX_MODEL_DIR", DEFAULT_ONNX_DIR / model_name))
+
+
+def export_onnx(model_name: str, out_dir: Path, opset: int = 14) -> Path:
+    """Export the transformer to ONNX and write a dynamically int8-quantized copy
+
+    The export is written to a private directory and each file renamed into
+    out_dir, model_int8.onnx (what load_encoder checks for) last. Processes
+    exporting at the same time never read or overwrite a half-written file.
+    """
+    out_dir = Path(out_dir)
+    tmp_dir = out_dir.parent / f".{out_dir.name}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    try:
+        _export_onnx(model_name, tmp_dir, opset)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        files = sorted(tmp_dir.iterdir(), key=lambda f: f.name == "model_int8.onnx")
+        for f in files:
+            os.replace(f, out_dir / f.name)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return out_dir / "model_int8.onnx"
+
+
+def _export_onnx(model_name: str, out_dir: Path, opset: int) -> None:
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(_hub_name(model_name))
+    model = AutoModel.from_pretrained(_hub_name(model_name)).eval()
+    tokenizer.save_pretrained(out_dir)
+
+    class _Hidden(torch.nn.Module):
+        # Keyword call keeps the export independent of forward()'s positional order
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, *inputs):
+            return self.inner(**dict(zip(names, inputs))).last_hidden_state
+
+    dummy = tokenizer(["export the encoder"], return_tensors="pt")
+    names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in dummy]
+    axes = {n: {0: "batch", 1: "seq"} for n in names}
+    axes["last_hidden_state"] = {0: "batch", 1: "seq"}
+    fp32_path = out_dir / "model.onnx"
+    kwargs = dict(input_names=names, output_names=["last_hidden_state"],
+                  dynamic_axes=axes, opset_version=opset)
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False
+    with torch.no_grad():
+        torch.onnx.export(_Hidden(model), tuple(dummy[n] for n in names), str(fp32_path), **kwargs)
+
+    quantize_dynamic(str(fp32_path), str(out_dir / "model_int8.onnx"), weight_type=QuantType.QInt8)
+
+
+class OnnxEncoder:
+    """SentenceTransformer-style encode() over the int8 ONNX export (mean pooling)"""
+
+    def __init__(self, model_dir: Path, threads: int = 0, max_seq_length: int = 256,
+                 model_file: str = "model_int8.onnx"):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_dir = Path(model_dir)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            opts.intra_op_num_threads = threads
+            opts.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(str(model_dir / model_file), opts,
+                                            providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+        self.max_seq_length = max_seq_length
+        self._dim = None
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self._dim is None:
+            self._dim = int(self.encode(["dimension probe"]).shape[1])
+        return self._dim
+
+    def _run(self, texts: List[str]) -> np.ndarray:
+        enc = self.tokenizer(texts, padding=True, truncation=True,
+                             max_length=self.max_seq_length, return_tensors="np")
+        feeds = {k: v.astype(np.int64) for k, v in enc.items() if k in self._inputs}
+        hidden = self.session.run(None, feeds)[0]
+        mask = enc["attention_mask"][..., None].astype(np.float32)
+        return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+    def encode(self, sentences, batch_size: int = 32, normalize_embeddings: bool = False,
+               convert_to_tensor: bool = False, show_progress_bar: bool = False, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self._dim or 0), dtype=np.float32)
+        # Longest first so each batch pads to similar lengths
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        out = None
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            emb = self._run([texts[i] for i in idx])
+            if out is None:
+                out = np.empty((len(texts), emb.shape[1]), dtype=np.float32)
+            out[idx] = emb
+        if normalize_embeddings:
+            out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        if convert_to_tensor:
+            import torch
+            out = torch.from_numpy(out)
+        return out[0] if single else out
+
+
+class StubEncoder:
+    """Deterministic hashed bag-of-words vectors in place of a model
+
+    For load tests that measure HTTP and ranking overhead without model time;
+    STUB_ENCODE_MS adds a fixed delay per encode call to stand in for it.
+    """
+
+    def __init__(self, dim: int = 384, delay_ms: float = 0.0):
+        self.dim = dim
+        self.delay = delay_ms / 1000.0
+        self.max_seq_length = 256
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def _vector(self, text: str) -> np.ndarray:
+        v = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().split():
+            v[zlib.crc32(word.encode("utf-8")) % self.dim] += 1.0
+        return v
+
+    def encode(self, sentences, batch_size: int = 32, normalize_embeddings: bool = False,
+               convert_to_tensor: bool = False, show_progress_bar: bool = False, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if self.delay:
+            time.sleep(self.delay)
+        out = np.stack([self._vector(t) for t in texts]) if texts else np.zeros((0, self.dim), np.float32)
+        if normalize_embeddings:
+            out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        if convert_to_tensor:
+            import torch
+            out = torch.from_numpy(out)
+        return out[0] if single else out
+
+
+def backend_tag(model=None) -> str:
+    """Backend whose vectors model produces (torch, onnx or stub); ENCODER_BACKEND when model is None"""
+    if model is None:
+        return os.getenv("ENCODER_BACKEND", "torch")
+    if isinstance(model, OnnxEncoder):
+        return "onnx"
+    if isinstance(model, StubEncoder):
+        return "stub"
+    return "torch"
+
+
+def load_encoder(model_name: str, backend: Optional[str] = None):
+    """Model with a SentenceTransformer-compatible encode(); ENCODER_BACKEND=torch|onnx|stub"""
+    backend = backend or os.getenv("ENCODER_BACKEND", "torch")
+    # ENCODER_THREADS caps intra-op threads, so several workers don't oversubscribe the cores
+    threads = int(os.getenv("ENCODER_THREADS", "0"))
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+            try:
+                torch.set_num_interop_threads(1)
+            except RuntimeError:
+                pass  # only settable before the first parallel op in the process
+        return SentenceTransformer(model_name)
+    if backend == "onnx":
+        model_dir = onnx_model_dir(model_name)
+        if not (model_dir / "model_int8.onnx").exists():
+            print(f"Exporting {model_name} to {model_dir}...")
+            export_onnx(model_name, model_dir)
+        return OnnxEncoder(model_dir, threads=int(os.getenv("ONNX_THREADS") or threads))
+    if backend == "stub":
+        return StubEncoder(dim=int(os.getenv("STUB_DIM", "384")), delay_ms=float(os.getenv("STUB_ENCODE_MS", "0")))
+    raise ValueError(f"Unknown encoder backend {backend!r}; expected 'torch', 'onnx' or 'stub'")
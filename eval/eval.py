@@ -1,10 +1,13 @@
 import pandas as pd
 import numpy as np
 from sentence_transformers import SentenceTransformer, util
-from rank_bm25 import BM25Okapi
 import json
-import os
-import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from hybrid import HybridRetriever
+from skills import load_detector
 
 train = pd.read_csv('train.csv').groupby('Query')['Assessment_url'].apply(lambda x: ';'.join(x.unique())).reset_index(name='ground_truth_urls')
 with open('final_catalog.json') as f:
@@ -15,10 +18,8 @@ def normalize_url(url):
 
 model = SentenceTransformer('all-mpnet-base-v2')
 
-def extract_keywords(query):
-    tech = re.findall(r'\b(java|python|sql|javascript|selenium|\.net|excel|c\+\+|html|css)\b', query, re.I)
-    soft = re.findall(r'\b(collaborat\w*|communicat\w*|leadership|teamwork|interpersonal|personality|behavior)\b', query, re.I)
-    return {'tech': set([k.lower() for k in tech]), 'soft': set([k.lower() for k in soft])}
+# Same skill vocabulary and whole-word matching as the API
+detector = load_detector()
 
 def item_text(item):
     name = item.get('name', '')
@@ -29,30 +30,23 @@ def item_text(item):
 texts = [item_text(item) for item in catalog]
 embeddings = model.encode(texts, normalize_embeddings=True, show_progress_bar=True)
 
-# BM25
-tokenized = [t.lower().split() for t in texts]
-bm25 = BM25Okapi(tokenized)
+# BM25 inverted index + keyword masks over name/description
+retriever = HybridRetriever(
+    texts,
+    boost_texts=[item['name'] + ' ' + item.get('description', '') for item in catalog],
+    detector=detector,
+)
 
 def get_top10_balanced(query):
-    kw = extract_keywords(query)
-    needs_soft = len(kw['soft']) > 0 or 'collaborate' in query.lower() or 'team' in query.lower()
+    kw = detector.detect(query)
+    needs_soft = len(kw['soft']) > 0
     
     # Scores
     q_emb = model.encode(f"{query} {' '.join(kw['tech'])} {' '.join(kw['soft'])}", normalize_embeddings=True)
     sem_scores = util.cos_sim(q_emb, embeddings)[0].cpu().numpy()
-    bm25_scores = bm25.get_scores(query.lower().split())
-    
-    combined = 0.6 * sem_scores + 0.4 * (bm25_scores / (bm25_scores.max() + 1e-6))
     
-    # Keyword boost
-    for i, item in enumerate(catalog):
-        item_lower = (item['name'] + ' ' + item.get('description','')).lower()
-        for kw_tech in kw['tech']:
-            if kw_tech in item_lower:
-                combined[i] += 0.25
-        for kw_soft in kw['soft']:
-            if kw_soft in item_lower:
-                combined[i] += 0.3
+    # 0.6 semantic + 0.4 normalized BM25, plus keyword boosts
+    combined = retriever.score(sem_scores, query, [(kw['tech'], 0.25), (kw['soft'], 0.3)])
     
     # Get top 20, then diversify
     top20_idx = np.argsort(combined)[-20:][::-1]
@@ -0,0 +1,354 @@
+"""
+Evaluation harness: Recall@K / MAP@K and ranking latency per retrieval configuration
+
+Catalog embeddings are cached per (model, backend, embedded texts), which
+covers the text template and the catalog. All queries are encoded in one batch.
+Every query is ranked through the API's own code path (app.rank_balanced
+on a Snapshot), so the numbers track what /recommend serves. Configurations
+run in parallel worker processes. Each run appends one JSON line per
+configuration to the results file, so quality and latency regressions sit
+side by side.
+
+The rerank presets reorder the top N (10, 20, 50) with the cross-encoder
+(RERANK_MODEL), without a budget, inside the timed section. The chunk
+presets encode queries longer than the model reads as overlapping windows
+(LONG_QUERY=max or mean) instead of truncating them. Each of these runs with
+its base configuration and reports its Recall@10 gain against the p95 and
+encode latency it adds.
+
+    python eval/run_eval.py                              # every preset
+    python eval/run_eval.py -c semantic -c hybrid -w 2   # two presets in parallel
+    python eval/run_eval.py -c rerank20                  # rerank20 and semantic+filters
+    python eval/run_eval.py -c chunk-max -c chunk-mean   # windowed long queries vs truncation
+    python eval/run_eval.py -c hybrid --semantic-cache   # near-duplicate reuse per threshold
+
+--semantic-cache also ranks small edits of every train query: a sentence
+appended or cut, a word dropped, two words swapped. For each similarity
+threshold it reports how often the API's semantic cache would reuse the
+original query's results, how often that reuse changes the top-10 list, and
+Recall@10 with reuse against fresh ranking.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+EVAL_DIR = Path(__file__).parent
+ROOT = EVAL_DIR.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "Embeddings"))
+
+CACHE_DIR = EVAL_DIR / ".cache"
+RESULTS_PATH = EVAL_DIR / "results.jsonl"
+KS = (5, 10)
+SEMANTIC_THRESHOLDS = (0.90, 0.95, 0.97, 0.99)
+BOILERPLATE = ("We are an equal opportunity employer.", "Apply before the end of the month.",
+               "Hybrid working is available.")
+
+# name -> model, catalog text template, retrieval mode, query-constraint filtering
+CONFIGS: Dict[str, Dict] = {
+    "semantic": {"model": "all-MiniLM-L6-v2", "template": "app", "retrieval": "semantic", "constraints": False},
+    "semantic+filters": {"model": "all-MiniLM-L6-v2", "template": "app", "retrieval": "semantic", "constraints": True},
+    "hybrid": {"model": "all-MiniLM-L6-v2", "template": "app", "retrieval": "hybrid", "constraints": False},
+    "hybrid+filters": {"model": "all-MiniLM-L6-v2", "template": "app", "retrieval": "hybrid", "constraints": True},
+    "semantic/embed-template": {"model": "all-MiniLM-L6-v2", "template": "embed", "retrieval": "semantic",
+                                "constraints": False},
+    # What eval.py / evaluation.py measure
+    "mpnet/eval-template": {"model": "all-mpnet-base-v2", "template": "eval", "retrieval": "semantic",
+                            "constraints": False},
+}
+# Cross-encoder over the top N of a base configuration
+for _n in (10, 20, 50):
+    CONFIGS[f"rerank{_n}"] = {**CONFIGS["semantic+filters"], "rerank": _n, "base": "semantic+filters"}
+# Long queries as pooled windows instead of their first 256 tokens
+for _mode in ("max", "mean"):
+    CONFIGS[f"chunk-{_mode}"] = {**CONFIGS["semantic+filters"], "long_query": _mode, "base": "semantic+filters"}
+
+
+def _eval_text(item: dict) -> str:
+    """Template of eval.py / generate_test_submission.py"""
+    name = item.get('name', '')
+    desc = item.get('description', '')[:1200]
+    type_map = {'K': 'technical programming coding', 'P': 'personality behavior soft-skills communication teamwork',
+                'S': 'leadership management simulation'}
+    return f"{name} {name} {desc} {type_map.get(item.get('test_type', ''), '')} {item.get('job_levels', '')}"
+
+
+def _templates():
+    from app import _item_text
+    from Embed import item_text
+
+    return {"app": _item_text, "embed": item_text, "eval": _eval_text}
+
+
+def slug(url: str) -> str:
+    return url.strip().lower().rstrip("/").split("/")[-1]
+
+
+def cached_encode(model, model_key: str, texts: List[str]) -> np.ndarray:
+    """Encode texts once per (model, texts); later runs load the .npy"""
+    h = hashlib.sha256(model_key.encode("utf-8"))
+    for t in texts:
+        h.update(b"\0")
+        h.update(t.encode("utf-8"))
+    path = CACHE_DIR / f"{h.hexdigest()[:24]}.npy"
+    if path.exists():
+        return np.load(path)
+    emb = np.asarray(model.encode(texts, batch_size=64, convert_to_numpy=True, normalize_embeddings=True),
+                     dtype=np.float32)
+    CACHE_DIR.mkdir(exist_ok=True)
+    # Parallel workers may encode the same texts; each writes its own temp file
+    tmp = path.with_suffix(f".{os.getpid()}.tmp.npy")
+    np.save(tmp, emb)
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        if not path.exists():
+            raise
+    return emb
+
+
+def paraphrases(query: str, rng: np.random.Generator) -> List[str]:
+    """Small edits a recruiter makes when pasting the same JD again"""
+    words = query.split()
+    out = [f"{query} {BOILERPLATE[rng.integers(len(BOILERPLATE))]}"]
+    if len(words) > 4:
+        drop = rng.integers(len(words))
+        out.append(" ".join(words[:drop] + words[drop + 1:]))
+        i = rng.integers(len(words) - 1)
+        out.append(" ".join(words[:i] + [words[i + 1], words[i]] + words[i + 2:]))
+    sentences = re.split(r"(?<=[.!?])\s+", query.strip())
+    if len(sentences) > 1:
+        out.append(" ".join(sentences[:-1]))
+    return out
+
+
+def ranking_metrics(predicted: np.ndarray, relevant: np.ndarray, n_relevant: np.ndarray) -> Dict[str, float]:
+    """Mean Recall@K and MAP@K over queries
+
+    predicted: (queries, K) item-slug ids, -1 padded; relevant: (queries, slugs)
+    bool ground truth; n_relevant: ground-truth size per query (including
+    slugs missing from the catalog).
+    """
+    hits = np.take_along_axis(relevant, np.maximum(predicted, 0), axis=1) & (predicted >= 0)
+    ranks = np.arange(1, hits.shape[1] + 1)
+    precision = np.cumsum(hits, axis=1) / ranks
+    out = {}
+    for k in KS:
+        out[f"recall@{k}"] = float(np.mean(hits[:, :k].sum(1) / n_relevant))
+        ap = (precision[:, :k] * hits[:, :k]).sum(1) / np.minimum(n_relevant, k)
+        out[f"map@{k}"] = float(np.mean(ap))
+    return out
+
+
+def run_config(name: str, config: Dict, train_path: str, catalog_path: str, threads: int,
+               thresholds: Tuple[float, ...] = ()) -> Dict:
+    if threads:
+        os.environ.setdefault("OMP_NUM_THREADS", str(threads))
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+    import app
+    from encoder import load_encoder
+    from filters import CatalogAttributes
+    from hybrid import HybridRetriever
+    from scoring import ScoringIndex
+
+    catalog = json.loads(Path(catalog_path).read_text(encoding="utf-8"))
+    train = pd.read_csv(train_path).groupby("Query", sort=False)["Assessment_url"].apply(
+        lambda s: {slug(u) for u in s}).reset_index(name="slugs")
+    queries = train["Query"].tolist()
+
+    backend = config.get("backend") or os.getenv("ENCODER_BACKEND", "torch")
+    start = time.perf_counter()
+    model = load_encoder(config["model"], backend)
+    load_s = time.perf_counter() - start
+
+    texts = [_templates()[config["template"]](it) for it in catalog]
+    reranker = None
+    if config.get("rerank"):
+        from rerank import load_reranker
+
+        reranker = load_reranker(os.getenv("RERANK_MODEL", app.RERANK_MODEL), top_n=config["rerank"])
+
+    model_key = f"{config['model']}|{backend}"
+    start = time.perf_counter()
+    catalog_emb = cached_encode(model, model_key, texts)
+    catalog_s = time.perf_counter() - start
+
+    mode = config.get("long_query", "truncate")
+
+    def encode_queries(texts, augmented):
+        """Pooled query embeddings plus window embeddings (for max pooling), windows encoded in one batch"""
+        windows = [app.query_windows(model, t, a, mode) for t, (a, _) in zip(texts, augmented)]
+        embs = np.asarray(model.encode([w for ws, _ in windows for w in ws], batch_size=64, convert_to_numpy=True,
+                                       normalize_embeddings=True), dtype=np.float32)
+        pooled, offset = [], 0
+        for ws, weights in windows:
+            pooled.append(app.pool_windows(embs[offset:offset + len(ws)], weights, mode))
+            offset += len(ws)
+        return np.stack([p[0] for p in pooled]), [p[1] for p in pooled]
+
+    augmented = [app._augment_query(q) for q in queries]
+    start = time.perf_counter()
+    q_embs, q_chunks = encode_queries(queries, augmented)
+    encode_ms = (time.perf_counter() - start) * 1e3 / len(queries)
+
+    hybrid = None
+    if config["retrieval"] == "hybrid":
+        hybrid = HybridRetriever(
+            [app._item_text(it) for it in catalog],
+            boost_texts=[f"{it.get('name', '')} {it.get('description', '')}" for it in catalog],
+            detector=app.skill_detector,
+        )
+    snap = app.Snapshot(0, None, ROOT, catalog, ScoringIndex(catalog_emb), hybrid, CatalogAttributes(catalog))
+
+    slug_ids: Dict[str, int] = {}
+    for it in catalog:
+        slug_ids.setdefault(slug(it["url"]), len(slug_ids))
+    k_max = max(KS)
+
+    def rank(query, q_emb, skills, chunks=None):
+        mask = app.candidate_mask(query, top_k=k_max, snap=snap, extract=config["constraints"])
+        rerank = None
+        if reranker is not None:
+            rerank = lambda search: reranker.rerank(query, search, snap)  # noqa: E731
+        recs = app.rank_balanced(q_emb, skills, top_k=k_max, query=query, snap=snap, mask=mask, rerank=rerank,
+                                 chunks=chunks)
+        return recs, app.semantic_namespace(k_max, snap, mask)
+
+    def slug_row(recs):
+        ids = list(dict.fromkeys(slug_ids[slug(r["url"])] for r in recs))[:k_max]
+        return ids + [-1] * (k_max - len(ids))
+
+    predicted = np.full((len(queries), k_max), -1, dtype=np.int64)
+    latencies = np.empty(len(queries))
+    originals = []
+    for row, (query, (_, skills)) in enumerate(zip(queries, augmented)):
+        start = time.perf_counter()
+        recs, namespace = rank(query, q_embs[row], skills, q_chunks[row])
+        latencies[row] = (time.perf_counter() - start) * 1e3
+        predicted[row] = slug_row(recs)
+        originals.append(namespace)
+
+    relevant = np.zeros((len(queries), len(slug_ids)), dtype=bool)
+    for row, slugs in enumerate(train["slugs"]):
+        relevant[row, [slug_ids[s] for s in slugs if s in slug_ids]] = True
+    n_relevant = train["slugs"].map(len).to_numpy()
+
+    semantic = []
+    if thresholds:
+        rng = np.random.default_rng(0)
+        variants = [(row, v) for row, q in enumerate(queries) for v in paraphrases(q, rng)]
+        v_augmented = [app._augment_query(v) for _, v in variants]
+        v_embs, v_chunks = encode_queries([v for _, v in variants], v_augmented)
+        rows = np.array([row for row, _ in variants])
+        fresh = np.empty((len(variants), k_max), dtype=np.int64)
+        same_namespace = np.empty(len(variants), dtype=bool)
+        for i, ((row, variant), (_, skills)) in enumerate(zip(variants, v_augmented)):
+            recs, namespace = rank(variant, v_embs[i], skills, v_chunks[i])
+            fresh[i] = slug_row(recs)
+            same_namespace[i] = namespace == originals[row]
+        sims = np.einsum("ij,ij->i", v_embs, q_embs[rows])
+        changed = (fresh != predicted[rows]).any(axis=1)
+        fresh_recall = ranking_metrics(fresh, relevant[rows], n_relevant[rows])["recall@10"]
+        for t in thresholds:
+            reused = same_namespace & (sims >= t)
+            served = np.where(reused[:, None], predicted[rows], fresh)
+            semantic.append({
+                "threshold": t,
+                "variants": len(variants),
+                "reuse_rate": float(reused.mean()),
+                "changed_rate": float(changed[reused].mean()) if reused.any() else 0.0,
+                "recall@10": ranking_metrics(served, relevant[rows], n_relevant[rows])["recall@10"],
+                "fresh_recall@10": fresh_recall,
+            })
+
+    return {
+        "config": name,
+        **config,
+        "backend": backend,
+        "queries": len(queries),
+        **ranking_metrics(predicted, relevant, n_relevant),
+        "rank_ms_p50": float(np.percentile(latencies, 50)),
+        "rank_ms_p95": float(np.percentile(latencies, 95)),
+        "rank_ms_p99": float(np.percentile(latencies, 99)),
+        "encode_ms_per_query": encode_ms,
+        "catalog_embed_s": catalog_s,
+        "model_load_s": load_s,
+        **({"semantic_cache": semantic} if semantic else {}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-c", "--config", action="append", choices=sorted(CONFIGS),
+                        help="configuration to evaluate (repeatable; default: all)")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="parallel worker processes")
+    parser.add_argument("--train", default=str(EVAL_DIR / "train.csv"))
+    parser.add_argument("--catalog", default=str(ROOT / "final_catalog.json"))
+    parser.add_argument("--out", default=str(RESULTS_PATH), help="JSON lines file the results are appended to")
+    parser.add_argument("--semantic-cache", action="store_true",
+                        help="measure near-duplicate reuse on edited train queries")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=list(SEMANTIC_THRESHOLDS))
+    args = parser.parse_args()
+
+    names = args.config or list(CONFIGS)
+    # A rerank or chunk preset is only read against its base
+    names = list(dict.fromkeys(b for n in names for b in (CONFIGS[n].get("base"), n) if b))
+    workers = max(1, min(args.workers, len(names)))
+    # Split the cores so parallel configs don't oversubscribe each other
+    threads = max(1, (os.cpu_count() or 1) // workers) if workers > 1 else 0
+    thresholds = tuple(args.thresholds) if args.semantic_cache else ()
+    jobs = [(n, CONFIGS[n], args.train, args.catalog, threads, thresholds) for n in names]
+    if workers == 1:
+        results = [run_config(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_config, *zip(*jobs)))
+
+    run_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+    with open(args.out, "a", encoding="utf-8") as f:
+        for r in results:
+            f.write(json.dumps({"run_at": run_at, "workers": workers, **r}) + "\n")
+
+    print(f"{'config':<24} {'R@5':>6} {'R@10':>6} {'MAP@5':>6} {'MAP@10':>6} | "
+          f"{'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} | {'enc ms/q':>8}")
+    print("-" * 95)
+    for r in results:
+        print(f"{r['config']:<24} {r['recall@5']:>6.3f} {r['recall@10']:>6.3f} {r['map@5']:>6.3f} "
+              f"{r['map@10']:>6.3f} | {r['rank_ms_p50']:>7.2f} {r['rank_ms_p95']:>7.2f} "
+              f"{r['rank_ms_p99']:>7.2f} | {r['encode_ms_per_query']:>8.1f}")
+    by_name = {r["config"]: r for r in results}
+    compared = [r for r in results if r.get("base")]
+    if compared:
+        print(f"\n{'versus base':<24} {'base':<18} {'dR@10':>7} {'+p95 ms':>8} {'+enc ms/q':>10}")
+        for r in compared:
+            base = by_name[r["base"]]
+            print(f"{r['config']:<24} {r['base']:<18} {r['recall@10'] - base['recall@10']:>+7.3f} "
+                  f"{r['rank_ms_p95'] - base['rank_ms_p95']:>+8.2f} "
+                  f"{r['encode_ms_per_query'] - base['encode_ms_per_query']:>+10.1f}")
+    if thresholds:
+        print(f"\n{'semantic cache':<24} {'threshold':>9} {'reused':>7} {'changed':>8} {'R@10':>6} {'fresh':>6}")
+        for r in results:
+            for s in r["semantic_cache"]:
+                print(f"{r['config']:<24} {s['threshold']:>9.2f} {s['reuse_rate']:>7.1%} {s['changed_rate']:>8.1%} "
+                      f"{s['recall@10']:>6.3f} {s['fresh_recall@10']:>6.3f}")
+    print(f"\nAppended {len(results)} results to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
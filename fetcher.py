@@ -0,0 +1,126 @@
+import asyncio
+import os
+import re
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from cache import TTLCache
+
+_WS = re.compile(r"\s+")
+# Page chrome that never carries job-description text
+_BOILERPLATE = ["script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside", "form"]
+
+
+def extract_main_text(html: str) -> str:
+    """Visible text of the main content area of an HTML page"""
+    from bs4 import BeautifulSoup
+
+    try:
+        soup = BeautifulSoup(html, "lxml")
+    except Exception:
+        soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(_BOILERPLATE):
+        tag.decompose()
+    root = soup.find("main") or soup.find("article") or soup.find(attrs={"role": "main"}) or soup.body or soup
+    return _WS.sub(" ", root.get_text(" ", strip=True)).strip()
+
+
+class JDFetcher:
+    """Shared async client for JD URLs: pooled, per-host limited, size-capped, cached"""
+
+    def __init__(
+        self,
+        timeout: float = float(os.getenv("JD_FETCH_TIMEOUT", "5")),
+        max_bytes: int = int(os.getenv("JD_MAX_BYTES", str(512 * 1024))),
+        max_chars: int = int(os.getenv("JD_MAX_CHARS", "8000")),
+        per_host: int = int(os.getenv("JD_PER_HOST", "4")),
+        max_connections: int = int(os.getenv("JD_MAX_CONNECTIONS", "64")),
+        fresh_seconds: float = float(os.getenv("JD_FRESH_SECONDS", "60")),
+        cache_size: int = int(os.getenv("JD_CACHE_SIZE", "512")),
+    ):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self.per_host = per_host
+        self.max_connections = max_connections
+        self.fresh_seconds = fresh_seconds
+        # url -> (fetched_at, etag, last_modified, text)
+        self.cache = TTLCache(maxsize=cache_size, ttl=float(os.getenv("CACHE_TTL_SECONDS", "3600")))
+        self.revalidated = 0
+        self._client: Optional[httpx.AsyncClient] = None
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                headers={"User-Agent": "SHL-Recommender/1.0", "Accept": "text/html,text/plain;q=0.9,*/*;q=0.5"},
+            )
+        return self._client
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        sem = self._hosts.get(host)
+        if sem is None:
+            sem = self._hosts[host] = asyncio.Semaphore(self.per_host)
+        return sem
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch_text(self, url: str) -> Optional[str]:
+        """Main text of the page at url, or None if it could not be fetched"""
+        cached = self.cache.get(url)
+        if cached is not None and time.monotonic() - cached[0] < self.fresh_seconds:
+            return cached[3]
+
+        headers = {}
+        if cached is not None:
+            if cached[1]:
+                headers["If-None-Match"] = cached[1]
+            if cached[2]:
+                headers["If-Modified-Since"] = cached[2]
+
+        try:
+            async with self._host_limit(url):
+                async with self._get_client().stream("GET", url, headers=headers) as resp:
+                    if resp.status_code == 304 and cached is not None:
+                        self.revalidated += 1
+                        self.cache.set(url, (time.monotonic(),) + cached[1:])
+                        return cached[3]
+                    if resp.status_code != 200:
+                        return None
+                    body = bytearray()
+                    async for chunk in resp.aiter_bytes():
+                        body += chunk
+                        if len(body) >= self.max_bytes:
+                            del body[self.max_bytes:]
+                            break
+                    raw = body.decode(resp.encoding or "utf-8", errors="replace")
+                    etag = resp.headers.get("etag")
+                    last_modified = resp.headers.get("last-modified")
+                    content_type = resp.headers.get("content-type", "")
+        except (httpx.HTTPError, ValueError):
+            return cached[3] if cached is not None else None
+
+        if "html" in content_type or raw.lstrip()[:1] == "<":
+            # Parsing is CPU-bound; keep it off the event loop
+            text = await asyncio.get_running_loop().run_in_executor(None, extract_main_text, raw)
+        else:
+            text = _WS.sub(" ", raw).strip()
+        text = text[:self.max_chars]
+        if not text:
+            return None
+        self.cache.set(url, (time.monotonic(), etag, last_modified, text))
+        return text
+
+    def stats(self) -> Dict:
+        return {**self.cache.stats(), "revalidated": self.revalidated}
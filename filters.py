@@ -0,0 +1,185 @@
+"""
+Structured constraints on duration, job level, language, remote and adaptive
+
+CatalogAttributes turns the catalog's text fields into columnar arrays once per
+snapshot: duration in minutes (NaN when unknown), uint64 bitmasks for job
+levels and languages, and tri-state flags. A Constraints object becomes a
+single vectorized candidate mask. An item whose value is unknown passes that
+constraint.
+"""
+
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_MAX_BITS = 64
+
+# Job-level phrases -> catalog levels; used for query extraction and request aliases
+_LEVEL_PATTERNS = [
+    (re.compile(r"\bentry[- ]level\b|\bfreshers?\b|\bjunior\b", re.I), ("Entry-Level", "Graduate")),
+    (re.compile(r"\b(?:new|fresh|recent)\s+(?:college\s+)?grad(?:uate)?s?\b|\bgraduates\b"
+                r"|\bgraduate\s+(?:role|program|programme|hires?|trainees?)\b", re.I), ("Graduate", "Entry-Level")),
+    (re.compile(r"\bmid[- ](?:level|professional|senior)\b", re.I), ("Mid-Professional", "Professional Individual Contributor")),
+    (re.compile(r"\b(?:c-suite|cxo|ceo|coo|cfo|cto)\b", re.I), ("Executive", "Director")),
+]
+# Only used for explicit request values, too ambiguous to pull out of a JD
+_LEVEL_ALIASES = [
+    (re.compile(r"\bsenior\b", re.I), ("Mid-Professional", "Professional Individual Contributor")),
+    (re.compile(r"\bmanag", re.I), ("Manager", "Front Line Manager")),
+    (re.compile(r"\bsupervis", re.I), ("Supervisor", "Front Line Manager")),
+]
+
+_UNIT = r"(hours?|hrs?|minutes?|mins?)\b"
+_RANGE = re.compile(r"\b(\d+(?:\.\d+)?)\s*(?:-|–|to)\s*(\d+(?:\.\d+)?)\s*" + _UNIT, re.I)
+_AMOUNT = re.compile(r"\b(\d+(?:\.\d+)?|half an?|an?|one)\s*" + _UNIT, re.I)
+_WORDS = {"a": 1.0, "an": 1.0, "one": 1.0, "half a": 0.5, "half an": 0.5}
+
+
+def _minutes(amount: str, unit: str) -> Optional[float]:
+    hours = unit.lower().startswith("h")
+    if amount.lower() in _WORDS:
+        # "an hour" is a budget; "a minute" is just a figure of speech
+        return _WORDS[amount.lower()] * 60 if hours else None
+    return float(amount) * 60 if hours else float(amount)
+
+
+def _split(value: str) -> List[str]:
+    return [v.strip() for v in (value or "").split(",") if v.strip()]
+
+
+def _flag(value: str) -> int:
+    value = (value or "").strip().lower()
+    return 1 if value == "yes" else 0 if value == "no" else -1
+
+
+class Constraints:
+    """Requested limits; None or empty means unconstrained"""
+
+    def __init__(self, max_minutes: Optional[float] = None, min_minutes: Optional[float] = None,
+                 job_levels: Sequence[str] = (), languages: Sequence[str] = (),
+                 remote: Optional[bool] = None, adaptive: Optional[bool] = None):
+        self.max_minutes = max_minutes
+        self.min_minutes = min_minutes
+        self.job_levels = tuple(job_levels)
+        self.languages = tuple(languages)
+        self.remote = remote
+        self.adaptive = adaptive
+
+    def __bool__(self) -> bool:
+        return any(v not in (None, ()) for v in self.key())
+
+    def key(self) -> Tuple:
+        """Hashable form, for cache keys"""
+        return (self.max_minutes, self.min_minutes, self.job_levels, self.languages, self.remote, self.adaptive)
+
+    def merged(self, override: "Constraints") -> "Constraints":
+        """Fields set on override win over this object's"""
+        return Constraints(
+            override.max_minutes if override.max_minutes is not None else self.max_minutes,
+            override.min_minutes if override.min_minutes is not None else self.min_minutes,
+            override.job_levels or self.job_levels,
+            override.languages or self.languages,
+            override.remote if override.remote is not None else self.remote,
+            override.adaptive if override.adaptive is not None else self.adaptive,
+        )
+
+    def as_dict(self) -> Dict:
+        return {k: v for k, v in zip(("max_minutes", "min_minutes", "job_levels", "languages", "remote", "adaptive"),
+                                     self.key()) if v not in (None, ())}
+
+
+def _levels_in(text: str, patterns) -> List[str]:
+    levels: List[str] = []
+    for pattern, targets in patterns:
+        if pattern.search(text):
+            levels.extend(t for t in targets if t not in levels)
+    return levels
+
+
+def extract_constraints(query: str) -> Constraints:
+    """Duration budget and job levels stated in free query / JD text"""
+    limits = [_minutes(hi, unit) for _, hi, unit in _RANGE.findall(query)]
+    if not limits:
+        limits = [m for m in (_minutes(amount, unit) for amount, unit in _AMOUNT.findall(query)) if m is not None]
+    # Several durations usually mean a per-test figure and a total; the total is the budget
+    max_minutes = max(limits) if limits else None
+    return Constraints(max_minutes=max_minutes, job_levels=_levels_in(query, _LEVEL_PATTERNS))
+
+
+class CatalogAttributes:
+    """Columnar view of the filterable catalog fields"""
+
+    def __init__(self, catalog: Sequence[dict]):
+        # One pass, one record at a time: over the mapped store, decoding
+        # every record up front would hold the whole catalog in memory
+        duration, levels, languages, remote, adaptive = [], [], [], [], []
+        for it in catalog:
+            length = str(it.get("length_minutes", "")).strip()
+            duration.append(float(length) if length.isdigit() else np.nan)
+            levels.append(_split(it.get("job_levels", "")))
+            languages.append(_split(it.get("languages", "")))
+            remote.append(_flag(it.get("remote_testing", "")))
+            adaptive.append(_flag(it.get("adaptive_support", "")))
+        self.size = len(duration)
+        self.duration = np.array(duration, dtype=np.float32)
+        self.level_bits, self.levels = self._bitmask(levels)
+        self.language_bits, self.languages = self._bitmask(languages)
+        self.remote = np.array(remote, dtype=np.int8)
+        self.adaptive = np.array(adaptive, dtype=np.int8)
+
+    @staticmethod
+    def _bitmask(values: List[List[str]]) -> Tuple[Dict[str, int], np.ndarray]:
+        counts = Counter(v for vals in values for v in vals)
+        if len(counts) > _MAX_BITS:
+            print(f"Only the {_MAX_BITS} most common of {len(counts)} values are filterable")
+        bits = {v: 1 << i for i, (v, _) in enumerate(counts.most_common(_MAX_BITS))}
+        column = np.fromiter((sum(bits.get(v, 0) for v in set(vals)) for vals in values),
+                             dtype=np.uint64, count=len(values))
+        return bits, column
+
+    def level_mask(self, requested: Sequence[str]) -> int:
+        """Bits for requested job levels: exact names (any case) or aliases"""
+        by_name = {name.lower(): bit for name, bit in self.level_bits.items()}
+        mask = 0
+        for value in requested:
+            bit = by_name.get(value.strip().lower())
+            if bit is None:
+                for level in _levels_in(value, _LEVEL_PATTERNS + _LEVEL_ALIASES):
+                    bit = (bit or 0) | self.level_bits.get(level, 0)
+            mask |= bit or 0
+        return mask
+
+    def language_mask(self, requested: Sequence[str]) -> int:
+        """Bits for every catalog language containing one of the requested names"""
+        wanted = [r.strip().lower() for r in requested if r.strip()]
+        return sum(bit for name, bit in self.language_bits.items() if any(w in name.lower() for w in wanted))
+
+    def mask(self, constraints: Constraints) -> Optional[np.ndarray]:
+        """Boolean candidate mask, or None when nothing is constrained
+
+        Raises ValueError for job levels or languages the catalog does not know.
+        """
+        if not constraints:
+            return None
+        keep = np.ones(self.size, dtype=bool)
+        # NaN compares False, so unknown durations survive both bounds
+        if constraints.max_minutes is not None:
+            keep &= ~(self.duration > constraints.max_minutes)
+        if constraints.min_minutes is not None:
+            keep &= ~(self.duration < constraints.min_minutes)
+        for requested, bits_for, column, field in (
+            (constraints.job_levels, self.level_mask, self.levels, "job levels"),
+            (constraints.languages, self.language_mask, self.languages, "languages"),
+        ):
+            if not requested:
+                continue
+            bits = bits_for(requested)
+            if not bits:
+                raise ValueError(f"None of the requested {field} {list(requested)} appear in the catalog")
+            keep &= ((column & np.uint64(bits)) != 0) | (column == 0)
+        for wanted, column in ((constraints.remote, self.remote), (constraints.adaptive, self.adaptive)):
+            if wanted is not None:
+                keep &= (column == int(wanted)) | (column < 0)
+        return keep
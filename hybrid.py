@@ -0,0 +1,114 @@
+"""
+Vectorized hybrid retrieval: BM25 (inverted index) + semantic scores + keyword boosts
+Shared by app.py and the eval scripts.
+"""
+
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from skills import SkillDetector
+
+_NO_IDS = np.zeros(0, dtype=np.int64)
+
+
+def tokenize(text: str) -> List[str]:
+    """Same whitespace tokenization the eval scripts fed to BM25Okapi"""
+    return text.lower().split()
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index with per-posting weights precomputed
+
+    Scores match rank_bm25.BM25Okapi (including its epsilon idf floor), but a
+    query only touches the postings of its own terms.
+    """
+
+    def __init__(self, docs: List[List[str]], k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        self.size = len(docs)
+        doc_len = np.array([len(d) for d in docs], dtype=np.float64)
+        avgdl = doc_len.sum() / max(self.size, 1)
+        norm = k1 * (1 - b + b * doc_len / max(avgdl, 1e-9))
+
+        postings: Dict[str, List] = {}
+        for i, doc in enumerate(docs):
+            for term, tf in Counter(doc).items():
+                postings.setdefault(term, []).append((i, tf))
+
+        idf = {t: math.log(self.size - len(p) + 0.5) - math.log(len(p) + 0.5) for t, p in postings.items()}
+        eps = epsilon * (sum(idf.values()) / len(idf)) if idf else 0.0
+        self.postings: Dict[str, tuple] = {}
+        for term, plist in postings.items():
+            ids = np.fromiter((i for i, _ in plist), dtype=np.int64, count=len(plist))
+            tf = np.fromiter((f for _, f in plist), dtype=np.float64, count=len(plist))
+            w = idf[term] if idf[term] >= 0 else eps
+            self.postings[term] = (ids, (w * tf * (k1 + 1) / (tf + norm[ids])).astype(np.float32))
+
+    def scores(self, query_tokens: Iterable[str], out: Optional[np.ndarray] = None) -> np.ndarray:
+        scores = out if out is not None else np.zeros(self.size, dtype=np.float32)
+        # Repeated query terms count once per occurrence, as in BM25Okapi
+        for term, count in Counter(query_tokens).items():
+            posting = self.postings.get(term)
+            if posting is not None:
+                ids, weights = posting
+                scores[ids] += weights * count
+        return scores
+
+
+class KeywordBoosts:
+    """keyword -> ids of the items that mention it, indexed once per catalog
+
+    Items are scanned with the same whole-word SkillDetector that finds the
+    keywords in queries, so a boost is a gather over precomputed id lists.
+    Keywords outside the detector's vocabulary are indexed on first use.
+    """
+
+    def __init__(self, item_texts: List[str], detector: Optional[SkillDetector] = None):
+        self._texts = item_texts
+        self.detector = detector or SkillDetector({})
+        self._ids = self.detector.index(item_texts)
+
+    def item_ids(self, keyword: str) -> np.ndarray:
+        ids = self._ids.get(keyword)
+        if ids is None:
+            if keyword in self.detector.domain_of:
+                ids = _NO_IDS
+            else:
+                ids = SkillDetector({"": {keyword: [keyword]}}).index(self._texts).get(keyword, _NO_IDS)
+            self._ids[keyword] = ids
+        return ids
+
+    def boost(self, weighted: Sequence[Tuple[Iterable[str], float]], out: np.ndarray) -> np.ndarray:
+        """Add weight to out for every item that mentions each keyword"""
+        for keywords, weight in weighted:
+            for kw in keywords:
+                out[self.item_ids(kw)] += weight  # ids are unique per keyword
+        return out
+
+
+class HybridRetriever:
+    """Fuses normalized BM25 with semantic scores and keyword boosts, all in NumPy"""
+
+    def __init__(self, texts: List[str], boost_texts: Optional[List[str]] = None,
+                 sem_weight: float = 0.6, bm25_weight: float = 0.4,
+                 detector: Optional[SkillDetector] = None):
+        self.bm25 = BM25Index([tokenize(t) for t in texts])
+        self.boosts = KeywordBoosts(boost_texts if boost_texts is not None else texts, detector)
+        self.sem_weight = sem_weight
+        self.bm25_weight = bm25_weight
+
+    def __len__(self) -> int:
+        return self.bm25.size
+
+    def score(self, sem_scores: np.ndarray, query: str,
+              boosts: Optional[Sequence[Tuple[Iterable[str], float]]] = None) -> np.ndarray:
+        """sem_weight * semantic + bm25_weight * BM25 / max(BM25) + keyword boosts"""
+        lexical = self.bm25.scores(tokenize(query))
+        combined = lexical
+        combined *= self.bm25_weight / (lexical.max() + 1e-6)
+        combined += self.sem_weight * np.asarray(sem_scores, dtype=np.float32)
+        if boosts:
+            self.boosts.boost(boosts, combined)
+        return combined
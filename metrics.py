@@ -0,0 +1,277 @@
+"""
+Per-stage request timing, Prometheus text metrics and sampled profiling
+
+A handler starts a RequestTimer and the hot path wraps its stages in
+stage("name"). Stage times are exclusive: a stage nested in another is not
+counted in the outer one. finish() feeds the stage and request histograms
+and returns the Server-Timing header value. With TIMING=0 no timer is ever
+started, and stage() returns a shared no-op context manager.
+
+PROFILE_SAMPLE_RATE > 0 profiles that fraction of requests, one at a time.
+Profiles of requests slower than PROFILE_SLOW_MS are written to PROFILE_DIR,
+using cProfile or pyinstrument (PROFILER). The profiler only sees the event
+loop thread, so model.encode on the encoder thread shows up as waiting.
+"""
+
+import itertools
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+TIMING = os.getenv("TIMING", "1") == "1"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "250"))
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", Path(__file__).parent / "profiles"))
+PROFILER = os.getenv("PROFILER", "cprofile")
+
+# Seconds; stages run from microseconds (skills) to seconds (cold fetch)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_NULL = nullcontext()
+_current: ContextVar[Optional["RequestTimer"]] = ContextVar("request_timer", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative, running = [], 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return cumulative, total, count
+
+
+class Registry:
+    """Labelled histograms and counters, rendered in Prometheus text format"""
+
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, Tuple], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, kind: str, text: str) -> None:
+        self._help[name] = (kind, text)
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        key = (name, tuple(sorted(labels.items())))
+        hist = self._histograms.get(key)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(key, Histogram())
+        return hist
+
+    def inc(self, name: str, amount: float = 1.0, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    def set(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] = value
+
+    @staticmethod
+    def _labels(pairs) -> str:
+        if not pairs:
+            return ""
+        body = ",".join(f'{k}="{str(v)}"' for k, v in pairs)
+        return "{" + body + "}"
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        described = set()
+
+        def header(name: str):
+            if name not in described and name in self._help:
+                kind, text = self._help[name]
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+            described.add(name)
+
+        for (name, pairs), value in counters:
+            header(name)
+            lines.append(f"{name}{self._labels(pairs)} {value:g}")
+        for (name, pairs), hist in histograms:
+            header(name)
+            cumulative, total, count = hist.snapshot()
+            for bound, c in zip(hist.buckets + (float("inf"),), cumulative):
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{name}_bucket{self._labels(pairs + (('le', le),))} {c}")
+            lines.append(f"{name}_sum{self._labels(pairs)} {total:.6f}")
+            lines.append(f"{name}_count{self._labels(pairs)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+registry.describe("shl_stage_duration_seconds", "histogram", "Exclusive time per request stage")
+registry.describe("shl_request_duration_seconds", "histogram", "Handler time per request")
+registry.describe("shl_requests_total", "counter", "Requests by endpoint and status")
+
+
+class RequestTimer:
+    """Stage durations of one request"""
+
+    __slots__ = ("endpoint", "start", "stages", "_stack", "_profiler")
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self._stack: List[float] = []  # time spent in nested stages, per open stage
+        self._profiler = None
+
+    def stage(self, name: str) -> "_Stage":
+        return _Stage(self, name)
+
+    def finish(self, status: int = 200) -> str:
+        """Record the request and return its Server-Timing header value"""
+        total = time.perf_counter() - self.start
+        _current.set(None)
+        for name, seconds in self.stages.items():
+            _histogram("shl_stage_duration_seconds", "stage", name).observe(seconds)
+        _histogram("shl_request_duration_seconds", "endpoint", self.endpoint).observe(total)
+        registry.inc("shl_requests_total", endpoint=self.endpoint, status=status)
+        if self._profiler is not None:
+            _stop_profile(self._profiler, self.endpoint, total)
+        parts = [f"{name};dur={seconds * 1e3:.2f}" for name, seconds in self.stages.items()]
+        parts.append(f"total;dur={total * 1e3:.2f}")
+        return ", ".join(parts)
+
+
+class _Stage:
+    """Context manager for one timed block; a class, as generator-based ones cost several times more"""
+
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer: RequestTimer, name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.timer._stack.append(0.0)
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc) -> bool:
+        elapsed = time.perf_counter() - self.start
+        stack = self.timer._stack
+        nested = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        stages = self.timer.stages
+        stages[self.name] = stages.get(self.name, 0.0) + elapsed - nested
+        return False
+
+
+_histograms: Dict[Tuple[str, str, str], Histogram] = {}
+
+
+def _histogram(name: str, label: str, value: str) -> Histogram:
+    hist = _histograms.get((name, label, value))
+    if hist is None:
+        hist = _histograms[(name, label, value)] = registry.histogram(name, **{label: value})
+    return hist
+
+
+def start_request(endpoint: str) -> Optional[RequestTimer]:
+    """Timer for the current request, or None when timing is off"""
+    if not TIMING:
+        return None
+    timer = RequestTimer(endpoint)
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        timer._profiler = _start_profile()
+    _current.set(timer)
+    return timer
+
+
+def stage(name: str):
+    """Time a block against the current request; a no-op outside one"""
+    timer = _current.get()
+    if timer is None:
+        return _NULL
+    return timer.stage(name)
+
+
+def timed(name: str, fn: Callable) -> Callable:
+    """fn, with every call timed as stage name when a request is being timed"""
+    if _current.get() is None:
+        return fn
+
+    def wrapper(*args, **kwargs):
+        with stage(name):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+# One profiler at a time: cProfile refuses to nest on a thread
+_profiling = threading.Lock()
+_profile_seq = itertools.count(1)
+
+
+def _start_profile():
+    if not _profiling.acquire(blocking=False):
+        return None
+    try:
+        if PROFILER == "pyinstrument":
+            from pyinstrument import Profiler
+
+            profiler = Profiler(async_mode="enabled")
+            profiler.start()
+        else:
+            import cProfile
+
+            profiler = cProfile.Profile()
+            profiler.enable()
+    except Exception as e:
+        _profiling.release()
+        print(f"Profiler unavailable: {e}")
+        return None
+    return profiler
+
+
+def _stop_profile(profiler, endpoint: str, total: float) -> None:
+    try:
+        if PROFILER == "pyinstrument":
+            profiler.stop()
+        else:
+            profiler.disable()
+        if total * 1e3 < PROFILE_SLOW_MS:
+            return
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        name = endpoint.strip('/').replace('/', '-')
+        stem = PROFILE_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_profile_seq)}-{name}-{total * 1e3:.0f}ms"
+        if PROFILER == "pyinstrument":
+            stem.with_suffix(".html").write_text(profiler.output_html(), encoding="utf-8")
+        else:
+            profiler.dump_stats(stem.with_suffix(".prof"))
+        print(f"Slow request profiled: {stem}")
+    except Exception as e:
+        print(f"Could not write profile: {e}")
+    finally:
+        _profiling.release()
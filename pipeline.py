@@ -0,0 +1,142 @@
+"""
+Streaming refresh: scrape -> embed -> index -> publish
+
+Catalog records flow from the crawler (or an existing catalog JSON) through
+batched encoding straight into a new artifact directory under artifacts/.
+Embeddings are appended to disk batch by batch, and rows whose content hash
+matches the live version are copied instead of re-encoded. Publishing swaps
+artifacts/CURRENT atomically. The API then moves to the new version on its
+next reload (file watcher or POST /admin/reload).
+
+    python pipeline.py                      # crawl SHL, then embed and publish
+    python pipeline.py final_catalog.json   # publish an existing catalog
+"""
+
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, List
+
+import numpy as np
+
+from ann import INDEX_FILES, build_index
+from encoder import backend_tag, load_encoder
+from store import EmbeddingStore, catalog_fingerprint, current_version, publish_version, write_store
+
+BASE_DIR = Path(__file__).parent
+ARTIFACT_DIR = Path(os.getenv("ARTIFACT_DIR", BASE_DIR / "artifacts"))
+KEEP_VERSIONS = int(os.getenv("KEEP_VERSIONS", "3"))
+
+sys.path.insert(0, str(BASE_DIR / "Embeddings"))
+from Embed import BATCH_SIZE, MODEL_NAME, TEMPLATE_TAG, content_hash, item_text  # noqa: E402
+
+
+def catalog_records(path: Path) -> Iterator[dict]:
+    yield from json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def scraped_records() -> Iterator[dict]:
+    sys.path.insert(0, str(BASE_DIR / "Scraper"))
+    from scraper import iter_products
+
+    return iter_products()
+
+
+def batched(records: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _previous_rows(dim: int, backend: str):
+    """(content hash -> row) and the mapped matrix of the live version, if compatible"""
+    live = current_version(ARTIFACT_DIR)
+    if live is None:
+        return {}, None
+    try:
+        manifest = json.loads((live / "embeddings_manifest.json").read_text(encoding="utf-8"))
+        store = EmbeddingStore.open(live / "embeddings.bin", dim=dim)
+    except (OSError, ValueError) as e:
+        print(f"Not reusing {live.name}: {e}")
+        return {}, None
+    if (manifest.get("model") != MODEL_NAME or manifest.get("backend") != backend
+            or len(manifest.get("hashes", [])) != len(store.matrix)):
+        return {}, None
+    return {h: row for row, h in enumerate(manifest["hashes"])}, store.matrix
+
+
+def run(records: Iterable[dict]) -> Path:
+    """Embed and index a record stream into a new version, then publish it"""
+    model = load_encoder(MODEL_NAME)
+    dim = model.get_sentence_embedding_dimension()
+    encoder_backend = backend_tag(model)
+    previous_rows, previous = _previous_rows(dim, encoder_backend)
+
+    ARTIFACT_DIR.mkdir(parents=True, exist_ok=True)
+    version = time.strftime("v%Y%m%d-%H%M%S")
+    while (ARTIFACT_DIR / version).exists():
+        version += "a"
+    build_dir = ARTIFACT_DIR / f".build-{version}"
+    build_dir.mkdir()
+    raw_path = build_dir / "matrix.f32"
+
+    catalog: List[dict] = []
+    hashes: List[str] = []
+    reused = 0
+    try:
+        with open(raw_path, "wb") as raw:
+            for batch in batched(records, BATCH_SIZE):
+                texts = [item_text(it) for it in batch]
+                batch_hashes = [content_hash(t) for t in texts]
+                rows = np.empty((len(batch), dim), dtype=np.float32)
+                fresh = []
+                for j, h in enumerate(batch_hashes):
+                    if h in previous_rows:
+                        rows[j] = previous[previous_rows[h]]
+                    else:
+                        fresh.append(j)
+                if fresh:
+                    rows[fresh] = model.encode([texts[j] for j in fresh], batch_size=BATCH_SIZE,
+                                               convert_to_numpy=True, normalize_embeddings=True)
+                raw.write(rows.tobytes())
+                reused += len(batch) - len(fresh)
+                catalog.extend(batch)
+                hashes.extend(batch_hashes)
+                print(f"Embedded {len(catalog)} items ({reused} reused)")
+        if not catalog:
+            raise RuntimeError("No catalog records; nothing to publish")
+
+        matrix = np.memmap(raw_path, dtype=np.float32, mode="r", shape=(len(catalog), dim))
+        catalog_bytes = json.dumps(catalog, indent=2).encode("utf-8")
+        (build_dir / "final_catalog.json").write_bytes(catalog_bytes)
+        write_store(build_dir / "embeddings.bin", matrix, catalog,
+                    catalog_fingerprint(catalog_bytes, MODEL_NAME, encoder_backend, TEMPLATE_TAG),
+                    dtype=os.getenv("STORE_DTYPE", "float32"))
+        (build_dir / "embeddings_manifest.json").write_text(
+            json.dumps({"model": MODEL_NAME, "backend": encoder_backend, "dim": dim, "hashes": hashes}), encoding="utf-8")
+        backend = os.getenv("INDEX_BACKEND", "exact")
+        if backend in INDEX_FILES:
+            print(f"Building {backend} index...")
+            build_index(backend, matrix).save(build_dir / INDEX_FILES[backend])
+        del matrix
+        raw_path.unlink()
+    except BaseException:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+
+    os.replace(build_dir, ARTIFACT_DIR / version)
+    publish_version(ARTIFACT_DIR, version, keep=KEEP_VERSIONS)
+    print(f"Published {version}: {len(catalog)} assessments, {len(catalog) - reused} encoded")
+    return ARTIFACT_DIR / version
+
+
+if __name__ == "__main__":
+    run(catalog_records(Path(sys.argv[1])) if len(sys.argv) > 1 else scraped_records())
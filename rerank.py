@@ -0,0 +1,162 @@
+"""
+Cross-encoder rerank of the top-N bi-encoder candidates, within a latency budget
+
+All (query, item) pairs missing from the pair cache are scored in one
+CrossEncoder.predict call. If the budget would be exceeded, the bi-encoder
+order is kept instead: either because the running per-pair cost estimate
+says the pairs cannot fit, or because the forward pass overruns. A pass that
+overruns still finishes on its worker thread and fills the cache for the
+next request with the same query. Forward passes run one at a time on the
+reranker's own thread, so a slow pass never holds up the default executor
+that query encoding and JD parsing run on; a pass whose request has already
+given up is skipped.
+"""
+
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import numpy as np
+
+from cache import TTLCache, normalize_query
+from scoring import Search
+
+RERANK_DESC_CHARS = 400
+
+
+def item_text(item: dict) -> str:
+    """What the cross-encoder reads of a catalog item"""
+    return f"{item.get('name', '')}. {(item.get('description') or '')[:RERANK_DESC_CHARS]}"
+
+
+def reranked_search(search: Search, order: np.ndarray, scores: np.ndarray) -> Search:
+    """search with its first len(order) results replaced by a new order
+
+    Scores stay the bi-encoder ones, so responses keep one scale; deeper
+    results follow in the original order.
+    """
+    head = set(order.tolist())
+
+    def rerun(n: int):
+        if n <= len(order):
+            return order[:n], scores[:n]
+        ids, sc = search(n + len(order))
+        keep = np.fromiter((i not in head for i in ids.tolist()), dtype=bool, count=len(ids))
+        return np.concatenate([order, ids[keep]])[:n], np.concatenate([scores, sc[keep]])[:n]
+
+    return rerun
+
+
+class Reranker:
+    """CrossEncoder plus a (catalog, generation, query hash, row) -> score cache
+
+    Methods take the catalog snapshot the candidates came from: its rows are
+    only stable within one generation, and the same query scores differently
+    against another catalog.
+    """
+
+    def __init__(self, model, top_n: int = 20, budget_ms: float = 100.0, cache_size: int = 20000,
+                 ttl: float = 3600.0):
+        self.model = model
+        self.top_n = top_n
+        self.budget = budget_ms / 1000.0
+        self.cache = TTLCache(maxsize=cache_size, ttl=ttl)
+        self.pair_seconds: Optional[float] = None  # running estimate per scored pair
+        # One thread: passes queue here instead of occupying default executor threads
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self.outcomes = {"reranked": 0, "cached": 0, "over_budget": 0, "timed_out": 0, "failed": 0}
+
+    @staticmethod
+    def query_key(query: str) -> str:
+        return hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()
+
+    def _lookup(self, query: str, snap, ids: np.ndarray):
+        """Pair keys and cached scores for ids (NaN where not cached)"""
+        qkey = self.query_key(query)
+        keys = [(snap.name, snap.generation, qkey, i) for i in ids.tolist()]
+        cached = [self.cache.get(k) for k in keys]
+        return keys, np.array([np.nan if c is None else c for c in cached], dtype=np.float32)
+
+    def _fill(self, query: str, catalog, ids: np.ndarray, keys, scores: np.ndarray,
+              deadline: Optional[float]) -> Optional[np.ndarray]:
+        """Score the uncached pairs in one forward pass; None if the deadline passed while waiting"""
+        missing = np.flatnonzero(np.isnan(scores))
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+        start = time.perf_counter()
+        fresh = self.model.predict([(query, item_text(catalog[int(ids[j])])) for j in missing],
+                                   batch_size=len(missing), show_progress_bar=False)
+        per_pair = (time.perf_counter() - start) / len(missing)
+        self.pair_seconds = per_pair if self.pair_seconds is None else 0.8 * self.pair_seconds + 0.2 * per_pair
+        scores = scores.copy()
+        for j, s in zip(missing, np.asarray(fresh, dtype=np.float32).reshape(-1)):
+            scores[j] = s
+            self.cache.set(keys[j], float(s))
+        return scores
+
+    @staticmethod
+    def _apply(search: Search, ids: np.ndarray, bi_scores: np.ndarray, ce_scores: np.ndarray) -> Search:
+        order = np.argsort(-ce_scores, kind="stable")
+        return reranked_search(search, ids[order], bi_scores[order])
+
+    def rerank(self, query: str, search: Search, snap, top_n: Optional[int] = None) -> Search:
+        """Blocking rerank without a budget (eval and offline use)"""
+        ids, bi_scores = search(top_n or self.top_n)
+        if len(ids) < 2:
+            return search
+        keys, scores = self._lookup(query, snap, ids)
+        if np.isnan(scores).any():
+            scores = self._executor.submit(self._fill, query, snap.catalog, ids, keys, scores, None).result()
+        self.outcomes["reranked"] += 1
+        return self._apply(search, ids, bi_scores, scores)
+
+    async def rerank_within(self, query: str, search: Search, snap, started: float) -> Tuple[Search, bool]:
+        """Rerank if it can finish within the budget counted from started
+
+        Returns the search to use and whether it was reranked.
+        """
+        ids, bi_scores = search(self.top_n)
+        if len(ids) < 2:
+            return search, True
+        keys, scores = self._lookup(query, snap, ids)
+        missing = int(np.isnan(scores).sum())
+        if not missing:
+            self.outcomes["cached"] += 1
+            return self._apply(search, ids, bi_scores, scores), True
+        deadline = started + self.budget
+        if self.pair_seconds is not None and self.pair_seconds * missing > deadline - time.perf_counter():
+            self.outcomes["over_budget"] += 1
+            return search, False
+        work = asyncio.get_running_loop().run_in_executor(
+            self._executor, self._fill, query, snap.catalog, ids, keys, scores, deadline)
+        try:
+            # shield: an overrun pass keeps running and still fills the cache
+            scores = await asyncio.wait_for(asyncio.shield(work), max(deadline - time.perf_counter(), 0.0))
+        except asyncio.TimeoutError:
+            scores = None
+        except Exception as e:
+            print(f"Rerank failed, keeping the bi-encoder order: {e}")
+            self.outcomes["failed"] += 1
+            return search, False
+        if scores is None:
+            self.outcomes["timed_out"] += 1
+            return search, False
+        self.outcomes["reranked"] += 1
+        return self._apply(search, ids, bi_scores, scores), True
+
+    def close(self) -> None:
+        """Stop the rerank thread once queued passes finish; later reranks fail and keep the bi-encoder order"""
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {"top_n": self.top_n, "budget_ms": self.budget * 1e3,
+                "pair_ms": None if self.pair_seconds is None else self.pair_seconds * 1e3,
+                **self.outcomes, "cache": self.cache.stats()}
+
+
+def load_reranker(model_name: str, **kwargs) -> Reranker:
+    from sentence_transformers import CrossEncoder
+
+    return Reranker(CrossEncoder(model_name), **kwargs)
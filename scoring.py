@@ -0,0 +1,159 @@
+import threading
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+def _to_numpy(x) -> np.ndarray:
+    """Accept torch tensors or array-likes"""
+    if hasattr(x, "detach"):
+        x = x.detach().cpu().numpy()
+    return np.asarray(x)
+
+
+# Rows upcast per step when the matrix is stored as float16
+_F16_CHUNK = 1024
+
+
+class ScoringIndex:
+    """Exact dot-product scoring over a contiguous, normalized embedding matrix
+
+    float16 storage halves memory; NumPy has no BLAS kernel for it, so rows
+    are upcast chunk by chunk into float32 scratch space before the product.
+    """
+
+    def __init__(self, matrix, dtype: str = "float32"):
+        self.dtype = np.dtype(dtype)
+        self.matrix = np.ascontiguousarray(_to_numpy(matrix), dtype=self.dtype)
+        # Scratch buffers are reused per thread instead of allocated per query
+        self._local = threading.local()
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def _buffers(self):
+        local = self._local
+        if getattr(local, "buf", None) is None or local.buf.shape[0] != self.matrix.shape[0]:
+            local.buf = np.empty(self.matrix.shape[0], dtype=np.float32)
+            local.chunk = None
+            if self.dtype != np.float32:
+                local.chunk = np.empty((_F16_CHUNK, self.matrix.shape[1]), dtype=np.float32)
+        return local.buf, local.chunk
+
+    def scores(self, q_emb) -> np.ndarray:
+        """Cosine scores of one query against every row (valid until the next call)"""
+        q = np.ascontiguousarray(_to_numpy(q_emb).reshape(-1), dtype=np.float32)
+        buf, chunk = self._buffers()
+        if chunk is None:
+            np.matmul(self.matrix, q, out=buf)
+            return buf
+        for start in range(0, self.matrix.shape[0], _F16_CHUNK):
+            rows = self.matrix[start:start + _F16_CHUNK]
+            block = chunk[:rows.shape[0]]
+            np.copyto(block, rows)
+            np.matmul(block, q, out=buf[start:start + rows.shape[0]])
+        return buf
+
+    def searcher(self, q_emb, copy: bool = False) -> "Search":
+        """Score once, then serve any number of best-first candidates
+
+        The search reads the per-thread score buffer unless copy is set; a
+        search still used after an await (when other requests may score on
+        the same thread) needs its own copy.
+        """
+        scores = self.scores(q_emb)
+        return ranked_search(scores.copy() if copy else scores)
+
+    def subset_searcher(self, q_emb, candidates: np.ndarray) -> "Search":
+        """Score only the candidate rows (e.g. after attribute filtering)"""
+        q = np.ascontiguousarray(_to_numpy(q_emb).reshape(-1), dtype=np.float32)
+        rows = self.matrix[candidates]
+        if self.dtype != np.float32:
+            rows = rows.astype(np.float32)
+        return _subset_search(candidates, rows @ q)
+
+    def searchers(self, q_embs) -> List["Search"]:
+        """One searcher per query, scored with a single matrix multiply"""
+        return [ranked_search(row) for row in self.score_batch(q_embs)]
+
+    def score_batch(self, q_embs) -> np.ndarray:
+        """Scores for many queries at once, shape (n_queries, n_items)"""
+        q = np.ascontiguousarray(_to_numpy(q_embs), dtype=np.float32)
+        if q.ndim == 1:
+            q = q[None, :]
+        if self.dtype == np.float32:
+            return q @ self.matrix.T
+        out = np.empty((q.shape[0], self.matrix.shape[0]), dtype=np.float32)
+        for start in range(0, self.matrix.shape[0], _F16_CHUNK):
+            rows = self.matrix[start:start + _F16_CHUNK].astype(np.float32)
+            out[:, start:start + rows.shape[0]] = q @ rows.T
+        return out
+
+
+def top_indices(scores: np.ndarray, n: int) -> np.ndarray:
+    """Indices of the n highest scores, best first, without a full sort"""
+    size = scores.shape[0]
+    n = min(n, size)
+    if n <= 0:
+        return np.empty(0, dtype=np.intp)
+    if n == size:
+        return np.argsort(scores)[::-1]
+    part = np.argpartition(scores, size - n)[size - n:]
+    return part[np.argsort(scores[part])[::-1]]
+
+
+# A search callable maps n -> (item ids, scores) for the n best items, best first
+Search = Callable[[int], Tuple[np.ndarray, np.ndarray]]
+
+
+def ranked_search(scores: np.ndarray, candidates: Optional[np.ndarray] = None) -> Search:
+    """Search callable over a precomputed full score vector, optionally restricted to candidates"""
+    if candidates is not None:
+        return _subset_search(candidates, scores[candidates])
+
+    def search(n: int):
+        ids = top_indices(scores, n)
+        return ids, scores[ids]
+    return search
+
+
+def _subset_search(candidates: np.ndarray, scores: np.ndarray) -> Search:
+    def search(n: int):
+        top = top_indices(scores, n)
+        return candidates[top], scores[top]
+    return search
+
+
+def masked_search(search: Search, mask: np.ndarray) -> Search:
+    """Only items where mask is set, for indexes that cannot pre-filter (IVF/HNSW)
+
+    The inner search is widened until enough of its results pass the mask.
+    """
+    allowed = int(mask.sum())
+
+    def filtered(n: int):
+        n = min(n, allowed)
+        wanted = n
+        while True:
+            ids, scores = search(wanted)
+            keep = mask[ids]
+            if keep.sum() >= n or len(ids) < wanted or wanted >= mask.shape[0]:
+                return ids[keep][:n], scores[keep][:n]
+            wanted = min(wanted * 2, mask.shape[0])
+    return filtered
+
+
+def iter_ranked(search: Search, first: int, limit: int) -> Iterator[Tuple[int, float]]:
+    """Yield (item, score) best-first, widening the search only when needed"""
+    seen = set()
+    n = max(first, 1)
+    while True:
+        ids, scores = search(n)
+        for idx, score in zip(ids, scores):
+            idx = int(idx)
+            if idx not in seen:
+                seen.add(idx)
+                yield idx, float(score)
+        if n >= limit or len(ids) < n:
+            return
+        n *= 2
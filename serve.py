@@ -0,0 +1,104 @@
+"""
+Production launcher: several uvicorn workers over one shared embedding store
+
+Each worker loads only its own encoder. The embedding matrix and the compact
+catalog records are mapped read-only from embeddings.bin, so every worker
+shares the same physical pages through the OS page cache. The launcher checks
+the store for the live artifacts before any worker starts and builds it in a
+short-lived child process if it is missing or stale. With ENCODER_BACKEND=onnx
+it likewise exports any missing ONNX model once, in a child process. That way
+the workers never race to rewrite either, and the supervisor never loads a
+model.
+
+The cores are split between the workers: torch or ONNX Runtime intra-op
+threads (ENCODER_THREADS) and the BLAS/OpenMP pools are capped per worker.
+
+    python serve.py --workers 4
+    python serve.py --workers 2 --threads 2 --port 8080
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+
+# Thread pools read these at import time, so they are set before workers start
+_THREAD_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "ENCODER_THREADS")
+
+
+def available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def prepare_store() -> None:
+    """Make sure embeddings.bin matches the live catalog before workers map it"""
+    import app
+    from embed_text import TEMPLATE_TAG
+    from encoder import backend_tag
+    from store import EmbeddingStore, StoreMismatch, catalog_fingerprint
+
+    directory, _ = app._artifact_source()
+    catalog_bytes = (directory / app.CATALOG_PATH.name).read_bytes()
+    try:
+        EmbeddingStore.open(directory / app.STORE_PATH.name,
+                            catalog_fingerprint(catalog_bytes, app.MODEL_NAME, backend_tag(), TEMPLATE_TAG))
+        return
+    except (FileNotFoundError, StoreMismatch) as e:
+        print(f"Building the embedding store before starting workers: {e}")
+    subprocess.run(
+        [sys.executable, "-c",
+         "import app; app._load_catalog_and_embeddings(app.load_encoder(app.MODEL_NAME), app._artifact_source()[0])"],
+        cwd=BASE_DIR, check=True,
+    )
+
+
+def prepare_onnx() -> None:
+    """Export the ONNX models the catalogs use, so workers don't each start an export"""
+    if os.getenv("ENCODER_BACKEND", "torch") != "onnx":
+        return
+    import app
+    from encoder import onnx_model_dir
+
+    models = {spec.model for spec in app.load_specs(app.CATALOGS, app.MODEL_NAME).values()}
+    for model_name in sorted(models):
+        model_dir = onnx_model_dir(model_name)
+        if (model_dir / "model_int8.onnx").exists():
+            continue
+        print(f"Exporting {model_name} to {model_dir} before starting workers")
+        subprocess.run(
+            [sys.executable, "-c", "import sys, encoder; encoder.export_onnx(sys.argv[1], sys.argv[2])",
+             model_name, str(model_dir)],
+            cwd=BASE_DIR, check=True,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-w", "--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "2")))
+    parser.add_argument("--threads", type=int, default=0, help="threads per worker (default: cores / workers)")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    threads = args.threads or max(1, available_cpus() // args.workers)
+    for var in _THREAD_VARS:
+        os.environ.setdefault(var, str(threads))
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    prepare_onnx()
+    prepare_store()
+
+    import uvicorn
+
+    print(f"Starting {args.workers} workers with {os.environ['ENCODER_THREADS']} threads each")
+    uvicorn.run("app:app", host=args.host, port=args.port, workers=args.workers, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()
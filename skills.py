@@ -0,0 +1,226 @@
+"""
+Skill detection with one compiled whole-word matcher over a shared vocabulary
+
+The vocabulary maps each domain ("tech", "soft") to terms, and each term to
+the surface forms that mention it: {"tech": {"c#": ["c#", "csharp"]}}. Every
+surface form goes into a single character-trie regex. A text is scanned once,
+whatever the vocabulary size, and a form only counts as a whole word. So
+"java" does not fire inside "javascript", and "team" does not fire inside
+"steam". Matching is case-insensitive and treats any whitespace run as a space.
+
+skill_vocabulary.json is generated offline from the catalog:
+
+    python skills.py                  # final_catalog.json -> skill_vocabulary.json
+    python skills.py catalog.json out.json
+
+Tech terms are the curated seeds below, plus every knowledge test in the
+catalog, by name. Soft terms are the curated seeds, plus the other catalog
+words that share their stems. Terms from another file of the same shape
+can be layered on at load time.
+"""
+
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent
+VOCABULARY_PATH = BASE_DIR / "skill_vocabulary.json"
+
+Vocabulary = Dict[str, Dict[str, List[str]]]
+
+# Curated terms and their surface forms
+TECH_SEEDS: Dict[str, List[str]] = {
+    "java": ["java"], "python": ["python"], "javascript": ["javascript", "js"], "sql": ["sql"],
+    "c++": ["c++", "cpp"], "c#": ["c#", "csharp"], ".net": [".net", "dotnet", "asp.net"], "golang": ["golang"],
+    "react": ["react", "reactjs", "react.js"], "angular": ["angular", "angularjs"], "vue": ["vue", "vue.js", "vuejs"],
+    "aws": ["aws", "amazon web services"], "azure": ["azure"], "kubernetes": ["kubernetes", "k8s"],
+    "docker": ["docker"], "html": ["html", "html5"], "css": ["css", "css3"],
+    "frontend": ["frontend", "front end", "front-end"], "backend": ["backend", "back end", "back-end"],
+    "fullstack": ["fullstack", "full stack", "full-stack"], "devops": ["devops"], "selenium": ["selenium"],
+    "excel": ["excel"],
+}
+SOFT_SEEDS: Dict[str, List[str]] = {
+    "collaboration": ["collaborate", "collaborates", "collaborating", "collaboration", "collaborative"],
+    "communication": ["communicate", "communicates", "communicating", "communication", "communications",
+                      "communicator"],
+    "teamwork": ["teamwork", "team work", "team player"], "team": ["team", "teams"],
+    "leadership": ["leadership"], "personality": ["personality", "personalities"],
+    "behavior": ["behavior", "behaviour", "behavioral", "behavioural", "behaviors", "behaviours"],
+    "emotional intelligence": ["emotional intelligence", "emotional"], "interpersonal": ["interpersonal"],
+    "management": ["management"], "stakeholder": ["stakeholder", "stakeholders"],
+    "adaptability": ["adaptability", "adaptable"],
+}
+# Other catalog words starting with these stems are added to the soft terms
+SOFT_STEMS = {"collaboration": "collaborat", "communication": "communicat", "personality": "personalit",
+              "behavior": "behavio", "adaptability": "adaptab", "stakeholder": "stakeholder"}
+
+# Knowledge-test name parts that say nothing about the skill itself
+_NAME_QUALIFIERS = re.compile(r"\s*\((?:new|adaptive|general|developer|architecture|u\.s\.|[a-z ]*level)\)")
+_NAME_AFFIXES = re.compile(r"^(?:basic|fundamentals of) | (?:development|programming|skills)$| \d+(?:\.\d+)*\b")
+# Generated names that are everyday words in a job description
+_COMMON_WORDS = {"spring", "swing", "prism", "mobility", "dojo", "spelling", "struts", "nursing", "marketing"}
+
+
+def _knowledge_test_terms(name: str) -> Dict[str, List[str]]:
+    """Terms for one knowledge test: its cleaned name, plus acronyms or expansions in brackets"""
+    name = _NAME_QUALIFIERS.sub("", name.lower())
+    extras = [" ".join(m.split()) for m in re.findall(r"\(([^)]+)\)", name)]
+    full = " ".join(re.sub(r"\([^)]*\)", " ", name).split())
+    base = " ".join(_NAME_AFFIXES.sub("", full).split())
+    if len(base) < 2:  # "c programming", "r programming"
+        base = full
+    if not base or base in _COMMON_WORDS:
+        return {}
+    if re.fullmatch(r"[\w.+#]+/[\w.+#]+", base):  # html/css
+        return {part: [part] for part in base.split("/")}
+    forms = [base, *extras]
+    if base.startswith("apache "):
+        forms.append(base[len("apache "):])
+    return {base: list(dict.fromkeys(forms))}
+
+
+def _seed_vocabulary() -> Vocabulary:
+    return {"tech": {t: list(f) for t, f in TECH_SEEDS.items()}, "soft": {t: list(f) for t, f in SOFT_SEEDS.items()}}
+
+
+def build_vocabulary(catalog: List[dict]) -> Vocabulary:
+    """Seeds plus the catalog's knowledge tests, and catalog words sharing the soft stems"""
+    tech = {term: list(forms) for term, forms in TECH_SEEDS.items()}
+    owner = {form: term for term, forms in tech.items() for form in forms}
+    for item in catalog:
+        if (item.get("description") or "").lower().startswith("multi-choice test that measures"):
+            for term, forms in _knowledge_test_terms(item.get("name", "")).items():
+                # A name that is already a form of a term ("angularjs", "css3") extends that term
+                term = next((owner[f] for f in forms if f in owner), term)
+                merged = tech.setdefault(term, [])
+                for form in forms:
+                    if form not in owner:
+                        owner[form] = term
+                        merged.append(form)
+
+    words = set()
+    for item in catalog:
+        words.update(re.findall(r"[a-z]+", f"{item.get('name', '')} {item.get('description') or ''}".lower()))
+    soft = {}
+    for term, forms in SOFT_SEEDS.items():
+        stem = SOFT_STEMS.get(term)
+        soft[term] = list(dict.fromkeys(forms + sorted(w for w in words if stem and w.startswith(stem))))
+    return {"tech": dict(sorted(tech.items())), "soft": soft}
+
+
+def _trie_pattern(forms: Iterable[str]) -> str:
+    """One regex alternation sharing common prefixes, longest continuation first"""
+    trie: dict = {}
+    for form in forms:
+        node = trie
+        for ch in form:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: dict) -> str:
+        branches = [(r"\s+" if ch == " " else re.escape(ch)) + emit(node[ch]) for ch in sorted(node) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Greedy: a longer form wins over a prefix of it ("sql server" over "sql")
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+class SkillDetector:
+    """Finds vocabulary terms in text with a single compiled pattern"""
+
+    def __init__(self, vocabulary: Vocabulary):
+        self.domains = list(vocabulary)
+        self.domain_of: Dict[str, str] = {}
+        self._term_of: Dict[str, str] = {}
+        for domain, terms in vocabulary.items():
+            for term, forms in terms.items():
+                self.domain_of.setdefault(term, domain)
+                for form in forms or [term]:
+                    self._term_of.setdefault(re.sub(r"\s+", " ", form.lower()), term)
+        # The longest form wins a match; terms whose forms sit inside it count
+        # as mentioned too ("java" in "core java")
+        self._nested: Dict[str, List[str]] = {}
+        for form in self._term_of:
+            words = form.split()
+            inner = {self._term_of.get(" ".join(words[i:j]))
+                     for i in range(len(words)) for j in range(i + 1, len(words) + 1) if j - i < len(words)}
+            inner.discard(None)
+            inner.discard(self._term_of[form])
+            if inner:
+                self._nested[form] = sorted(inner)
+        # Whole words only. A preceding "." joins words too ("js" in "node.js"),
+        # and so do a following + or # ("c" in "c++")
+        pattern = _trie_pattern(self._term_of) if self._term_of else r"(?!x)x"
+        self._pattern = re.compile(rf"(?<![\w.])(?:{pattern})(?![\w+#])")
+
+    def __len__(self) -> int:
+        return len(self.domain_of)
+
+    def terms(self, text: str) -> List[str]:
+        """Distinct terms mentioned in text, in order of first mention"""
+        found: Dict[str, None] = {}
+        for match in self._pattern.findall(text.lower()):
+            form = " ".join(match.split())
+            found[self._term_of[form]] = None
+            for term in self._nested.get(form, ()):
+                found[term] = None
+        return list(found)
+
+    def detect(self, text: str) -> Dict[str, List[str]]:
+        """Terms in text grouped by domain"""
+        out: Dict[str, List[str]] = {d: [] for d in self.domains}
+        for term in self.terms(text):
+            out[self.domain_of[term]].append(term)
+        return out
+
+    def index(self, texts: Iterable[str]) -> Dict[str, np.ndarray]:
+        """term -> ids of the texts that mention it"""
+        postings: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            for term in self.terms(text):
+                postings.setdefault(term, []).append(i)
+        return {term: np.array(ids, dtype=np.int64) for term, ids in postings.items()}
+
+
+def load_vocabulary(*paths) -> Vocabulary:
+    """Merge vocabulary files in order; a missing main file falls back to the seeds"""
+    vocabulary = _seed_vocabulary()
+    for n, path in enumerate(p for p in paths if p):
+        path = Path(path)
+        if not path.exists():
+            if n == 0:
+                print(f"{path} not found; detecting skills from the built-in seeds (run python skills.py)")
+                continue
+            raise FileNotFoundError(f"Skill vocabulary {path} not found")
+        loaded = json.loads(path.read_text(encoding="utf-8"))
+        if n == 0:
+            vocabulary = {"tech": {}, "soft": {}}
+        for domain, terms in loaded.items():
+            merged = vocabulary.setdefault(domain, {})
+            for term, forms in terms.items():
+                merged[term] = list(dict.fromkeys(merged.get(term, []) + list(forms or [term])))
+    return vocabulary
+
+
+def load_detector(path=VOCABULARY_PATH, extra: Optional[str] = None) -> SkillDetector:
+    return SkillDetector(load_vocabulary(path, extra))
+
+
+def main():
+    catalog_path = Path(sys.argv[1]) if len(sys.argv) > 1 else BASE_DIR / "final_catalog.json"
+    out = Path(sys.argv[2]) if len(sys.argv) > 2 else VOCABULARY_PATH
+    vocabulary = build_vocabulary(json.loads(catalog_path.read_text(encoding="utf-8")))
+    out.write_text(json.dumps(vocabulary, indent=1, ensure_ascii=False) + "\n", encoding="utf-8")
+    forms = sum(len(f) for terms in vocabulary.values() for f in terms.values())
+    print(f"Wrote {out}: " + ", ".join(f"{len(t)} {d} terms" for d, t in vocabulary.items()) + f", {forms} forms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Memory-mapped embedding store
+
+Layout of embeddings.bin (little endian):
+    header   magic, version, dtype, rows, dim, section offsets, fingerprint
+    matrix   rows x dim float32/float16, 64-byte aligned
+    offsets  rows + 1 uint64 byte offsets into the records section
+    records  one compact JSON object per catalog item
+
+Opening the file maps the matrix and records read-only, so every worker
+process shares the same pages through the OS page cache.
+
+pipeline.py publishes complete artifact sets as versioned directories under
+artifacts/; the CURRENT file names the live one and is swapped atomically.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import struct
+from collections.abc import Sequence
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+MAGIC = b"SHLEMB01"
+VERSION = 1
+_HEADER = struct.Struct("<8sIIQQQQQ32s")
+_DTYPES = {0: np.float32, 1: np.float16}
+_ALIGN = 64
+_WRITE_ROWS = 8192
+
+
+class StoreMismatch(ValueError):
+    """The store on disk does not match the catalog or model in use"""
+
+
+def catalog_fingerprint(catalog_bytes: bytes, model_name: str, backend: str, template: str) -> bytes:
+    """Digest of the raw catalog file plus how it was embedded
+
+    backend is the encoder backend (torch, onnx, stub) and template the tag of
+    the item text template (embed_text.TEMPLATE_TAG); vectors from another
+    backend or template do not match.
+    """
+    h = hashlib.sha256()
+    for part in (model_name, backend, template):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    h.update(catalog_bytes)
+    return h.digest()
+
+
+def _aligned(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def write_store(path: Path, matrix, records: List[dict], fingerprint: bytes,
+                dtype: str = "float32") -> None:
+    """Write the store atomically (temp file + rename)
+
+    The matrix is converted and written in row chunks, so a memory-mapped
+    input is never materialized as one array.
+    """
+    matrix = np.asarray(matrix)
+    out_dtype = np.dtype(dtype)
+    code = {np.dtype(v): k for k, v in _DTYPES.items()}[out_dtype]
+    rows, dim = matrix.shape
+    nbytes = rows * dim * out_dtype.itemsize
+    if len(records) != rows:
+        raise ValueError(f"{rows} embedding rows but {len(records)} catalog records")
+
+    blobs = [json.dumps(r, ensure_ascii=False, separators=(",", ":")).encode("utf-8") for r in records]
+    offsets = np.zeros(rows + 1, dtype=np.uint64)
+    np.cumsum([len(b) for b in blobs], out=offsets[1:])
+
+    matrix_offset = _aligned(_HEADER.size)
+    offsets_offset = _aligned(matrix_offset + nbytes)
+    records_offset = offsets_offset + offsets.nbytes
+    header = _HEADER.pack(MAGIC, VERSION, code, rows, dim,
+                          matrix_offset, offsets_offset, records_offset, fingerprint)
+
+    path = Path(path)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.write(b"\0" * (matrix_offset - _HEADER.size))
+        for start in range(0, rows, _WRITE_ROWS):
+            f.write(np.ascontiguousarray(matrix[start:start + _WRITE_ROWS], dtype=out_dtype).tobytes())
+        f.write(b"\0" * (offsets_offset - matrix_offset - nbytes))
+        f.write(offsets.tobytes())
+        for b in blobs:
+            f.write(b)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class LazyRecords(Sequence):
+    """Catalog items decoded from the mapped records section on access"""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return json.loads(self._blob[start:end].tobytes())
+
+
+class EmbeddingStore:
+    """Read-only view over embeddings.bin"""
+
+    def __init__(self, path: Path, matrix: np.ndarray, records: LazyRecords, fingerprint: bytes):
+        self.path = path
+        self.matrix = matrix
+        self.records = records
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def open(cls, path: Path, fingerprint: Optional[bytes] = None,
+             dim: Optional[int] = None) -> "EmbeddingStore":
+        path = Path(path)
+        size = path.stat().st_size
+        with open(path, "rb") as f:
+            head = f.read(_HEADER.size)
+        if len(head) < _HEADER.size:
+            raise StoreMismatch(f"{path} is truncated")
+        magic, version, code, rows, ndim, m_off, o_off, r_off, stored_fp = _HEADER.unpack(head)
+        if magic != MAGIC or version != VERSION or code not in _DTYPES:
+            raise StoreMismatch(f"{path} is not a version {VERSION} embedding store")
+        if fingerprint is not None and stored_fp != fingerprint:
+            raise StoreMismatch(f"{path} was built from a different catalog or model")
+        if dim is not None and ndim != dim:
+            raise StoreMismatch(f"{path} has dim {ndim}, expected {dim}")
+        dtype = np.dtype(_DTYPES[code])
+        if m_off + rows * ndim * dtype.itemsize > o_off or r_off != o_off + (rows + 1) * 8:
+            raise StoreMismatch(f"{path} has an inconsistent layout")
+
+        matrix = np.memmap(path, dtype=dtype, mode="r", offset=m_off, shape=(rows, ndim))
+        offsets = np.memmap(path, dtype=np.uint64, mode="r", offset=o_off, shape=(rows + 1,))
+        if r_off + int(offsets[-1]) != size:
+            raise StoreMismatch(f"{path} is truncated")
+        blob = np.memmap(path, dtype=np.uint8, mode="r", offset=r_off, shape=(size - r_off,)) \
+            if size > r_off else np.zeros(0, dtype=np.uint8)
+        return cls(path, matrix, LazyRecords(blob, offsets), stored_fp)
+
+
+CURRENT_FILE = "CURRENT"
+
+
+def current_version(root: Path) -> Optional[Path]:
+    """Directory of the published artifact version under root, if any"""
+    try:
+        name = (Path(root) / CURRENT_FILE).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    path = Path(root) / name
+    return path if name and path.is_dir() else None
+
+
+def publish_version(root: Path, name: str, keep: int = 3) -> None:
+    """Point CURRENT at root/name atomically, then prune old versions"""
+    root = Path(root)
+    tmp = root / (CURRENT_FILE + ".tmp")
+    tmp.write_text(name, encoding="utf-8")
+    os.replace(tmp, root / CURRENT_FILE)
+    # Readers still serving an older version keep its files mapped; on POSIX
+    # unlinking does not pull the pages out from under them
+    versions = sorted(p for p in root.iterdir() if p.is_dir() and not p.name.startswith("."))
+    for old in versions[:-keep] if keep > 0 else []:
+        if old.name != name:
+            shutil.rmtree(old, ignore_errors=True)
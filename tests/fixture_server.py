@@ -0,0 +1,105 @@
+"""
+Local HTTP server for the scraper and JD fetcher tests
+
+Serves a dict of path (with query string) -> Page from a background thread.
+Each page gets an ETag derived from its body, and a Last-Modified date.
+Requests whose If-None-Match (or, without one, If-Modified-Since) still
+matches get a 304. Every request is logged as (path, status, headers), so a
+test can check which pages were fetched, revalidated or skipped.
+"""
+
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+DEFAULT_MODIFIED = "Mon, 06 Oct 2025 09:00:00 GMT"
+
+
+class Page:
+    """One response body plus the validators served with it"""
+
+    def __init__(self, body, content_type: str = "text/html; charset=utf-8",
+                 last_modified: Optional[str] = DEFAULT_MODIFIED, etag: bool = True):
+        self.body = body.encode("utf-8") if isinstance(body, str) else body
+        self.content_type = content_type
+        self.last_modified = last_modified
+        self.etag = f'"{hashlib.sha1(self.body).hexdigest()[:16]}"' if etag else None
+
+    @classmethod
+    def fixture(cls, name: str, **kwargs) -> "Page":
+        return cls((FIXTURES / name).read_bytes(), **kwargs)
+
+    def not_modified(self, headers) -> bool:
+        if headers.get("If-None-Match") is not None:
+            return self.etag is not None and headers["If-None-Match"] == self.etag
+        since = headers.get("If-Modified-Since")
+        return since is not None and self.last_modified is not None and since == self.last_modified
+
+
+class FixtureServer:
+    """ThreadingHTTPServer on a free localhost port; use as a context manager"""
+
+    def __init__(self, pages: Optional[Dict[str, Page]] = None):
+        self.pages: Dict[str, Page] = dict(pages or {})
+        self.requests: List[Tuple[str, int, Dict[str, str]]] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                page = server.pages.get(self.path)
+                if page is None:
+                    status = 404
+                elif page.not_modified(self.headers):
+                    status = 304
+                else:
+                    status = 200
+                with server._lock:
+                    server.requests.append((self.path, status, dict(self.headers)))
+                self.send_response(status)
+                if page is not None:
+                    if page.etag:
+                        self.send_header("ETag", page.etag)
+                    if page.last_modified:
+                        self.send_header("Last-Modified", page.last_modified)
+                if status != 200:
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_header("Content-Type", page.content_type)
+                self.send_header("Content-Length", str(len(page.body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(page.body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client stopped reading (e.g. at its byte cap)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def served(self, prefix: str = "") -> List[Tuple[str, int]]:
+        """(path, status) of the requests so far whose path starts with prefix"""
+        with self._lock:
+            return [(path, status) for path, status, _ in self.requests if path.startswith(prefix)]
+
+    def __enter__(self) -> "FixtureServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
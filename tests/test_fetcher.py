@@ -0,0 +1,92 @@
+"""
+fetcher.JDFetcher against a local server
+
+Covers main-text extraction from a saved job posting, the byte cap on large
+pages, ETag revalidation answered with 304, and serving a fresh cached copy
+without a request.
+
+    python -m pytest tests/test_fetcher.py
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+from fetcher import JDFetcher  # noqa: E402
+
+from fixture_server import FixtureServer, Page  # noqa: E402
+
+JD = "/jobs/data-analyst/"
+
+
+def fetch(fetcher: JDFetcher, *urls: str) -> list:
+    """Fetch urls one after another on one event loop, then close the client"""
+    async def run():
+        try:
+            return [await fetcher.fetch_text(url) for url in urls]
+        finally:
+            await fetcher.aclose()
+    return asyncio.run(run())
+
+
+def test_main_text():
+    with FixtureServer({JD: Page.fixture("jd/data-analyst.html")}) as server:
+        text, = fetch(JDFetcher(), server.url + JD)
+    assert text.startswith("Data Analyst We are looking for a Data Analyst")
+    assert "Write SQL queries against our data warehouse" in text
+    assert "two years of experience with SQL and Python." in text
+    # Navigation, sidebars, forms, footers and scripts are dropped
+    for chrome in ("All jobs", "Similar jobs", "job alerts", "Cookie settings", "page view script"):
+        assert chrome not in text
+
+
+def test_byte_cap():
+    head = "<html><body><main><p>Payroll clerk with Excel skills.</p>"
+    pages = {
+        "/long.html": Page(head + "<p>filler text</p>" * 50_000 + "<p>TAIL MARKER</p></main></body></html>"),
+        "/long.txt": Page("Payroll clerk. " + "filler " * 200_000 + "TAIL MARKER", content_type="text/plain"),
+    }
+    with FixtureServer(pages) as server:
+        html, plain = fetch(JDFetcher(max_bytes=4096, max_chars=100_000),
+                            server.url + "/long.html", server.url + "/long.txt")
+    assert html.startswith("Payroll clerk with Excel skills.")
+    assert plain.startswith("Payroll clerk.")
+    for text in (html, plain):
+        assert "TAIL MARKER" not in text
+        assert len(text) <= 4096
+
+
+def test_revalidation():
+    with FixtureServer({JD: Page.fixture("jd/data-analyst.html")}) as server:
+        url = server.url + JD
+        # fresh_seconds=0: every fetch after the first revalidates
+        fetcher = JDFetcher(fresh_seconds=0)
+        first, second = fetch(fetcher, url, url)
+        assert second == first
+        assert server.served(JD) == [(JD, 200), (JD, 304)]
+        assert server.requests[1][2]["If-None-Match"] == server.pages[JD].etag
+        assert fetcher.stats()["revalidated"] == 1
+
+        # A changed page is downloaded again
+        server.pages[JD] = Page(Page.fixture("jd/data-analyst.html").body.replace(b"two years", b"five years"))
+        third, = fetch(fetcher, url)
+        assert "five years of experience" in third
+        assert server.served(JD)[-1] == (JD, 200)
+
+        # Within fresh_seconds the cached text is served without a request
+        fresh = JDFetcher(fresh_seconds=60)
+        fetch(fresh, url, url)
+        assert len(server.served(JD)) == 4
+
+
+def test_missing_page():
+    with FixtureServer() as server:
+        assert fetch(JDFetcher(), server.url + "/gone/") == [None]
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
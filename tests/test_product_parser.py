@@ -0,0 +1,48 @@
+"""
+Scraper/product_parser.py against saved SHL product pages
+
+Each tests/fixtures/shl/<slug>.html product page has its expected catalog
+record in <slug>.json. parse_product has to reproduce it on both the lxml
+and the html.parser path. The pages cover h4 and h5 headings, <br>-separated
+job levels and languages, an adaptive test without remote testing, and a
+page with no <title>, no length and an empty section.
+
+    python -m pytest tests/test_product_parser.py
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "Scraper"))
+import product_parser  # noqa: E402
+
+FIXTURES = Path(__file__).parent / "fixtures" / "shl"
+PAGES = sorted(p.stem for p in FIXTURES.glob("*.json"))
+BACKENDS = ["lxml", "html.parser"]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("slug", PAGES)
+def test_golden(slug, backend, monkeypatch):
+    if backend == "lxml" and product_parser.lxml_html is None:
+        pytest.skip("lxml is not installed")
+    if backend == "html.parser":
+        monkeypatch.setattr(product_parser, "lxml_html", None)
+    expected = json.loads((FIXTURES / f"{slug}.json").read_text(encoding="utf-8"))
+    html = (FIXTURES / f"{slug}.html").read_text(encoding="utf-8")
+    # The listing link text, used when the page has no <title>
+    assert product_parser.parse_product(html, expected["name"], expected["url"]) == expected
+
+
+def test_fixtures_present():
+    assert len(PAGES) >= 4
+    for slug in PAGES:
+        assert (FIXTURES / f"{slug}.html").exists()
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,116 @@
+"""
+Scraper/scraper.py against a local server with saved SHL-like pages
+
+Covers a full crawl, a refresh where every product page answers 304, resuming
+an interrupted crawl, and a refresh that crashes right after it starts (only
+its own records may be reused on resume, not those of the completed crawl).
+
+    python -m pytest tests/test_scraper.py
+"""
+
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "Scraper"))
+os.environ.setdefault("SCRAPE_RATE", "1000")  # read at import; keep the tests fast
+import scraper  # noqa: E402
+
+from fixture_server import FixtureServer, Page  # noqa: E402
+
+LISTING = "/products/product-catalog/?start={}&type=1"
+VIEW = "/products/product-catalog/view/"
+SLUGS = ["account-manager-solution", "apache-pig-new", "verify-numerical-ability"]
+NAMES = ["Account Manager Solution", "Apache Pig (New)", "Verify - Numerical Ability"]
+
+
+def shl_server() -> FixtureServer:
+    pages = {
+        LISTING.format(0): Page.fixture("shl/catalog-page-1.html"),
+        LISTING.format(12): Page.fixture("shl/catalog-page-end.html"),
+    }
+    for slug in SLUGS:
+        pages[f"{VIEW}{slug}/"] = Page.fixture(f"shl/{slug}.html")
+    return FixtureServer(pages)
+
+
+def point_at(monkeypatch, server: FixtureServer, checkpoint: Path) -> None:
+    """Crawl server with checkpoint, restoring the module's settings after the test"""
+    monkeypatch.setattr(scraper, "base_url", server.url)
+    monkeypatch.setattr(scraper, "CHECKPOINT_PATH", checkpoint)
+
+
+def crawl(monkeypatch, server: FixtureServer, checkpoint: Path) -> list:
+    point_at(monkeypatch, server, checkpoint)
+    return scraper.crawl()
+
+
+def product_requests(server: FixtureServer, start: int) -> dict:
+    """slug -> status of the product page requests made since request number start"""
+    with server._lock:
+        log = server.requests[start:]
+    return {path[len(VIEW):].strip("/"): status for path, status, _ in log if path.startswith(VIEW)}
+
+
+def test_crawl_and_revalidate(tmp_path, monkeypatch):
+    checkpoint = tmp_path / "checkpoint.jsonl"
+    with shl_server() as server:
+        items = crawl(monkeypatch, server, checkpoint)
+        assert [it["name"] for it in items] == NAMES
+        assert items[0]["length_minutes"] == "49"
+        assert product_requests(server, 0) == {slug: 200 for slug in SLUGS}
+
+        # A refresh sends the validators and reuses every unchanged page
+        start = len(server.requests)
+        assert crawl(monkeypatch, server, checkpoint) == items
+        assert product_requests(server, start) == {slug: 304 for slug in SLUGS}
+        assert all("If-None-Match" in h for p, _, h in server.requests[start:] if p.startswith(VIEW))
+
+
+def test_resume_interrupted_crawl(tmp_path, monkeypatch):
+    checkpoint = tmp_path / "checkpoint.jsonl"
+    with shl_server() as server:
+        point_at(monkeypatch, server, checkpoint)
+        products = scraper.iter_products()
+        first = next(products)
+        products.close()  # stops before finish(), as a crash would
+
+        state = scraper.Checkpoint(checkpoint)
+        assert state.resuming
+        done = state.resumed()
+        assert 1 <= done <= len(SLUGS)
+
+        start = len(server.requests)
+        items = scraper.crawl()
+        assert items[0] == first
+        assert [it["name"] for it in items] == NAMES
+        # Pages logged before the interruption are not requested again
+        assert len(product_requests(server, start)) == len(SLUGS) - done
+        assert not scraper.Checkpoint(checkpoint).resuming
+
+
+def test_crashed_refresh_does_not_reuse_previous_crawl(tmp_path, monkeypatch):
+    checkpoint = tmp_path / "checkpoint.jsonl"
+    with shl_server() as server:
+        crawl(monkeypatch, server, checkpoint)
+        # The page changes, then a refresh crashes right after writing its header
+        server.pages[f"{VIEW}apache-pig-new/"] = Page(
+            Page.fixture("shl/apache-pig-new.html").body.replace(b"= 6<", b"= 8<"),
+            last_modified="Tue, 07 Oct 2025 09:00:00 GMT")
+        state = scraper.Checkpoint(checkpoint)
+        state.open()
+        state._file.close()
+        assert scraper.Checkpoint(checkpoint).resumed() == 0
+
+        start = len(server.requests)
+        items = crawl(monkeypatch, server, checkpoint)
+        assert product_requests(server, start) == {
+            "account-manager-solution": 304, "apache-pig-new": 200, "verify-numerical-ability": 304}
+        assert items[1]["length_minutes"] == "8"
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))